@@ -0,0 +1,99 @@
+"""
+Admission - Kontrola przyjęć przed process_user_message_smart
+Gdy LLM nie nadąża (za dużo wywołań w toku albo za długa kolejka):
+- pytania FAQ dostają od razu lokalną odpowiedź (bez LLM, w pasie nadawcy - bez czekania na okno łączenia)
+- tury rezerwacyjne dostają krótkie "moment proszę" i czekają w kolejce
+"""
+
+import logging
+import os
+import threading
+import time
+
+from bot_logic import analyze_intent_regex_only, get_quick_response, get_welcome_menu
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# ==============================================
+# KONFIGURACJA
+# ==============================================
+
+ADMISSION_MAX_IN_FLIGHT = int(os.getenv('ADMISSION_MAX_IN_FLIGHT', os.getenv('MESSAGE_WORKERS', '4')))
+ADMISSION_MAX_QUEUE = int(os.getenv('ADMISSION_MAX_QUEUE', '10'))
+ADMISSION_BUSY_NOTICE_INTERVAL = float(os.getenv('ADMISSION_BUSY_NOTICE_INTERVAL', '60'))
+
+BUSY_REPLY = "⏳ Moment proszę - mamy teraz dużo wiadomości, zaraz wrócę z odpowiedzią! 😊"
+
+# Akcje kontroli przyjęć
+ADMIT = 'admit'            # normalna ścieżka (LLM)
+ANSWER_LOCAL = 'answer'    # odpowiedź lokalna, bez LLM
+DEFER = 'defer'            # "moment proszę" + kolejka
+
+ADMISSION_DECISIONS = metrics.counter(
+    'bot_admission_decisions_total', 'Decyzje kontroli przyjęć', ('decision',)
+)
+
+class AdmissionController:
+    """Decyzja dla nowej wiadomości na podstawie bieżącego obciążenia"""
+
+    def __init__(self, in_flight_func, queue_depth_func,
+                 max_in_flight=ADMISSION_MAX_IN_FLIGHT, max_queue=ADMISSION_MAX_QUEUE,
+                 busy_notice_interval=ADMISSION_BUSY_NOTICE_INTERVAL):
+        """
+        Args:
+            in_flight_func: () -> liczba wywołań LLM w toku
+            queue_depth_func: () -> liczba wiadomości czekających na obsługę
+        """
+        self.in_flight_func = in_flight_func
+        self.queue_depth_func = queue_depth_func
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.busy_notice_interval = busy_notice_interval
+        self._last_notice = {}     # sender_id -> czas ostatniego "moment proszę"
+        self._lock = threading.Lock()
+
+    def is_overloaded(self):
+        """Przeciążenie = wszystkie miejsca LLM zajęte albo za długa kolejka"""
+        return (self.in_flight_func() >= self.max_in_flight
+                or self.queue_depth_func() >= self.max_queue)
+
+    def decide(self, sender_id, message_text, has_history=True):
+        """
+        Zdecyduj co zrobić z wiadomością
+
+        Args:
+            has_history (bool): Czy nadawca ma już rozmowę (kontekst rezerwacji)
+
+        Returns:
+            tuple: (akcja, odpowiedź lub None)
+        """
+        if not self.is_overloaded():
+            return self._record(ADMIT, None)
+
+        intent = analyze_intent_regex_only(message_text)
+        if intent == "OTHER_QUESTION":
+            quick_response = get_quick_response(message_text)
+            if quick_response:
+                return self._record(ANSWER_LOCAL, quick_response)
+            if not has_history:
+                # Nowy klient z ogólnym pytaniem - menu zamiast czekania na LLM
+                return self._record(ANSWER_LOCAL, get_welcome_menu())
+
+        # Rezerwacja lub wiadomość zależna od kontekstu - do kolejki, jedno "moment proszę" na okno
+        now = time.monotonic()
+        with self._lock:
+            last = self._last_notice.get(sender_id)
+            notify = last is None or now - last >= self.busy_notice_interval
+            if notify:
+                self._last_notice[sender_id] = now
+            if len(self._last_notice) > 1000:
+                cutoff = now - self.busy_notice_interval
+                self._last_notice = {k: t for k, t in self._last_notice.items() if t >= cutoff}
+        return self._record(DEFER, BUSY_REPLY if notify else None)
+
+    def _record(self, action, reply):
+        ADMISSION_DECISIONS.inc(decision=action)
+        if action != ADMIT:
+            logger.warning(f"🚦 Przeciążenie - decyzja: {action}")
+        return action, reply
@@ -0,0 +1,174 @@
+"""
+Answer Cache - Pamięć odpowiedzi na powtarzające się pytania FAQ
+Klucz: znormalizowana treść wiadomości + kubełek daty (odpowiedź na
+"czy jutro otwarte" zależy od dnia, na "czy teraz otwarte" - od godziny).
+
+Używane tylko dla prawdziwych pytań FAQ (temat z get_quick_response albo
+FAQ_KEYWORDS) zadanych na początku rozmowy - odpowiedź na "Jan Kowalski",
+"o 17:30" czy "dziękuję" zależy od historii rozmówcy i nie może trafić do
+innych klientów. Listy terminów i potwierdzenia nigdy nie trafiają do pamięci.
+"""
+
+import logging
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime
+
+import pytz
+
+from bot_logic import analyze_intent_regex_only, get_quick_response
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# ==============================================
+# KONFIGURACJA
+# ==============================================
+
+ANSWER_CACHE_ENABLED = os.getenv('ANSWER_CACHE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv('ANSWER_CACHE_MAX_ENTRIES', '500'))
+ANSWER_CACHE_TTL = float(os.getenv('ANSWER_CACHE_TTL', '3600'))
+
+ANSWER_CACHE_LOOKUPS = metrics.counter(
+    'bot_answer_cache_lookups_total', 'Zapytania do pamięci odpowiedzi FAQ', ('result',)
+)
+
+# Słowa, przy których odpowiedź zależy od bieżącej godziny (otwarte/zamknięte "teraz")
+_HOUR_SENSITIVE = ('teraz', 'obecnie', 'w tej chwili', 'otwarte', 'czynne', 'zamkniete', 'dzis')
+
+# Ślady rezerwacji w historii - wtedy odpowiedź zależy od kontekstu rozmowy
+BOOKING_MARKERS = (
+    'Terminy na ', '[Podano wolne terminy', 'CHECK_AVAILABILITY',
+    'PODSUMOWANIE REZERWACJI', 'REZERWACJA POTWIERDZONA', 'ANULACJA POTWIERDZONA',
+    'Wydarzenie dodane', 'Wydarzenie usunięte'
+)
+
+# Tematy FAQ (słowa po normalize_message) - odpowiedź taka sama dla każdego klienta
+FAQ_KEYWORDS = frozenset((
+    'parking', 'parkingu', 'cennik', 'cena', 'ceny', 'koszt', 'kosztuje', 'uslugi', 'oferujecie',
+    'adres', 'dojazd', 'dojechac', 'godziny', 'otwarte', 'czynne', 'telefon', 'kontakt',
+    'platnosc', 'karta', 'karte', 'gotowka', 'wifi'
+))
+
+_NON_WORD = re.compile(r'[^\w\s]')
+_SPACES = re.compile(r'\s+')
+
+# ==============================================
+# KLUCZ
+# ==============================================
+
+def normalize_message(text):
+    """Małe litery, bez polskich znaków, interpunkcji i emoji, pojedyncze spacje"""
+    text = text.lower().replace('ł', 'l')
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    text = _NON_WORD.sub(' ', text)
+    return _SPACES.sub(' ', text).strip()
+
+def date_bucket(normalized, now=None):
+    """Dzień (zawsze - prompt zawiera datę), a dla pytań o "teraz" także godzina"""
+    now = now or datetime.now(pytz.timezone('Europe/Warsaw'))
+    if any(word in normalized for word in _HOUR_SENSITIVE):
+        return now.strftime('%Y-%m-%d %H')
+    return now.strftime('%Y-%m-%d')
+
+def make_key(message, now=None):
+    normalized = normalize_message(message)
+    return f"{date_bucket(normalized, now)}|{normalized}"
+
+def has_booking_state(history):
+    """Czy w historii jest już rezerwacja w toku (listy terminów, podsumowania, potwierdzenia)"""
+    return any(
+        marker in message['content']
+        for message in history
+        for marker in BOOKING_MARKERS
+    )
+
+def is_faq_question(message):
+    """Pytanie o temat FAQ (usługi, ceny, dojazd, godziny, kontakt...), nie odpowiedź w rozmowie"""
+    if get_quick_response(message):
+        return True
+    return not FAQ_KEYWORDS.isdisjoint(normalize_message(message).split())
+
+def is_cacheable_turn(message, history):
+    """Pytanie FAQ (OTHER_QUESTION) zadane bez wcześniejszej historii - odpowiedź nie zależy od rozmówcy"""
+    if not ANSWER_CACHE_ENABLED or history:
+        return False
+    return analyze_intent_regex_only(message) == "OTHER_QUESTION" and is_faq_question(message)
+
+# ==============================================
+# PAMIĘĆ LRU + TTL
+# ==============================================
+
+class AnswerCache:
+    """LRU z TTL - najdawniej używane wpisy usuwane po przekroczeniu limitu"""
+
+    def __init__(self, max_entries=ANSWER_CACHE_MAX_ENTRIES, ttl=ANSWER_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()      # klucz -> (czas zapisu, odpowiedź)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, message, now=None):
+        """Odpowiedź z pamięci albo None"""
+        key = make_key(message, now)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] > self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+        ANSWER_CACHE_LOOKUPS.inc(result='hit' if entry else 'miss')
+        if entry:
+            logger.info(f"💾 Odpowiedź z pamięci FAQ: '{key[:60]}'")
+            return entry[1]
+        return None
+
+    def put(self, message, response, now=None):
+        key = make_key(message, now)
+        with self._lock:
+            self._entries[key] = (time.monotonic(), response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'enabled': ANSWER_CACHE_ENABLED,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_s': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+                'evictions': self.evictions
+            }
+
+_answer_cache = None
+_answer_cache_lock = threading.Lock()
+
+def get_answer_cache():
+    """Wspólna pamięć odpowiedzi procesu (singleton)"""
+    global _answer_cache
+    with _answer_cache_lock:
+        if _answer_cache is None:
+            _answer_cache = AnswerCache()
+        return _answer_cache
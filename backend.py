@@ -3,11 +3,10 @@ Backend - Flask server z webhook'ami Facebook
 Obsługuje tylko komunikację, logika w bot_logic.py
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response
 from flask_cors import CORS
 import os
 import logging
-import requests
 import json
 import time
 from dotenv import load_dotenv
@@ -17,6 +16,19 @@ from dotenv import load_dotenv
 
 #AI VERSION (nowa)
 from bot_logic_ai import process_user_message_smart
+from message_worker import SenderLaneExecutor, MessageCoalescer
+from graph_api import GraphApiClient
+from outbound_queue import OutboundDispatcher
+from dedup_store import create_dedup_store
+from warmup import WarmupManager
+from state_backend import get_store, STATE_BACKEND
+from admission import AdmissionController, ANSWER_LOCAL
+from answer_cache import get_answer_cache
+from router import get_router_stats
+from booking_verifier import get_booking_verifier
+import bot_logic_ai
+import calendar_service
+import metrics
 
 # Załaduj zmienne z .env
 load_dotenv()
@@ -46,101 +58,127 @@ if missing_vars:
 else:
     logger.info("✅ Wszystkie zmienne środowiskowe załadowane")
 
-processed_messages = set()  # Cache przetworzonych wiadomości
-MAX_CACHE_SIZE = 1000       # Maksymalny rozmiar cache
+# 🔧 DEDUPLIKACJA - okno czasowe, O(1), opcjonalnie SQLite wspólny dla procesów
+dedup_store = create_dedup_store()
+DEDUP_CHECKS = metrics.counter('bot_dedup_checks_total', 'Sprawdzenia message_id w deduplikacji', ('result',))
 
-def is_message_processed(message_id):
-    """Sprawdź czy wiadomość została już przetworzona"""
-    return message_id in processed_messages
+# 🔧 BLOKADA NADAWCY - przy wielu procesach jeden nadawca obsługiwany naraz
+sender_locks = get_store('sender_locks')
 
-def mark_message_processed(message_id):
-    """Oznacz wiadomość jako przetworzoną"""
-    processed_messages.add(message_id)
+def handle_message(sender_id, messages, local_response=None):
+    """
+    Obsłuż serię wiadomości nadawcy z deduplikacją
+
+    Args:
+        sender_id (str): ID nadawcy
+        messages (list): [(message_id, text, received_at), ...] - połączone przez MessageCoalescer
+        local_response (str): Gotowa odpowiedź bez LLM (przeciążenie) - tylko zapis i wysyłka
+    """
     
-    # Ogranicz rozmiar cache
-    if len(processed_messages) > MAX_CACHE_SIZE:
-        # Usuń najstarsze elementy (simplified)
-        oldest_items = list(processed_messages)[:100]
-        for item in oldest_items:
-            processed_messages.remove(item)
-
-def handle_message(sender_id, message_text, message_id):
-    """Obsłuż wiadomość z deduplikacją"""
+    # 🔧 SPRAWDŹ I OZNACZ JEDNYM RUCHEM (bez wyścigu między workerami):
+    texts = []
+    received_at = None
+    for message_id, text, message_received_at in messages:
+        if dedup_store.check_and_mark(message_id):
+            DEDUP_CHECKS.inc(result='duplicate')
+            logger.info(f"🔄 Wiadomość już przetworzona: {message_id} - POMIJAM")
+            continue
+        DEDUP_CHECKS.inc(result='new')
+        texts.append(text)
+        if received_at is None:
+            received_at = message_received_at
     
-    # 🔧 SPRAWDŹ CZY WIADOMOŚĆ BYŁA JUŻ PRZETWORZONA:
-    if is_message_processed(message_id):
-        logger.info(f"🔄 Wiadomość już przetworzona: {message_id} - POMIJAM")
+    if not texts:
         return
     
-    # Oznacz jako przetworzoną
-    mark_message_processed(message_id)
-    
+    # Seria "hej" / "chcę się umówić" / "na jutro" = jedna tura i jedno wywołanie LLM
+    message_text = "\n".join(texts)
     logger.info(f"💬 Wiadomość od {sender_id}: {message_text}")
     
     # Przetwórz wiadomość
-    response = process_user_message_smart(message_text, sender_id)
+    with sender_locks.key_lock(sender_id):
+        if local_response is None:
+            response = process_user_message_smart(message_text, sender_id)
+        else:
+            response = local_response
+            bot_logic_ai.add_to_history(sender_id, "user", message_text)
+            bot_logic_ai.add_to_history(sender_id, "assistant", response)
+            logger.info(f"⚡ Odpowiedź lokalna (przeciążenie) dla {sender_id}")
     
     # 🔧 POPRAWKA - UŻYJ PRAWIDŁOWEJ NAZWY FUNKCJI:
-    send_facebook_message(sender_id, response)
-    logger.info(f"✅ Wiadomość wysłana do {sender_id}: '{response[:50]}...'")
+    send_facebook_message(sender_id, response, received_at=received_at)
+    logger.info(f"✅ Wiadomość przekazana do wysyłki do {sender_id}: '{response[:50]}...'")
+
+# 🔧 PULA WORKERÓW - osobny pas na nadawcę, nadawcy równolegle
+message_pool = SenderLaneExecutor(handle_message)
+
+# 🔧 ŁĄCZENIE SERII - szybkie wiadomości nadawcy jako jedna tura LLM
+message_coalescer = MessageCoalescer(message_pool)
+
+# 🔧 KONTROLA PRZYJĘĆ - przy przeciążeniu LLM odpowiedzi FAQ lokalnie
+admission = AdmissionController(bot_logic_ai.llm_in_flight, message_pool.queue_depth)
+
+def answer_locally(sender_id, message_text, message_id, response):
+    """
+    Odpowiedź bez LLM (przeciążenie) - lekkie zadanie w pasie nadawcy, więc historia
+    i wysyłka idą po jego wcześniejszych wiadomościach (bez okna łączenia)
+
+    Returns:
+        bool: False jeśli kolejka jest pełna
+    """
+    return message_pool.submit(sender_id, sender_id, [(message_id, message_text, time.monotonic())], response)
     
+# 🔧 WSPÓLNY KLIENT GRAPH API - pula połączeń keep-alive + retry
+graph_client = GraphApiClient(FACEBOOK_PAGE_ACCESS_TOKEN)
+
 def get_page_id():
     """Pobierz ID strony z tokenu"""
     try:
-        url = f"https://graph.facebook.com/v18.0/me"
-        params = {'access_token': FACEBOOK_PAGE_ACCESS_TOKEN}
-        response = requests.get(url, params=params)
-        if response.status_code == 200:
+        response = graph_client.get('me')
+        if response is not None and response.status_code == 200:
             data = response.json()
             return data.get('id')
     except:
         pass
     return "750208294831428"  # fallback
 
-PAGE_ID = get_page_id() if FACEBOOK_PAGE_ACCESS_TOKEN else "750208294831428"
+# Uzupełniane w fazie warmup (bez blokowania importu)
+PAGE_ID = "750208294831428"
+
+def warmup_page_id():
+    """Warmup: pobierz ID strony z Graph API"""
+    global PAGE_ID
+    if FACEBOOK_PAGE_ACCESS_TOKEN:
+        PAGE_ID = get_page_id()
+        logger.info(f"📘 PAGE_ID: {PAGE_ID}")
 
 # ==============================================
 # FACEBOOK MESSAGING
 # ==============================================
 
-def send_facebook_message(recipient_id, message_text):
-    """Wyślij wiadomość przez Facebook Messenger"""
+def send_facebook_message(recipient_id, message_text, received_at=None):
+    """Zaplanuj wysyłkę wiadomości przez Facebook Messenger (nie blokuje)"""
     if not FACEBOOK_PAGE_ACCESS_TOKEN:
         logger.error("Brak Facebook Page Access Token")
         return False
         
-    try:
-        # Ogranicz długość wiadomości (Facebook limit: 2000 znaków)
-        if len(message_text) > 1500:  # Bezpieczny limit
-            # Podziel na części
-            parts = [message_text[i:i+1500] for i in range(0, len(message_text), 1500)]
-            for i, part in enumerate(parts):
-                if i > 0:  # Przerwa między częściami
-                    time.sleep(0.5)
-                success = _send_single_message(recipient_id, part)
-                if not success:
-                    return False
-            return True
-        else:
-            return _send_single_message(recipient_id, message_text)
-            
-    except Exception as e:
-        logger.error(f"❌ Błąd Facebook API: {e}")
-        return False
+    # Podział na części (Facebook limit: 2000 znaków), odstępy i limit strony - w kolejce wysyłki
+    return outbound_queue.enqueue(recipient_id, message_text, received_at=received_at)
 
 def _send_single_message(recipient_id, message_text):
     """Wyślij pojedynczą wiadomość"""
     try:
-        url = f"https://graph.facebook.com/v18.0/{PAGE_ID}/messages"
         payload = {
             'recipient': {'id': recipient_id},
             'message': {'text': message_text}
         }
-        params = {'access_token': FACEBOOK_PAGE_ACCESS_TOKEN}
         
-        response = requests.post(url, json=payload, params=params)
+        response = graph_client.post(f"{PAGE_ID}/messages", json=payload)
         
-        if response.status_code == 200:
+        if response is None:
+            logger.error("❌ Błąd wysyłania: brak połączenia z Graph API")
+            return False
+        elif response.status_code == 200:
             return True
         else:
             logger.error(f"❌ Błąd wysyłania: {response.status_code} - {response.text}")
@@ -150,6 +188,48 @@ def _send_single_message(recipient_id, message_text):
         logger.error(f"❌ Błąd wysyłania wiadomości: {e}")
         return False
 
+# 🔧 KOLEJKA WYSYŁKI - części wiadomości wysyłane w tle z odstępami
+outbound_queue = OutboundDispatcher(_send_single_message)
+
+# 🔧 WERYFIKACJA WIZYT W TLE - dodatkowa wiadomość do klienta tylko przy problemie
+get_booking_verifier().set_notifier(send_facebook_message)
+
+# ==============================================
+# WARMUP - równoległa inicjalizacja w tle
+# ==============================================
+
+def warmup_calendar():
+    """Warmup: zbuduj klienta Google Calendar i wczytaj indeks zajętości zanim przyjdzie pierwszy klient"""
+    service = calendar_service.get_calendar_service()
+    if not service.is_available():
+        raise Exception("Google Calendar niedostępny (sprawdź credentials.json)")
+    if calendar_service.CALENDAR_INDEX_ENABLED:
+        service.event_index.refresh()
+
+warmup = WarmupManager()
+warmup.add_task('graph_page_id', warmup_page_id, required=False)
+warmup.add_task('together_client', bot_logic_ai.get_ai_client)
+warmup.add_task('google_calendar', warmup_calendar, required=False)
+warmup.start()
+
+# ==============================================
+# METRYKI - gauge czytane dopiero przy odczycie /metrics
+# ==============================================
+
+metrics.gauge('bot_message_queue_depth', 'Zadania czekające w pasach nadawców', func=message_pool.queue_depth)
+metrics.gauge('bot_message_in_progress', 'Zadania w trakcie obsługi',
+              func=lambda: message_pool.get_stats()['in_progress'])
+metrics.gauge('bot_coalescer_pending_senders', 'Nadawcy z niewysłaną serią wiadomości',
+              func=lambda: message_coalescer.get_stats()['pending_senders'])
+metrics.gauge('bot_coalescer_llm_calls_saved', 'Wywołania LLM zaoszczędzone przez łączenie serii',
+              func=lambda: message_coalescer.get_stats()['llm_calls_saved'])
+metrics.gauge('bot_outbound_pending', 'Odpowiedzi czekające na wysyłkę', func=outbound_queue.pending)
+metrics.gauge('bot_active_conversations', 'Rozmowy w pamięci', func=lambda: len(bot_logic_ai.user_conversations))
+metrics.gauge('bot_active_users_last_hour', 'Użytkownicy aktywni w ostatniej godzinie',
+              func=bot_logic_ai.count_active_users)
+metrics.gauge('bot_llm_in_flight', 'Wywołania LLM w toku', func=bot_logic_ai.llm_in_flight)
+metrics.gauge('bot_ready', '1 gdy warmup zakończony i backend gotowy', func=lambda: int(warmup.is_ready()))
+
 # ==============================================
 # FACEBOOK WEBHOOK ENDPOINTS
 # ==============================================
@@ -183,12 +263,14 @@ def webhook_verify():
 
 @app.route('/', methods=['POST'])
 def webhook():
-    """Obsługa wiadomości Facebook"""
+    """Obsługa wiadomości Facebook - tylko kolejkowanie, odpowiedź od razu"""
     data = request.get_json()
     
     # Log przychodzących danych
     logger.info(f"📨 Webhook data: {json.dumps(data, indent=2, ensure_ascii=False)}")
     
+    all_queued = True
+    
     if data['object'] == 'page':
         for entry in data['entry']:
             for messaging_event in entry['messaging']:
@@ -205,8 +287,23 @@ def webhook():
                     message_text = messaging_event['message']['text']
                     message_id = messaging_event['message']['mid']  # ← KLUCZOWE!
                     
-                    # 🔧 OBSŁUŻ Z DEDUPLIKACJĄ:
-                    handle_message(sender_id, message_text, message_id)
+                    # 🔧 PRZECIĄŻENIE - FAQ od razu lokalnie, rezerwacje z "moment proszę" do kolejki
+                    action, reply = admission.decide(
+                        sender_id, message_text,
+                        has_history=sender_id in bot_logic_ai.user_conversations
+                    )
+                    if action == ANSWER_LOCAL:
+                        # Seria nadawcy czeka jeszcze w oknie łączenia - dołącz do niej, żeby nie wyprzedzić
+                        if not message_coalescer.has_pending(sender_id):
+                            if not answer_locally(sender_id, message_text, message_id, reply):
+                                all_queued = False
+                            continue
+                    elif reply:
+                        send_facebook_message(sender_id, reply)
+                    
+                    # 🔧 DO KOLEJKI (przez okno łączenia) - deduplikacja i AI w workerze:
+                    if not message_coalescer.add(sender_id, message_id, message_text):
+                        all_queued = False
                 
                 # Inne typy eventów (delivery, read, etc.)
                 elif 'delivery' in messaging_event:
@@ -216,29 +313,48 @@ def webhook():
                 else:
                     logger.info(f"📨 Nieznany event: {messaging_event}")
     
+    # Pełna kolejka - niech Facebook ponowi dostarczenie później
+    if not all_queued:
+        return 'Kolejka pełna', 503
+    
     return 'OK', 200
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
     try:
-        # 🔧 ZMIEŃ IMPORT:
-        from bot_logic_ai import user_conversations
         stats = {
-            'total_sessions': len(user_conversations),
-            'active_last_hour': len(user_conversations)
+            'total_sessions': len(bot_logic_ai.user_conversations),
+            'active_last_hour': bot_logic_ai.count_active_users()
         }
         
         return jsonify({
             'status': 'ok',
             'service': 'Smart FAQ Bot Backend + Facebook Messenger (AI with Memory)',
-            'model': 'deepseek-ai/DeepSeek-R1-Distill-Llama-70B-free',
+            'model': bot_logic_ai.TOGETHER_MODEL,
             'facebook_configured': bool(FACEBOOK_PAGE_ACCESS_TOKEN),
             'verify_token': FACEBOOK_VERIFY_TOKEN,
             'active_sessions': stats['total_sessions'],
             'active_last_hour': stats['active_last_hour'],
             'memory_enabled': True,
-            'calendar_service': 'enabled'
+            'calendar_service': 'enabled',
+            'state_backend': STATE_BACKEND,
+            'worker_pid': os.getpid(),
+            'message_queue': message_pool.get_stats(),
+            'coalescing': message_coalescer.get_stats(),
+            'conversations': bot_logic_ai.user_conversations.get_stats(),
+            'llm_in_flight': bot_logic_ai.llm_in_flight(),
+            'llm_client': bot_logic_ai.llm_client.get_stats(),
+            'slot_prefetch': bot_logic_ai.slot_prefetcher.get_stats(),
+            'overloaded': admission.is_overloaded(),
+            'system_prompt': bot_logic_ai.get_prompt_stats(),
+            'answer_cache': get_answer_cache().get_stats(),
+            'router': get_router_stats(),
+            'booking_verification': get_booking_verifier().get_stats(),
+            'calendar_index': calendar_service.get_index_stats(),
+            'graph_api': graph_client.get_stats(),
+            'outbound_queue': outbound_queue.get_stats(),
+            'dedup': dedup_store.get_stats()
         })
     except Exception as e:
         return jsonify({
@@ -246,6 +362,20 @@ def health_check():
             'error': str(e)
         }), 500
 
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Metryki w formacie Prometheusa (histogramy opóźnień, liczniki, kolejki)"""
+    return Response(metrics.REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/ready', methods=['GET'])
+def readiness_check():
+    """Readiness endpoint - 200 dopiero po zakończonym warmup"""
+    ready = warmup.is_ready()
+    return jsonify({
+        'ready': ready,
+        'tasks': warmup.get_status()
+    }), 200 if ready else 503
+
 @app.route('/api/debug/sessions', methods=['GET'])
 def debug_sessions():
     """Debug endpoint - pokaż aktywne sesje"""
@@ -295,5 +425,5 @@ if __name__ == '__main__':
     logger.info(f"📘 Facebook token configured: {bool(FACEBOOK_PAGE_ACCESS_TOKEN)}")
     logger.info(f"🤖 Bot Logic: enabled")
     
-    # Dla developmentu
+    # Dla developmentu (jeden proces) - produkcja: gunicorn -c gunicorn.conf.py wsgi:app
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,127 @@
+"""
+Booking Verifier - Sprawdzenie zapisanej wizyty w tle
+Potwierdzenie dla klienta opiera się na odpowiedzi events.insert (ID wydarzenia),
+bez czekania. Po BOOKING_VERIFY_DELAY sekundach wątek w tle pobiera wydarzenie
+po ID (events.get) i sprawdza godzinę - dodatkowa wiadomość do klienta idzie
+tylko wtedy, gdy wizyty w kalendarzu nie ma albo jest na inną godzinę.
+"""
+
+import logging
+import os
+import threading
+from datetime import datetime
+
+import metrics
+from calendar_service import get_event
+
+logger = logging.getLogger(__name__)
+
+# ==============================================
+# KONFIGURACJA
+# ==============================================
+
+BOOKING_VERIFY_ENABLED = os.getenv('BOOKING_VERIFY_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+BOOKING_VERIFY_DELAY = float(os.getenv('BOOKING_VERIFY_DELAY', '5'))
+BOOKING_TIME_TOLERANCE = 300     # ±5 minut, jak w verify_appointment_exists
+
+FAILURE_MESSAGE = ("⚠️ Przepraszam, nie udało się potwierdzić Twojej wizyty ({when}) w kalendarzu salonu.\n"
+                   "📞 Proszę zadzwoń bezpośrednio do salonu: 123-456-789")
+
+# Wyniki sprawdzenia
+VERIFIED = 'ok'
+MISSING = 'missing'        # wydarzenia nie ma (usunięte / nie zapisane)
+MISMATCH = 'mismatch'      # wydarzenie jest, ale na inną godzinę
+UNKNOWN = 'error'          # błąd API - bez wiadomości do klienta
+
+BOOKING_VERIFICATIONS = metrics.counter(
+    'bot_booking_verifications_total', 'Sprawdzenia zapisanych wizyt w tle', ('result',)
+)
+
+class BookingVerifier:
+    """Opóźnione sprawdzenie wizyty po ID + wiadomość do klienta tylko przy problemie"""
+
+    def __init__(self, get_event_func=get_event, delay=BOOKING_VERIFY_DELAY, notify_func=None):
+        """
+        Args:
+            get_event_func: (event_id) -> dict|None
+            notify_func: (user_id, text) -> wysyłka dodatkowej wiadomości (rejestruje backend)
+        """
+        self.get_event_func = get_event_func
+        self.delay = delay
+        self.notify_func = notify_func
+        self._stats = {'scheduled': 0, VERIFIED: 0, MISSING: 0, MISMATCH: 0, UNKNOWN: 0, 'notified': 0}
+        self._lock = threading.Lock()
+
+    def set_notifier(self, notify_func):
+        self.notify_func = notify_func
+
+    def schedule(self, user_id, event_id, appointment_datetime):
+        """Sprawdź wizytę w tle po `delay` sekundach (nie blokuje odpowiedzi)"""
+        timer = threading.Timer(self.delay, self.verify, args=(user_id, event_id, appointment_datetime))
+        timer.daemon = True
+        timer.start()
+        with self._lock:
+            self._stats['scheduled'] += 1
+        return timer
+
+    def verify(self, user_id, event_id, appointment_datetime):
+        """
+        Sprawdź wizytę teraz
+
+        Returns:
+            str: VERIFIED / MISSING / MISMATCH / UNKNOWN
+        """
+        try:
+            event = self.get_event_func(event_id)
+            result = self._check(event, appointment_datetime)
+        except Exception as e:
+            logger.error(f"❌ Weryfikacja wizyty {event_id} nieudana: {e}")
+            result = UNKNOWN
+
+        BOOKING_VERIFICATIONS.inc(result=result)
+        with self._lock:
+            self._stats[result] += 1
+
+        if result in (MISSING, MISMATCH):
+            logger.error(f"❌ Wizyta {event_id} dla {user_id} nie zgadza się z kalendarzem ({result})")
+            self._notify(user_id, FAILURE_MESSAGE.format(when=appointment_datetime.strftime('%d.%m.%Y %H:%M')))
+        elif result == VERIFIED:
+            logger.info(f"✅ Wizyta zweryfikowana w tle: {event_id}")
+        return result
+
+    def _check(self, event, appointment_datetime):
+        if not event:
+            return MISSING
+        event_start = event.get('start', {}).get('dateTime')
+        if not event_start:
+            return MISMATCH
+        event_datetime = datetime.fromisoformat(event_start.replace('Z', '+00:00'))
+        if abs((event_datetime - appointment_datetime).total_seconds()) > BOOKING_TIME_TOLERANCE:
+            return MISMATCH
+        return VERIFIED
+
+    def _notify(self, user_id, text):
+        if self.notify_func is None:
+            logger.warning(f"⚠️ Brak kanału wiadomości dodatkowych - klient {user_id} nie został powiadomiony")
+            return
+        try:
+            self.notify_func(user_id, text)
+            with self._lock:
+                self._stats['notified'] += 1
+        except Exception as e:
+            logger.error(f"❌ Błąd wysyłania wiadomości o wizycie do {user_id}: {e}")
+
+    def get_stats(self):
+        with self._lock:
+            return dict(self._stats, enabled=BOOKING_VERIFY_ENABLED, delay_s=self.delay)
+
+_booking_verifier = None
+_booking_verifier_lock = threading.Lock()
+
+def get_booking_verifier():
+    """Wspólny weryfikator wizyt procesu (singleton)"""
+    global _booking_verifier
+    with _booking_verifier_lock:
+        if _booking_verifier is None:
+            _booking_verifier = BookingVerifier()
+        return _booking_verifier
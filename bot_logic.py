@@ -10,6 +10,7 @@ import pytz
 from together import Together
 import os
 from calendar_service import get_available_slots, create_appointment, cancel_appointment
+from state_backend import get_store
 
 logger = logging.getLogger(__name__)
 
@@ -21,9 +22,18 @@ logger = logging.getLogger(__name__)
 api_key = os.getenv('TOGETHER_API_KEY')
 if not api_key:
     logger.error("BŁĄD: Brak zmiennej środowiskowej TOGETHER_API_KEY")
-    raise Exception("Brak Together API key")
 
-client = Together(api_key=api_key)
+# Klient tworzony przy pierwszym użyciu - import nie może się wywrócić
+client = None
+
+def get_ai_client():
+    """Pobierz (i przy pierwszym użyciu utwórz) klienta Together"""
+    global client
+    if client is None:
+        if not api_key:
+            raise Exception("Brak Together API key")
+        client = Together(api_key=api_key)
+    return client
 
 # PROMPT SYSTEMOWY
 SYSTEM_PROMPT = """
@@ -84,7 +94,8 @@ Odpowiedz naturalnie i profesjonalnie na pytanie klienta.
 # SYSTEM SESJI UŻYTKOWNIKÓW
 # ==============================================
 
-user_sessions = {}
+# Pamięć w procesie albo wspólny SQLite - patrz STATE_BACKEND
+user_sessions = get_store('user_sessions')
 
 class UserSession:
     def __init__(self, user_id):
@@ -121,11 +132,10 @@ class UserSession:
         return (datetime.now() - self.last_activity).total_seconds() > (minutes * 60)
 
 def get_user_session(user_id):
-    """Pobierz lub utwórz sesję użytkownika"""
-    if user_id not in user_sessions:
-        user_sessions[user_id] = UserSession(user_id)
-    
-    session = user_sessions[user_id]
+    """Pobierz lub utwórz sesję użytkownika (po zmianach zapisz przez save_user_session)"""
+    session = user_sessions.get(user_id)
+    if session is None:
+        session = UserSession(user_id)
     
     # Sprawdź czy sesja nie wygasła
     if session.is_expired():
@@ -134,6 +144,10 @@ def get_user_session(user_id):
     
     return session
 
+def save_user_session(session):
+    """Zapisz sesję w store (wymagane przy współdzielonym stanie między procesami)"""
+    user_sessions[session.user_id] = session
+
 def cleanup_expired_sessions():
     """Usuń wygasłe sesje (wywołuj okresowo)"""
     expired_users = [
@@ -149,6 +163,57 @@ def cleanup_expired_sessions():
 # PARSOWANIE WIADOMOŚCI
 # ==============================================
 
+# Dzień, o który pyta klient -> forma przyjmowana przez format_available_slots
+REQUESTED_DAY_PATTERNS = [
+    (r'pojutrze', 'pojutrze'),
+    (r'jutro|jutra', 'jutro'),
+    (r'dzisiaj|dziś|dzis', 'dzisiaj'),
+    (r'poniedziałek|poniedzialek|pon', 'poniedziałek'),
+    (r'wtorek|wt', 'wtorek'),
+    (r'środa|środę|środy|sroda|srode|srody|śr', 'środa'),
+    (r'czwartek|czw', 'czwartek'),
+    (r'piątek|piatek|pt', 'piątek'),
+    (r'sobota|sobotę|sobote|soboty|sob', 'sobota'),
+]
+_REQUESTED_DAY_RULES = [(re.compile(rf'\b(?:{pattern})\b'), day) for pattern, day in REQUESTED_DAY_PATTERNS]
+
+def extract_requested_day(message):
+    """
+    Jednoznaczny dzień z pytania o terminy
+
+    Returns:
+        str|None: 'dzisiaj', 'jutro', 'pojutrze' albo dzień tygodnia (pon-sob);
+        None gdy dnia nie ma, jest ich kilka albo to niedziela
+    """
+    message_lower = message.lower()
+    if 'niedziel' in message_lower:
+        return None
+    days = {day for rule, day in _REQUESTED_DAY_RULES if rule.search(message_lower)}
+    return days.pop() if len(days) == 1 else None
+
+# Słowa kluczowe usług -> nazwa usługi (jak w SERVICE_CONFIG kalendarza)
+SERVICE_KEYWORDS = {
+    'strzyżenie męskie': 'Strzyżenie męskie',
+    'strzyżenie damskie': 'Strzyżenie damskie',
+    'strzyżenie': 'Strzyżenie',
+    'strzyenie': 'Strzyżenie',  # literówka
+    'farbowanie': 'Farbowanie',
+    'farba': 'Farbowanie',
+    'pasemka': 'Pasemka',
+    'refleksy': 'Refleksy',
+    'koloryzacja': 'Koloryzacja',
+    'ombre': 'Ombre',
+    'baleyage': 'Baleyage'
+}
+
+def extract_service(message):
+    """Usługa wspomniana w wiadomości albo None"""
+    message_lower = message.lower()
+    for service_key, service_value in SERVICE_KEYWORDS.items():
+        if service_key in message_lower:
+            return service_value
+    return None
+
 def parse_booking_message(message):
     """Wyciągnij szczegóły rezerwacji z wiadomości"""
     try:
@@ -196,25 +261,7 @@ def parse_booking_message(message):
                     break
                     
         # Znajdź usługę
-        services_map = {
-            'strzyżenie męskie': 'Strzyżenie męskie',
-            'strzyżenie damskie': 'Strzyżenie damskie',
-            'strzyżenie': 'Strzyżenie',
-            'strzyenie': 'Strzyżenie',  # literówka
-            'farbowanie': 'Farbowanie',
-            'farba': 'Farbowanie',
-            'pasemka': 'Pasemka',
-            'refleksy': 'Refleksy',
-            'koloryzacja': 'Koloryzacja',
-            'ombre': 'Ombre',
-            'baleyage': 'Baleyage'
-        }
-        
-        service = 'Strzyżenie'  # domyślnie
-        for service_key, service_value in services_map.items():
-            if service_key in message_lower:
-                service = service_value
-                break
+        service = extract_service(message_lower) or 'Strzyżenie'  # domyślnie
                 
         if day and time:
             return {
@@ -392,9 +439,17 @@ def process_user_message(user_message, user_id=None):
     """
     GŁÓWNA FUNKCJA - Przetwórz wiadomość użytkownika z AI Intent Router
     """
+    # Pobierz sesję użytkownika
+    session = get_user_session(user_id) if user_id else None
+    try:
+        return _process_with_session(user_message, session)
+    finally:
+        if session:
+            save_user_session(session)
+
+def _process_with_session(user_message, session):
+    """Obsługa wiadomości dla pobranej sesji (zmiany sesji zapisuje process_user_message)"""
     try:
-        # Pobierz sesję użytkownika
-        session = get_user_session(user_id) if user_id else None
         user_message = user_message.strip()
         
         logger.info(f"🤖 Przetwarzam: '{user_message}' | Sesja: {session.state if session else 'brak'}")
@@ -464,13 +519,14 @@ def process_user_message(user_message, user_id=None):
         # 3. ASK_AVAILABILITY - pytanie o dostępne terminy
         elif intent == "ASK_AVAILABILITY":
             day_mentioned = extract_day_from_message(user_message)
+            service_mentioned = extract_service(user_message)  # limit klientów tej usługi
             
             try:
                 if day_mentioned:
                     # 🔧 NOWE - pobierz WSZYSTKIE terminy dla konkretnego dnia
                     from calendar_service import get_available_slots_for_day
                     
-                    slots = get_available_slots_for_day(day_mentioned)
+                    slots = get_available_slots_for_day(day_mentioned, service_type=service_mentioned)
                     
                     if slots:
                         day_display = day_mentioned.capitalize()
@@ -495,7 +551,7 @@ def process_user_message(user_message, user_id=None):
                 
                 else:
                     # Pytanie ogólne - użyj obecnej logiki
-                    slots = get_available_slots(days_ahead=10)
+                    slots = get_available_slots(days_ahead=10, service_type=service_mentioned)
                     
                     if slots:
                         # Pogrupuj po dniach i pokaż po kilka z każdego
@@ -526,7 +582,7 @@ def process_user_message(user_message, user_id=None):
         # 4. WANT_APPOINTMENT - ogólne "chcę się umówić"
         elif intent == "WANT_APPOINTMENT":
             try:
-                slots = get_available_slots(days_ahead=10)
+                slots = get_available_slots(days_ahead=10, service_type=extract_service(user_message))
                 if slots:
                     if session:
                         session.state = "booking"
@@ -597,13 +653,12 @@ def extract_day_from_message(message):
             return day_value
     return None
 
-def get_ai_response(user_message):
-    """Standardowa odpowiedź AI"""
-    message_lower = user_message.lower().strip()
-    
-        # 🔧 NOWE - SZYBKIE ODPOWIEDZI NA MENU
-    quick_responses = {
-        'jakie usługi oferujecie': """✂️ **NASZE USŁUGI:**
+# ===========================================
+# SZYBKIE ODPOWIEDZI (LOKALNE, BEZ LLM)
+# ===========================================
+
+QUICK_RESPONSES = {
+    'jakie usługi oferujecie': """✂️ **NASZE USŁUGI:**
 
     **STRZYŻENIE:**
     • Damskie: 80-120 zł
@@ -617,7 +672,7 @@ def get_ai_response(user_message):
 
     💫 **Chcesz się umówić?** Napisz: *'chcę się umówić'* 📅""",
 
-            'gdzie jesteście': """📍 **LOKALIZACJA:**
+    'gdzie jesteście': """📍 **LOKALIZACJA:**
 
     🏢 **Salon Fryzjerski "Kleopatra"**
     📮 ul. Piękna 15, 00-001 Warszawa
@@ -630,7 +685,7 @@ def get_ai_response(user_message):
 
     💫 **Chcesz się umówić?** Napisz: *'chcę się umówić'* 📅""",
 
-            'godziny otwarcia': """🕐 **GODZINY OTWARCIA:**
+    'godziny otwarcia': """🕐 **GODZINY OTWARCIA:**
 
     📅 **Poniedziałek-Piątek:** 9:00-19:00
     📅 **Sobota:** 9:00-16:00  
@@ -641,7 +696,7 @@ def get_ai_response(user_message):
 
     💫 **Chcesz się umówić?** Napisz: *'chcę się umówić'* 📅""",
 
-            'kontakt': """📞 **KONTAKT:**
+    'kontakt': """📞 **KONTAKT:**
 
     ☎️ **Telefon:** 123-456-789
     📧 **Email:** kontakt@salon-kleopatra.pl
@@ -652,12 +707,57 @@ def get_ai_response(user_message):
     🕐 **Godziny:** Pon-Pt 9:00-19:00, Sob 9:00-16:00
 
     💫 **Chcesz się umówić?** Napisz: *'chcę się umówić'* 📅"""
-        }
-        
-        # Sprawdź szybkie odpowiedzi
-    for phrase, response in quick_responses.items():
-        if phrase in message_lower:
-            return response
+}
+
+# Inne sformułowania tych samych pytań FAQ
+QUICK_RESPONSE_ALIASES = {
+    'cennik': 'jakie usługi oferujecie',
+    'ceny': 'jakie usługi oferujecie',
+    'ile kosztuje': 'jakie usługi oferujecie',
+    'jakie usługi': 'jakie usługi oferujecie',
+    'adres': 'gdzie jesteście',
+    'jak dojechać': 'gdzie jesteście',
+    'godziny pracy': 'godziny otwarcia',
+    'czy jesteście otwarci': 'godziny otwarcia',
+    'numer telefonu': 'kontakt',
+    'jak się skontaktować': 'kontakt'
+}
+
+# Całe słowa - "ceny" nie pasuje do "wyceny", "adres" do "adresat"
+_QUICK_RESPONSE_RULES = [(re.compile(rf'\b{re.escape(phrase)}\b'), phrase) for phrase in QUICK_RESPONSES] + [
+    (re.compile(rf'\b{re.escape(alias)}\b'), phrase) for alias, phrase in QUICK_RESPONSE_ALIASES.items()
+]
+
+def get_quick_response(message, aliases=True):
+    """
+    Gotowa odpowiedź FAQ dla wiadomości (usługi, lokalizacja, godziny, kontakt)
+
+    Args:
+        aliases (bool): Frazy i aliasy jako całe słowa (router, admission); False - tylko
+                        frazy z QUICK_RESPONSES jak dawniej w get_ai_response
+
+    Returns:
+        str|None: Odpowiedź albo None gdy wiadomość nie pasuje do FAQ
+    """
+    message_lower = message.lower().strip()
+    if not aliases:
+        for phrase, response in QUICK_RESPONSES.items():
+            if phrase in message_lower:
+                return response
+        return None
+    for rule, phrase in _QUICK_RESPONSE_RULES:
+        if rule.search(message_lower):
+            return QUICK_RESPONSES[phrase]
+    return None
+
+def get_ai_response(user_message):
+    """Standardowa odpowiedź AI"""
+    message_lower = user_message.lower().strip()
+    
+    # 🔧 SZYBKIE ODPOWIEDZI NA MENU (bez LLM)
+    quick_response = get_quick_response(message_lower, aliases=False)
+    if quick_response:
+        return quick_response
         
 
     try:
@@ -666,7 +766,7 @@ def get_ai_response(user_message):
             {"role": "user", "content": user_message}
         ]
         
-        response = client.chat.completions.create(
+        response = get_ai_client().chat.completions.create(
             model="deepseek-ai/DeepSeek-R1-Distill-Llama-70B-free",  # ← POWRÓT DO R1
             messages=messages,
             max_tokens=600,
@@ -1031,8 +1131,10 @@ def get_session_info(user_id):
 
 def reset_user_session(user_id):
     """Resetuj sesję użytkownika"""
-    if user_id in user_sessions:
-        user_sessions[user_id].reset()
+    session = user_sessions.get(user_id)
+    if session:
+        session.reset()
+        save_user_session(session)
         return True
     return False
 
@@ -4,11 +4,25 @@ Bot Logic AI - Uproszczona wersja z TYLKO używanymi funkcjami
 
 import logging
 import re
+import threading
+import time
 from datetime import datetime, timedelta
 import pytz
 from together import Together
 import os
-from calendar_service import format_available_slots, create_appointment, cancel_appointment, verify_appointment_exists
+from calendar_service import format_available_slots, create_appointment, cancel_appointment
+from booking_verifier import BOOKING_VERIFY_ENABLED, get_booking_verifier
+from bot_logic import extract_service
+from state_backend import get_store
+from conversation_store import CONVERSATION_SWEEP_INTERVAL, create_conversation_store
+from conversation_window import trim_history
+from answer_cache import BOOKING_MARKERS, get_answer_cache, is_cacheable_turn
+from router import ROUTE_AVAILABILITY, ROUTE_CACHE, ROUTE_LLM, record_turn, route_message
+from response_cleaner import DEFAULT_RESPONSE, clean_response
+from llm_stream import stream_completion
+from llm_client import LLMClient, LLMUnavailable
+from slot_prefetch import SLOT_PREFETCH_ENABLED, SlotPrefetcher
+import metrics
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -22,41 +36,155 @@ logger = logging.getLogger(__name__)
 api_key = os.getenv('TOGETHER_API_KEY')
 if not api_key:
     logger.error("BŁĄD: Brak zmiennej środowiskowej TOGETHER_API_KEY")
-    raise Exception("Brak Together API key")
 
-client = Together(api_key=api_key)
+TOGETHER_TIMEOUT = float(os.getenv('TOGETHER_TIMEOUT', '60'))
+TOGETHER_MODEL = "deepseek-ai/DeepSeek-R1-Distill-Llama-70B-free"
+TOGETHER_STREAMING = os.getenv('TOGETHER_STREAMING', 'true').lower() in ('1', 'true', 'yes')
+
+TOGETHER_LATENCY = metrics.histogram(
+    'bot_together_completion_seconds', 'Czas odpowiedzi Together (chat.completions)', ('model', 'outcome')
+)
+TOGETHER_TOKENS = metrics.counter(
+    'bot_together_tokens_total', 'Tokeny zużyte w Together', ('model', 'type')
+)
+
+# Klient tworzony leniwie (albo w fazie warmup backendu) - import nie może się wywrócić
+client = None
+_client_lock = threading.Lock()
+
+def get_ai_client():
+    """Pobierz (i przy pierwszym użyciu utwórz) klienta Together"""
+    global client
+    if client is None:
+        with _client_lock:
+            if client is None:
+                if not api_key:
+                    raise Exception("Brak Together API key")
+                client = Together(api_key=api_key, timeout=TOGETHER_TIMEOUT)
+                logger.info("✅ Klient Together zainicjalizowany")
+    return client
+
+# Semafor, termin, ponowienia i bezpiecznik wokół klienta Together
+llm_client = LLMClient(get_ai_client, TOGETHER_MODEL)
+
+# Terminy pobierane w tle równolegle z LLM (lambda - format_available_slots czytane przy wywołaniu)
+slot_prefetcher = SlotPrefetcher(lambda day, service_type: format_available_slots(day, service_type=service_type))
+
+LLM_UNAVAILABLE_REPLY = ("⏳ Przepraszam, asystent jest chwilowo przeciążony. Napisz ponownie za kilka minut "
+                         "albo zadzwoń do salonu: 123-456-789 😊")
+
+def llm_in_flight():
+    """Liczba wywołań LLM w toku (dla kontroli przyjęć i /metrics)"""
+    return llm_client.in_flight()
+
+# ==============================================
+# WYWOŁANIE LLM
+# ==============================================
+
+def call_llm(messages, max_tokens=700, temperature=0.2):
+    """
+    Wywołaj Together i zwróć surowy tekst odpowiedzi
+
+    W trybie TOGETHER_STREAMING tokeny czytane są na bieżąco, <think> odrzucany
+    przyrostowo, a zapytanie kończy się po kompletnej komendzie sterującej.
+    Wywołanie idzie przez llm_client (limit równoległości, termin, ponowienia,
+    bezpiecznik, model zapasowy) - przy niedostępności LLMUnavailable.
+    """
+    def complete(client, model, timeout):
+        with TOGETHER_LATENCY.time(model=model, outcome='error') as call:
+            if TOGETHER_STREAMING:
+                result = stream_completion(client, model, messages, max_tokens, temperature, timeout=timeout)
+                call['outcome'] = result.stop_reason or 'ok'
+                if result.usage is None:
+                    # Przerwany strumień nie ma podsumowania - fragment strumienia ≈ token
+                    TOGETHER_TOKENS.inc(result.chunks, model=model, type='completion')
+                record_token_usage(result, model)
+                return result.text
+
+            response = client.chat.completions.create(
+                model=model,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                timeout=timeout
+            )
+            call['outcome'] = 'ok'
+        record_token_usage(response, model)
+        return response.choices[0].message.content
+
+    return llm_client.execute(complete)
+
+def record_token_usage(response, model=TOGETHER_MODEL):
+    """Zapisz zużycie tokenów z odpowiedzi Together do /metrics"""
+    usage = getattr(response, 'usage', None)
+    if usage is None:
+        return
+    for token_type in ('prompt_tokens', 'completion_tokens'):
+        count = getattr(usage, token_type, None)
+        if count:
+            TOGETHER_TOKENS.inc(count, model=model, type=token_type.split('_')[0])
 
 # ==============================================
 # HISTORIA UŻYTKOWNIKÓW
 # ==============================================
 
-user_conversations = {}
+# Pamięć w procesie albo wspólny SQLite - patrz STATE_BACKEND
+user_conversations = create_conversation_store('user_conversations')   # TTL + limit pamięci
+user_activity = get_store('user_activity')      # user_id -> czas ostatniej wiadomości
+
+# Okno "aktywnych" użytkowników - starsze wpisy aktywności są usuwane
+USER_ACTIVITY_WINDOW = float(os.getenv('USER_ACTIVITY_WINDOW', '3600'))
+_activity_swept_at = 0.0
+
+def record_activity(user_id):
+    """Zapisz czas wiadomości; co CONVERSATION_SWEEP_INTERVAL usuń wpisy spoza okna"""
+    global _activity_swept_at
+    now = time.time()
+    user_activity[user_id] = now
+    if now - _activity_swept_at >= CONVERSATION_SWEEP_INTERVAL:
+        _activity_swept_at = now
+        expire_activity()
+
+def expire_activity(max_idle=USER_ACTIVITY_WINDOW):
+    """
+    Usuń wpisy aktywności starsze niż max_idle sekund (store nie rośnie bez końca)
+
+    Returns:
+        int: Liczba usuniętych wpisów
+    """
+    if hasattr(user_activity, 'expire_idle'):
+        return user_activity.expire_idle(max_idle)
+    cutoff = time.time() - max_idle
+    expired = 0
+    for user_id, last_seen in list(user_activity.items()):
+        # Ponowne sprawdzenie - użytkownik mógł właśnie napisać
+        if last_seen < cutoff and user_activity.get(user_id) == last_seen:
+            user_activity.pop(user_id, None)
+            expired += 1
+    return expired
 
 def get_user_history(user_id):
     """Pobierz historię rozmowy użytkownika"""
-    if user_id not in user_conversations:
-        user_conversations[user_id] = []
-    return user_conversations[user_id]
+    return list(user_conversations.get(user_id, []))
 
 def add_to_history(user_id, role, message):
-    """Dodaj wiadomość do historii"""
-    history = get_user_history(user_id)
-    history.append({"role": role, "content": message})
-    logger.info(f"📝 Dodano do historii {role}: '{message[:50]}...' (historia: {len(history)} wiadomości)")
+    """Dodaj wiadomość do historii (atomowo - także przy wielu procesach)"""
+    def append(history):
+        history.append({"role": role, "content": message})
+        # Budżet tokenów: starsze tury do podsumowania, zużyte listy terminów skrócone
+        return trim_history(history)
     
-    # Ogranicz historię do ostatnich 20 wiadomości
-    if len(history) > 20:
-        user_conversations[user_id] = history[-20:]
-        logger.info(f"📚 Skrócono historię do 20 wiadomości")
+    history = user_conversations.update_value(user_id, append, list)
+    logger.info(f"📝 Dodano do historii {role}: '{message[:50]}...' (historia: {len(history)} wiadomości)")
 
 # ==============================================
 # FUNKCJA DATY
 # ==============================================
 
-def get_current_date_info():
+def get_current_date_info(now=None):
     """Zwraca aktualną datę i czas dla AI"""
     tz = pytz.timezone('Europe/Warsaw')
-    now = datetime.now(tz)
+    now = now or datetime.now(tz)
     
     # Mapowanie angielskich na polskie nazwy
     day_names = {
@@ -107,179 +235,12 @@ MAPOWANIE WZGLĘDNYCH DAT:
 - Gdy klient pyta o "pojutrze" = {day_names.get((now + timedelta(days=2)).strftime('%A'), 'pojutrze')}"""
 
 # ==============================================
-# CZYSZCZENIE ODPOWIEDZI AI
+# PROMPT SYSTEMOWY
 # ==============================================
 
-def clean_thinking_response_enhanced(response_text):
-    """Usuwa procesy myślowe i znajduje prawdziwą odpowiedź"""
-    if not response_text:
-        return ""
-        
-    original = response_text
-    cleaned = response_text
-    
-    # 1. USUŃ THINKING BLOKI
-    cleaned = re.sub(r'<think>.*?</think>', '', cleaned, flags=re.DOTALL | re.IGNORECASE)
-    cleaned = re.sub(r'<thinking>.*?</thinking>', '', cleaned, flags=re.DOTALL | re.IGNORECASE)
-    
-    # 2. USUŃ NIEDOMKNIĘTE THINKING TAGI
-    cleaned = re.sub(r'<think[^>]*>.*?$', '', cleaned, flags=re.DOTALL | re.IGNORECASE)
-    cleaned = re.sub(r'<thinking[^>]*>.*?$', '', cleaned, flags=re.DOTALL | re.IGNORECASE)
-    
-    # 3. USUŃ WSZYSTKIE TAGI HTML
-    cleaned = re.sub(r'<[^>]*>', '', cleaned)
-    
-    # 🔧 4. USUŃ PROCESY MYŚLOWE AI (AGRESYWNE REGUŁY):
-    thinking_patterns = [
-        r'Okay, I need to handle.*?(?=\n[A-ZĄĆĘŁŃÓŚŹŻ]|$)',
-        r'First, I remember.*?(?=\n[A-ZĄĆĘŁŃÓŚŹŻ]|$)',
-        r'The client wrote.*?(?=\n[A-ZĄĆĘŁŃÓŚŹŻ]|$)',
-        r'I should start with.*?(?=\n[A-ZĄĆĘŁŃÓŚŹŻ]|$)',
-        r'Then, on the next line.*?(?=\n[A-ZĄĆĘŁŃÓŚŹŻ]|$)',
-        r'But wait, the system.*?(?=\n[A-ZĄĆĘŁŃÓŚŹŻ]|$)',
-        r'So, the correct command.*?(?=\n[A-ZĄĆĘŁŃÓŚŹŻ]|$)',
-        r'Putting it all together.*?(?=\n[A-ZĄĆĘŁŃÓŚŹŻ]|$)',
-        r'That should correctly.*?(?=\n[A-ZĄĆĘŁŃÓŚŹŻ]|$)',
-        r'which means.*?(?=\n[A-ZĄĆĘŁŃÓŚŹŻ]|$)',
-        r'Since tomorrow is.*?(?=\n[A-ZĄĆĘŁŃÓŚŹŻ]|$)',
-        r'my response will be.*?(?=\n[A-ZĄĆĘŁŃÓŚŹŻ]|$)',
-        r'trigger the system.*?(?=\n[A-ZĄĆĘŁŃÓŚŹŻ]|$)',
-        r'so earlier times.*?(?=\n[A-ZĄĆĘŁŃÓŚŹŻ]|$)',
-        r'So, in this case.*?(?=\n[A-ZĄĆĘŁŃÓŚŹŻ]|$)',
-        r'Wait, but the example.*?(?=\n[A-ZĄĆĘŁŃÓŚŹŻ]|$)',
-        r'Therefore, I should.*?(?=\n[A-ZĄĆĘŁŃÓŚŹŻ]|$)',
-        r'applying that logic.*?(?=\n[A-ZĄĆĘŁŃÓŚŹŻ]|$)',
-        r'since it\'s \d+:\d+.*?(?=\n[A-ZĄĆĘŁŃÓŚŹŻ]|$)',
-        r'Therefore, the available.*?(?=\n[A-ZĄĆĘŁŃÓŚŹŻ]|$)',
-        r'would be from.*?(?=\n[A-ZĄĆĘŁŃÓŚŹŻ]|$)',
-        r'as the next day.*?(?=\n[A-ZĄĆĘŁŃÓŚŹŻ]|$)',
-        r'in 30-minute.*?(?=\n[A-ZĄĆĘŁŃÓŚŹŻ]|$)',
-        r'but only the ones.*?(?=\n[A-ZĄĆĘŁŃÓŚŹŻ]|$)',
-    ]
-    
-    for pattern in thinking_patterns:
-        cleaned = re.sub(pattern, '', cleaned, flags=re.DOTALL | re.IGNORECASE)
-    
-    # 5. USUŃ LINIE ZACZYNAJĄCE SIĘ OD TYPOWYCH FRAZ AI
-    thinking_lines = [
-        r'^Okay, I need to.*$',
-        r'^First, I remember.*$',
-        r'^The client wrote.*$',
-        r'^I should start.*$',
-        r'^Then, on the next.*$',
-        r'^But wait, the system.*$',
-        r'^So, the correct.*$',
-        r'^Putting it all.*$',
-        r'^That should correctly.*$',
-        r'^which means.*$',
-        r'^Since tomorrow is.*$',
-        r'^my response will be.*$',
-        r'^trigger the system.*$',
-        r'^s \d+:\d+.*$',
-        r'^So, .*$',
-        r'^Wait, .*$',
-        r'^Therefore, .*$',
-        r'^Since .*$',
-        r'^Looking at .*$',
-        r'^Based on .*$',
-        r'^Given that .*$',
-        r'^This means .*$',
-        r'^The logic .*$',
-        r'^I need to .*$',
-        r'^Let me .*$',
-        r'^which is .*$',
-        r'^from \d+:\d+ AM.*$',
-        r'^would be:.*$',
-        r'^as the next day.*$',
-        r'^in 30-minute.*$',
-        r'^but only the ones.*$',
-    ]
-    
-    lines = cleaned.split('\n')
-    filtered_lines = []
-    
-    for line in lines:
-        skip_line = False
-        for pattern in thinking_lines:
-            if re.match(pattern, line.strip(), re.IGNORECASE):
-                skip_line = True
-                break
-        if not skip_line:
-            filtered_lines.append(line)
-    
-    cleaned = '\n'.join(filtered_lines)
-    
-    # 6. USUŃ TYPOWE AI INTRO PHRASES (TYLKO NA POCZĄTKU)
-    intro_phrases = [
-        r'^okay,?\s+so.*?[.!]\s*',
-        r'^let\s+me\s+go\s+through.*?[.!]\s*',
-        r'^i\s+need\s+to\s+analyze.*?[.!]\s*',
-        r'^looking\s+at\s+this\s+message.*?[.!]\s*'
-    ]
-    
-    for phrase in intro_phrases:
-        cleaned = re.sub(phrase, '', cleaned, flags=re.IGNORECASE)
-    
-    # 7. USUŃ POJEDYNCZE KATEGORIE AI
-    single_word_categories = ["CONTACT_DATA", "BOOKING", "ASK_AVAILABILITY", "WANT_APPOINTMENT", "CANCEL_VISIT", "OTHER_QUESTION"]
-    
-    cleaned_stripped = cleaned.strip()
-    if cleaned_stripped in single_word_categories:
-        logger.warning(f"⚠️ AI zwróciło tylko kategorię: {cleaned_stripped}")
-        return "Cześć! Jak mogę ci pomóc? 😊"
-    
-    # 8. USUŃ KATEGORIE TYLKO Z POCZĄTKU/KOŃCA LINII
-    for category in single_word_categories:
-        cleaned = re.sub(rf'^{category}[\s\.\-]*', '', cleaned, flags=re.IGNORECASE | re.MULTILINE)
-        cleaned = re.sub(rf'[\s\.\-]*{category}$', '', cleaned, flags=re.IGNORECASE | re.MULTILINE)
-    
-    # 9. WYCZYŚĆ PUSTE LINIE I BIAŁE ZNAKI
-    cleaned = '\n'.join(line.strip() for line in cleaned.split('\n') if line.strip())
-    cleaned = cleaned.strip()
-    
-    # 10. USUŃ TYLKO IDENTYCZNE POWTÓRZENIA CAŁYCH BLOKÓW
-    # Nie usuwaj normalnych linii - tylko rzeczywiste duplikaty
-    
-    # 12. LIMIT ODPOWIEDZI (max 500 znaków dla Facebook)
-    if len(cleaned) > 500:
-        logger.warning(f"⚠️ Skracam długą odpowiedź z {len(cleaned)} do 500 znaków")
-        cleaned = cleaned[:500] + "..."
-    
-    # 13. BLOKADA POWTARZAJĄCYCH SIĘ SEPARATORÓW (KRYTYCZNE!)
-    if '---' in cleaned:
-        logger.warning(f"⚠️ USUWAM WSZYSTKIE SEPARATORY - biorę tylko pierwszą część")
-        parts = cleaned.split('---')
-        cleaned = parts[0].strip()  # TYLKO pierwsza część przed pierwszym ---
-    
-    # 14. JEŚLI PO CZYSZCZENIU NICZEGO NIE MA, ZWRÓĆ DOMYŚLNĄ ODPOWIEDŹ
-    if not cleaned or len(cleaned) < 5:
-        logger.warning(f"⚠️ Pusta odpowiedź po czyszczeniu z: '{original[:100]}...'")
-        return "Cześć! Jak mogę ci pomóc? 😊"
-    
-    return cleaned
-
-# ==============================================
-# GŁÓWNA FUNKCJA - TYLKO TA JEDNA JEST UŻYWANA
-# ==============================================
-
-def process_user_message_smart(user_message, user_id):
-    """INTELIGENTNY SYSTEM - TYLKO AI Z PAMIĘCIĄ + KALENDARZ + DATA"""
-    
-    # 🔧 OBSŁUGA PUSTYCH WIADOMOŚCI:
-    if not user_message or not user_message.strip():
-        return "Cześć! Jak mogę ci pomóc? 😊"
-    
-    # Pobierz historię
-    history = get_user_history(user_id)
-    add_to_history(user_id, "user", user_message)
-    
-    # 🔧 POBIERZ AKTUALNĄ DATĘ Z OSOBNEJ FUNKCJI
-    current_date_info = get_current_date_info()
-    
-    # ZAAWANSOWANY SYSTEM PROMPT Z DATĄ
-    system_prompt = f"""Jesteś asystentem salonu fryzjerskiego "Kleopatra".
-
-{current_date_info}
+# Stała część - identyczna dla każdej wiadomości, więc cache prefiksu po stronie
+# dostawcy (prompt/KV cache) może ją ponownie wykorzystać. Data idzie na koniec.
+SYSTEM_PROMPT_STATIC = """Jesteś asystentem salonu fryzjerskiego "Kleopatra".
 
 🚨 KRYTYCZNE ZASADY:
 - NIE używaj tagów <think>, <thinking> ani nie pokazuj procesu myślowego!
@@ -603,15 +564,147 @@ TYLKO jeśli wszystkie 5 punktów są ✅ - rób rezerwację!
 JEŚLI którykolwiek jest ❌ - poproś o brakujące dane!
 📞 TELEFON: sprawdź czy ma dokładnie 9 cyfr!"""
 
+_date_block_cache = (None, None)     # (klucz minuty, blok daty)
+_prompt_stats_lock = threading.Lock()
+_prompt_stats = {
+    'builds': 0,
+    'date_block_hits': 0,
+    'date_block_misses': 0,
+    'build_time_total': 0.0
+}
+
+PROMPT_BUILD_TIME = metrics.histogram(
+    'bot_system_prompt_build_seconds', 'Czas składania promptu systemowego',
+    buckets=(0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01)
+)
+PROMPT_DATE_BLOCK = metrics.counter(
+    'bot_system_prompt_date_block_total', 'Blok daty z pamięci (hit) lub zbudowany od nowa (miss)', ('result',)
+)
+
+def get_date_block(now=None):
+    """Blok daty zapamiętany na minutę (klucz z datą - nowa doba to nowy klucz)"""
+    global _date_block_cache
+    now = now or datetime.now(pytz.timezone('Europe/Warsaw'))
+    key = now.strftime('%Y-%m-%d %H:%M')
+    cached_key, cached_block = _date_block_cache
+    if cached_key == key:
+        PROMPT_DATE_BLOCK.inc(result='hit')
+        with _prompt_stats_lock:
+            _prompt_stats['date_block_hits'] += 1
+        return cached_block
+
+    block = get_current_date_info(now)
+    _date_block_cache = (key, block)
+    PROMPT_DATE_BLOCK.inc(result='miss')
+    with _prompt_stats_lock:
+        _prompt_stats['date_block_misses'] += 1
+    return block
+
+def build_system_prompt(now=None):
+    """Prompt systemowy: stały prefiks + blok aktualnej daty na końcu"""
+    start = time.perf_counter()
+    prompt = f"{SYSTEM_PROMPT_STATIC}\n\n{get_date_block(now)}"
+    elapsed = time.perf_counter() - start
+    PROMPT_BUILD_TIME.observe(elapsed)
+    with _prompt_stats_lock:
+        _prompt_stats['builds'] += 1
+        _prompt_stats['build_time_total'] += elapsed
+    return prompt
+
+def get_prompt_stats():
+    """Statystyki składania promptu (dla /api/health)"""
+    with _prompt_stats_lock:
+        builds = _prompt_stats['builds']
+        date_block = _date_block_cache[1] or ''
+        total_chars = len(SYSTEM_PROMPT_STATIC) + 2 + len(date_block)
+        return {
+            'builds': builds,
+            'build_time_avg_us': round(_prompt_stats['build_time_total'] / builds * 1e6, 2) if builds else 0.0,
+            'date_block_hits': _prompt_stats['date_block_hits'],
+            'date_block_misses': _prompt_stats['date_block_misses'],
+            'static_prefix_chars': len(SYSTEM_PROMPT_STATIC),
+            # Jaka część promptu jest wspólnym prefiksem (ta sama dla wszystkich wiadomości)
+            'static_prefix_ratio': round(len(SYSTEM_PROMPT_STATIC) / total_chars, 3)
+        }
+
+# ==============================================
+# CZYSZCZENIE ODPOWIEDZI AI
+# ==============================================
+
+def clean_thinking_response_enhanced(response_text):
+    """Usuwa procesy myślowe i znajduje prawdziwą odpowiedź (wzorce prekompilowane w response_cleaner)"""
+    return clean_response(response_text)
+
+# ==============================================
+# GŁÓWNA FUNKCJA - TYLKO TA JEDNA JEST UŻYWANA
+# ==============================================
+
+# Ile ostatnich wiadomości przeszukać, gdy usługa padła wcześniej w rozmowie
+SERVICE_LOOKBACK = 10
+
+def detect_service(user_message, history):
+    """Usługa z wiadomości albo z ostatnich wiadomości klienta - limit klientów przy liście terminów"""
+    service = extract_service(user_message)
+    if service:
+        return service
+    for message in reversed(history[-SERVICE_LOOKBACK:]):
+        if message['role'] == 'user':
+            service = extract_service(message['content'])
+            if service:
+                return service
+    return None
+
+def answer_without_llm(user_id, user_message, response, route):
+    """Odpowiedź lokalna (router / pamięć FAQ) - historia jak po zwykłej turze"""
+    record_turn(route)
+    add_to_history(user_id, "user", user_message)
+    add_to_history(user_id, "assistant", response)
+    return response
+
+def process_user_message_smart(user_message, user_id):
+    """INTELIGENTNY SYSTEM - TYLKO AI Z PAMIĘCIĄ + KALENDARZ + DATA"""
+    
+    # 🔧 OBSŁUGA PUSTYCH WIADOMOŚCI:
+    if not user_message or not user_message.strip():
+        return "Cześć! Jak mogę ci pomóc? 😊"
+    
+    record_activity(user_id)
+    previous_history = get_user_history(user_id)
+
+    # 🔧 SZYBKA ŚCIEŻKA REGEX - terminy na konkretny dzień i FAQ bez wywołania LLM
+    route, route_value = route_message(user_message, previous_history)
+    if route != ROUTE_LLM:
+        if route == ROUTE_AVAILABILITY:
+            local_response = format_available_slots(
+                route_value, service_type=detect_service(user_message, previous_history)
+            )
+        else:
+            local_response = route_value
+        logger.info(f"⚡ Router: '{user_message[:50]}' → {route} (bez LLM)")
+        return answer_without_llm(user_id, user_message, local_response, route)
+
+    # 🔧 PAMIĘĆ ODPOWIEDZI FAQ - tylko pytania FAQ na początku rozmowy (bez kontekstu klienta)
+    answer_cache = get_answer_cache()
+    cacheable = is_cacheable_turn(user_message, previous_history)
+    if cacheable:
+        cached_response = answer_cache.get(user_message)
+        if cached_response:
+            return answer_without_llm(user_id, user_message, cached_response, ROUTE_CACHE)
+
+    # Dodaj wiadomość i pobierz aktualną historię
+    record_turn(ROUTE_LLM)
+    add_to_history(user_id, "user", user_message)
+    history = get_user_history(user_id)
+    
+    # 🔧 PROMPT: STAŁA CZĘŚĆ (wspólny prefiks dla cache dostawcy) + DATA NA KOŃCU
+    system_prompt = build_system_prompt()
+
+    # 🔧 PREFETCH TERMINÓW - wiadomość wskazuje dzień, kalendarz pobierany równolegle z LLM
+    service_type = detect_service(user_message, history)
+    prefetch = slot_prefetcher.start(user_message, service_type) if SLOT_PREFETCH_ENABLED else None
+
     try:
-        response = client.chat.completions.create(
-            model="deepseek-ai/DeepSeek-R1-Distill-Llama-70B-free",
-            messages=[{"role": "system", "content": system_prompt}] + history,
-            max_tokens=700,
-            temperature=0.2
-        )
-        
-        bot_response = response.choices[0].message.content
+        bot_response = call_llm([{"role": "system", "content": system_prompt}] + history)
         logger.info(f"🟡 RAW AI RESPONSE: {bot_response[:1500]}")
         bot_response_original = bot_response
         cleaned_response = clean_thinking_response_enhanced(bot_response)
@@ -625,8 +718,8 @@ JEŚLI którykolwiek jest ❌ - poproś o brakujące dane!
                     day = day_match.group(1).strip()
                     logger.info(f"📅 AI prosi o sprawdzenie terminów na: {day}")
                     
-                    # Wywołaj funkcję kalendarza
-                    availability_result = format_available_slots(day)
+                    # Wywołaj funkcję kalendarza (wynik z prefetchu, jeśli to ten sam dzień)
+                    availability_result = slot_prefetcher.resolve(prefetch, day, service_type)
                     
                     # 🔧 USUŃ KOMENDĘ Z OCZYSZCZONEJ ODPOWIEDZI (jeśli nadal tam jest):
                     natural_response = re.sub(r'CHECK_AVAILABILITY:\w+', '', cleaned_response).strip()
@@ -814,41 +907,22 @@ JEŚLI którykolwiek jest ❌ - poproś o brakujące dane!
                                     appointment_time=appointment_datetime
                                 )
                                 
-                                # 🔧 WERYFIKACJA CZY SPOTKANIE RZECZYWIŚCIE ZOSTAŁO ZAPISANE
+                                # 🔧 POTWIERDZENIE Z ODPOWIEDZI events.insert (ID wydarzenia) - bez czekania
                                 if calendar_result:
-                                    logger.info(f"📅 Próba dodania do kalendarza: {calendar_result}")
-                                    
-                                    # Poczekaj chwilę na synchronizację
-                                    import time
-                                    time.sleep(2)
+                                    logger.info(f"✅ Wizyta zapisana w kalendarzu: {calendar_result}")
+                                    date_display = appointment_datetime.strftime('%A, %d %B %Y o %H:%M')
                                     
-                                    # Zweryfikuj czy spotkanie rzeczywiście istnieje
-                                    verification = verify_appointment_exists(
-                                        client_name=name,
-                                        client_phone=phone,
-                                        appointment_datetime=appointment_datetime,
-                                        service_type=service
-                                    )
+                                    # Zastąp "Rezerwuję wizytę..." potwierdzeniem
+                                    cleaned_response = cleaned_response.replace("📅 Rezerwuję wizytę w kalendarzu...", "")
+                                    cleaned_response = cleaned_response.split('\n')[0]  # Tylko pierwsza linia
+                                    cleaned_response += f"\n\n✅ Wizyta zapisana w kalendarzu!"
+                                    cleaned_response += f"\n📅 Data: {date_display}"
+                                    cleaned_response += f"\n🆔 ID wizyty: {calendar_result[:8]}..."
+                                    cleaned_response += f"\n\n💇‍♂️ Dziękuję! Czekamy na Ciebie w salonie!"
                                     
-                                    if verification:
-                                        logger.info(f"✅ Spotkanie zweryfikowane w kalendarzu: {verification['event_id']}")
-                                        date_display = appointment_datetime.strftime('%A, %d %B %Y o %H:%M')
-                                        
-                                        # Zastąp "Rezerwuję wizytę..." potwierdzeniem
-                                        cleaned_response = cleaned_response.replace("📅 Rezerwuję wizytę w kalendarzu...", "")
-                                        # Usuń starą treść i dodaj tylko weryfikację
-                                        cleaned_response = cleaned_response.split('\n')[0]  # Tylko pierwsza linia
-                                        cleaned_response += f"\n\n✅ Wizyta zapisana w kalendarzu!"
-                                        cleaned_response += f"\n📅 Data: {date_display}"
-                                        cleaned_response += f"\n🆔 ID wizyty: {verification['event_id'][:8]}..."
-                                        cleaned_response += f"\n\n💇‍♂️ Dziękuję! Czekamy na Ciebie w salonie!"
-                                    else:
-                                        logger.error("❌ Spotkanie nie zostało zapisane w kalendarzu!")
-                                        # Usuń "Rezerwuję wizytę..." i zastąp błędem
-                                        cleaned_response = cleaned_response.replace("📅 Rezerwuję wizytę w kalendarzu...", "")
-                                        cleaned_response = cleaned_response.replace("✅ REZERWACJA POTWIERDZONA:", "❌ BŁĄD REZERWACJI:")
-                                        cleaned_response += f"\n\n⚠️ Przepraszam, wystąpił problem z zapisaniem wizyty w kalendarzu."
-                                        cleaned_response += f"\n📞 Proszę zadzwoń bezpośrednio do salonu: 123-456-789"
+                                    # Sprawdzenie w tle (events.get po ID) - wiadomość tylko przy problemie
+                                    if BOOKING_VERIFY_ENABLED:
+                                        get_booking_verifier().schedule(user_id, calendar_result, appointment_datetime)
                                 else:
                                     logger.error("❌ Błąd dodawania do kalendarza")
                                     cleaned_response = cleaned_response.replace("✅ REZERWACJA POTWIERDZONA:", "❌ BŁĄD REZERWACJI:")
@@ -921,18 +995,36 @@ JEŚLI którykolwiek jest ❌ - poproś o brakujące dane!
         
         # Potem dodaj do historii już oczyszczoną wersję
         add_to_history(user_id, "assistant", cleaned_response)
+
+        # Do pamięci FAQ tylko odpowiedzi bez terminów i rezerwacji
+        if (cacheable and cleaned_response != DEFAULT_RESPONSE
+                and not any(marker in bot_response_original for marker in BOOKING_MARKERS)
+                and not any(marker in cleaned_response for marker in BOOKING_MARKERS)):
+            answer_cache.put(user_message, cleaned_response)
         
         logger.info(f"🧠 AI Smart: '{user_message}' → '{cleaned_response[:50]}...'")
         return cleaned_response
         
+    except LLMUnavailable as e:
+        logger.error(f"🔌 {e}")
+        return LLM_UNAVAILABLE_REPLY
     except Exception as e:
         logger.error(f"❌ Błąd AI Smart: {e}")
         return "Przepraszam, wystąpił błąd. Spróbuj ponownie."
+    finally:
+        # Prefetch rozliczony także przy błędzie LLM
+        slot_prefetcher.discard(prefetch)
 
 # ==============================================
 # STATYSTYKI UŻYTKOWNIKÓW
 # ==============================================
 
+def count_active_users(window_seconds=USER_ACTIVITY_WINDOW):
+    """Liczba użytkowników, którzy pisali w ostatnim oknie czasu (starsze wpisy są przy okazji usuwane)"""
+    expire_activity(max(window_seconds, USER_ACTIVITY_WINDOW))
+    cutoff = time.time() - window_seconds
+    return sum(1 for last_seen in user_activity.values() if last_seen >= cutoff)
+
 def get_user_stats():
     """Statystyki użytkowników z pamięcią"""
     return {
@@ -0,0 +1,329 @@
+"""
+Calendar Index - Zajęte terminy z Google Calendar trzymane w pamięci
+- jedno zapytanie events.list (ze stronicowaniem) na cały horyzont
+  CALENDAR_INDEX_DAYS zamiast osobnego zapytania na każdy dzień
+- odświeżanie przyrostowe tokenem synchronizacji (nextSyncToken) co
+  CALENDAR_SYNC_INTERVAL; 410 Gone = token wygasł -> pełne pobranie
+- pełne pobranie co CALENDAR_INDEX_TTL (przesuwa okno na nowe dni)
+- wizyty tworzone / anulowane przez bota trafiają do indeksu od razu
+- pobierane są tylko pola potrzebne do zajętości (fields=), bez opisów
+  z telefonami klientów
+
+CALENDAR_AVAILABILITY_SOURCE=freebusy: zamiast events.list jedno
+zapytanie freebusy().query na cały horyzont (same przedziały zajętości).
+Freebusy scala nakładające się wizyty, więc nie wiadomo ilu klientów
+trwa naraz - domyślnie zostaje events.list, który pozwala liczyć limity
+max_clients.
+
+Każdy przedział ma wagę (weigh_event): wizyta = 1 klient, wydarzenie
+całodniowe / niebędące wizytą = BLOCKING_WEIGHT (zajmuje cały termin).
+"""
+
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytz
+
+from occupancy_grid import BLOCKING_WEIGHT
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# ==============================================
+# KONFIGURACJA
+# ==============================================
+
+CALENDAR_INDEX_ENABLED = os.getenv('CALENDAR_INDEX_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+CALENDAR_INDEX_DAYS = int(os.getenv('CALENDAR_INDEX_DAYS', '21'))            # get_available_slots sięga 3 tygodnie
+CALENDAR_INDEX_TTL = float(os.getenv('CALENDAR_INDEX_TTL', '900'))
+CALENDAR_SYNC_INTERVAL = float(os.getenv('CALENDAR_SYNC_INTERVAL', '30'))
+CALENDAR_AVAILABILITY_SOURCE = os.getenv('CALENDAR_AVAILABILITY_SOURCE', 'events').lower()   # events | freebusy
+
+# Częściowa odpowiedź - tylko pola potrzebne do zajętości (tytuł i znacznik bota odróżniają wizyty od blokad)
+INDEX_FIELDS = 'items(id,status,summary,start,end,extendedProperties/private),nextPageToken,nextSyncToken'
+
+INDEX_SYNCS = metrics.counter(
+    'bot_calendar_index_sync_total', 'Odświeżenia indeksu kalendarza', ('kind', 'outcome')
+)
+INDEX_READS = metrics.counter(
+    'bot_calendar_index_reads_total', 'Odczyty zajętości dnia', ('source',)
+)
+
+def _parse_event_time(value, tz):
+    """'2025-03-12T14:00:00+01:00' albo '2025-03-12' (cały dzień) -> datetime w strefie salonu"""
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is None:
+        return tz.localize(parsed)
+    return parsed.astimezone(tz)
+
+def event_interval(event, tz):
+    """(start, koniec) wydarzenia albo None gdy brak czasu / anulowane"""
+    if event.get('status') == 'cancelled':
+        return None
+    start = event.get('start', {})
+    end = event.get('end', {})
+    start_value = start.get('dateTime', start.get('date'))
+    end_value = end.get('dateTime', end.get('date'))
+    if not start_value or not end_value:
+        return None
+    try:
+        return _parse_event_time(start_value, tz), _parse_event_time(end_value, tz)
+    except ValueError:
+        return None
+
+class SyncTokenExpired(Exception):
+    """Google odrzucił token synchronizacji (410 Gone) - potrzebne pełne pobranie"""
+
+class EventIndex:
+    """Zajęte przedziały czasu w oknie [dziś, dziś + days) pogrupowane po dniach"""
+
+    source = 'events'
+
+    def __init__(self, list_events, timezone='Europe/Warsaw', days=CALENDAR_INDEX_DAYS,
+                 ttl=CALENDAR_INDEX_TTL, sync_interval=CALENDAR_SYNC_INTERVAL, clock=time.monotonic,
+                 weigh_event=None):
+        """
+        Args:
+            list_events: (**parametry events.list) -> strona wyników (dict z items,
+                         nextPageToken / nextSyncToken); 410 -> SyncTokenExpired
+            weigh_event: (wydarzenie) -> ile miejsc zajmuje (domyślnie 1)
+        """
+        self.list_events = list_events
+        self.weigh_event = weigh_event or (lambda event: 1)
+        self.tz = pytz.timezone(timezone)
+        self.days = days
+        self.ttl = ttl
+        self.sync_interval = sync_interval
+        self.clock = clock
+
+        self._events = {}            # id -> (start, koniec, waga)
+        self._by_day = {}            # date -> {id: (start, koniec, waga)}
+        self._window = None          # (pierwszy dzień, dzień za oknem)
+        self._sync_token = None
+        self._loaded_at = None       # ostatnie pełne pobranie
+        self._synced_at = None       # ostatnie udane odświeżenie (pełne lub przyrostowe)
+        self._lock = threading.Lock()          # dane indeksu
+        self._sync_lock = threading.Lock()     # jedno odświeżanie naraz
+        self._stats = {'full_syncs': 0, 'incremental_syncs': 0, 'sync_errors': 0,
+                       'expired_tokens': 0, 'stale_reads': 0}
+
+    # --- odczyt ---
+
+    def covers(self, day):
+        """Czy dzień (date) mieści się w oknie indeksu"""
+        first = datetime.now(self.tz).date()
+        return first <= day < first + timedelta(days=self.days)
+
+    def busy_times(self, day):
+        """
+        Zajęte przedziały (start, koniec, waga) w danym dniu - z pamięci, po odświeżeniu jeśli trzeba
+
+        Raises:
+            Exception: Indeks nie istnieje i nie udało się go pobrać
+        """
+        self.ensure_fresh()
+        with self._lock:
+            return sorted(self._by_day.get(day, {}).values())
+
+    # --- odświeżanie ---
+
+    def ensure_fresh(self):
+        """Pełne pobranie gdy brak indeksu / minął TTL / okno się przesunęło, inaczej przyrostowe"""
+        with self._sync_lock:
+            now = self.clock()
+            today = datetime.now(self.tz).date()
+            if self._loaded_at is None or now - self._loaded_at >= self.ttl or self._window[0] != today:
+                self._sync_or_serve_stale(self._full_sync)
+            elif now - self._synced_at >= self.sync_interval:
+                self._sync_or_serve_stale(self._incremental_sync)
+
+    def _sync_or_serve_stale(self, sync):
+        try:
+            sync()
+        except Exception as e:
+            self._stats['sync_errors'] += 1
+            if self._loaded_at is None:
+                raise
+            # Lepiej lekko nieaktualne terminy niż żadne - spróbujemy przy następnym odczycie
+            self._stats['stale_reads'] += 1
+            logger.warning(f"⚠️ Odświeżenie indeksu kalendarza nieudane, używam poprzednich danych: {e}")
+
+    def refresh(self):
+        """Wymuś pełne pobranie (warmup)"""
+        with self._sync_lock:
+            self._full_sync()
+
+    def _fetch_pages(self, kind, **params):
+        """Wszystkie strony events.list -> (wydarzenia, nextSyncToken)"""
+        start = time.perf_counter()
+        items, page_token = [], None
+        try:
+            while True:
+                page = self.list_events(pageToken=page_token, **params) if page_token else self.list_events(**params)
+                items.extend(page.get('items', []))
+                page_token = page.get('nextPageToken')
+                if not page_token:
+                    break
+        except SyncTokenExpired:
+            INDEX_SYNCS.inc(kind=kind, outcome='expired')
+            raise
+        except Exception:
+            INDEX_SYNCS.inc(kind=kind, outcome='error')
+            raise
+        INDEX_SYNCS.inc(kind=kind, outcome='ok')
+        logger.info(f"📅 Indeks kalendarza ({kind}): {len(items)} wydarzeń w {time.perf_counter() - start:.2f}s")
+        return items, page.get('nextSyncToken')
+
+    def _fetch_window(self, time_min, time_max):
+        """Wydarzenia w oknie -> (wydarzenia, nextSyncToken)"""
+        # Bez orderBy - inaczej Google nie zwraca nextSyncToken (sortujemy lokalnie)
+        return self._fetch_pages(
+            'full', timeMin=time_min.isoformat(), timeMax=time_max.isoformat(),
+            singleEvents=True, fields=INDEX_FIELDS
+        )
+
+    def _full_sync(self):
+        first = datetime.now(self.tz).date()
+        window = (first, first + timedelta(days=self.days))
+        time_min = self.tz.localize(datetime.combine(window[0], datetime.min.time()))
+        time_max = self.tz.localize(datetime.combine(window[1], datetime.min.time()))
+
+        items, sync_token = self._fetch_window(time_min, time_max)
+
+        events = {}
+        for event in items:
+            interval = self._weighted_interval(event)
+            if interval and event.get('id'):
+                events[event['id']] = interval
+
+        with self._lock:
+            self._window = window
+            self._events = {}
+            self._by_day = {}
+            for event_id, interval in events.items():
+                self._put(event_id, interval)
+            self._sync_token = sync_token
+            self._loaded_at = self._synced_at = self.clock()
+            self._stats['full_syncs'] += 1
+
+    def _incremental_sync(self):
+        if not self._sync_token:
+            return self._full_sync()
+        try:
+            # Z syncToken nie wolno podać timeMin/timeMax/orderBy - dostajemy zmiany z całego kalendarza
+            items, sync_token = self._fetch_pages(
+                'incremental', syncToken=self._sync_token, singleEvents=True, fields=INDEX_FIELDS
+            )
+        except SyncTokenExpired:
+            self._stats['expired_tokens'] += 1
+            logger.info("🔄 Token synchronizacji kalendarza wygasł - pełne pobranie")
+            return self._full_sync()
+
+        with self._lock:
+            for event in items:
+                if event.get('id'):
+                    self._apply(event)
+            self._sync_token = sync_token or self._sync_token
+            self._synced_at = self.clock()
+            self._stats['incremental_syncs'] += 1
+
+    # --- zmiany ---
+
+    def upsert(self, event):
+        """Wizyta utworzona przez bota - widoczna od razu, bez czekania na synchronizację"""
+        with self._lock:
+            if self._window is not None and event.get('id'):
+                self._apply(event)
+
+    def remove(self, event_id):
+        """Wizyta anulowana przez bota"""
+        with self._lock:
+            self._drop(event_id)
+
+    def _weighted_interval(self, event):
+        """(start, koniec, waga) albo None"""
+        interval = event_interval(event, self.tz)
+        return interval + (self.weigh_event(event),) if interval else None
+
+    def _apply(self, event):
+        """Wydarzenie z synchronizacji: anulowane / poza oknem -> usuń, inaczej wstaw lub podmień"""
+        self._drop(event['id'])
+        interval = self._weighted_interval(event)
+        if interval and interval[0].date() < self._window[1] and interval[1].date() >= self._window[0]:
+            self._put(event['id'], interval)
+
+    def _put(self, event_id, interval):
+        self._events[event_id] = interval
+        start, end = interval[:2]
+        day = max(start.date(), self._window[0])
+        last = min((end - timedelta(microseconds=1)).date(), self._window[1] - timedelta(days=1))
+        while day <= last:
+            self._by_day.setdefault(day, {})[event_id] = interval
+            day += timedelta(days=1)
+
+    def _drop(self, event_id):
+        interval = self._events.pop(event_id, None)
+        if interval is None:
+            return
+        for day_events in self._by_day.values():
+            day_events.pop(event_id, None)
+
+    def get_stats(self):
+        with self._lock:
+            age = None if self._loaded_at is None else round(self.clock() - self._loaded_at, 1)
+            return dict(
+                self._stats,
+                enabled=CALENDAR_INDEX_ENABLED,
+                source=self.source,
+                events=len(self._events),
+                window=None if self._window is None else [d.isoformat() for d in self._window],
+                age_seconds=age,
+                has_sync_token=bool(self._sync_token)
+            )
+
+class FreeBusyIndex(EventIndex):
+    """Zajętość z freebusy().query - jedno zapytanie na całe okno, bez treści wydarzeń"""
+
+    source = 'freebusy'
+
+    def __init__(self, query_busy, **kwargs):
+        """
+        Args:
+            query_busy: (time_min, time_max) -> [{"start", "end"}, ...] scalone przedziały zajętości
+        """
+        # Scalony blok może kryć kilka wizyt albo urlop - zawsze zajmuje cały termin
+        kwargs['weigh_event'] = lambda event: BLOCKING_WEIGHT
+        super().__init__(None, **kwargs)
+        self.query_busy = query_busy
+
+    def _fetch_window(self, time_min, time_max):
+        # Freebusy nie ma tokenów synchronizacji - co CALENDAR_SYNC_INTERVAL pełne zapytanie
+        start = time.perf_counter()
+        try:
+            busy = self.query_busy(time_min, time_max)
+        except Exception:
+            INDEX_SYNCS.inc(kind='freebusy', outcome='error')
+            raise
+        INDEX_SYNCS.inc(kind='freebusy', outcome='ok')
+        logger.info(f"📅 Indeks kalendarza (freebusy): {len(busy)} zajętych bloków w {time.perf_counter() - start:.2f}s")
+        items = [
+            {'id': f"busy_{number}", 'start': {'dateTime': block['start']}, 'end': {'dateTime': block['end']}}
+            for number, block in enumerate(busy)
+        ]
+        return items, None
+
+    def remove(self, event_id):
+        """Anulowana wizyta jest scalona w blok - odśwież przy następnym odczycie"""
+        with self._lock:
+            self._drop(event_id)
+            if self._synced_at is not None:
+                self._synced_at = float('-inf')
+
+def create_event_index(list_events, query_busy, **kwargs):
+    """Indeks zajętości dla skonfigurowanego CALENDAR_AVAILABILITY_SOURCE"""
+    if CALENDAR_AVAILABILITY_SOURCE == 'freebusy':
+        return FreeBusyIndex(query_busy, **kwargs)
+    return EventIndex(list_events, **kwargs)
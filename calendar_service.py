@@ -5,14 +5,42 @@ Obsługuje umawianie, sprawdzanie terminów i zarządzanie wizytami
 
 from google.oauth2.service_account import Credentials
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
 from datetime import datetime, timedelta
 import pytz
 import logging
 import os
+import threading
+import time
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from calendar_index import CALENDAR_INDEX_ENABLED, INDEX_READS, SyncTokenExpired, create_event_index
+from occupancy_grid import BLOCKING_WEIGHT, build_grid, remaining_capacity
+import metrics
 
 logger = logging.getLogger(__name__)
 
+# Równoległe pobieranie dni, gdy indeks zajętości jest wyłączony / niedostępny
+CALENDAR_FETCH_WORKERS = int(os.getenv('CALENDAR_FETCH_WORKERS', '4'))
+
+CALENDAR_LATENCY = metrics.histogram(
+    'bot_calendar_request_seconds', 'Czas wywołania Google Calendar API',
+    ('operation', 'outcome')
+)
+
+def execute_request(request, operation):
+    """Wykonaj zapytanie Google Calendar API z pomiarem czasu (operation: events.list / events.insert / ...)"""
+    start = time.perf_counter()
+    outcome = 'ok'
+    try:
+        return request.execute()
+    except Exception:
+        outcome = 'error'
+        raise
+    finally:
+        CALENDAR_LATENCY.observe(time.perf_counter() - start, operation=operation, outcome=outcome)
+
 # KONFIGURACJA ZAAWANSOWANA:
 class CalendarService:
     def __init__(self, credentials_file='credentials.json', calendar_id=None):
@@ -46,6 +74,20 @@ class CalendarService:
             'default': {'max_clients': 2, 'duration': 45}
         }
         
+        # 🔧 INDEKS ZAJĘTOŚCI - jedno zapytanie na cały horyzont, potem synchronizacja przyrostowa
+        self.event_index = create_event_index(
+            self._list_events, self._query_freebusy, timezone=self.timezone, weigh_event=self._event_weight
+        )
+        # Szereguje rezerwacje tylko w tym procesie - przy kilku workerach gunicorna
+        # sprawdzenie limitu i zapis z różnych procesów mogą się nadal wyprzedzić
+        self._booking_lock = threading.Lock()
+        
+        # Osobny klient Google na wątek - obiekty httplib2 pod build() nie są bezpieczne wątkowo
+        self.credentials = None
+        self._local = threading.local()
+        self._fetch_pool = None
+        self._fetch_pool_lock = threading.Lock()
+        
         self._init_service()
     
     def _init_service(self):
@@ -60,6 +102,7 @@ class CalendarService:
                 scopes=['https://www.googleapis.com/auth/calendar']
             )
             
+            self.credentials = credentials
             self.service = build('calendar', 'v3', credentials=credentials)
             logger.info("✅ Google Calendar API zainicjalizowane")
             return True
@@ -72,13 +115,14 @@ class CalendarService:
         """Sprawdź czy serwis jest dostępny"""
         return self.service is not None
     
-    def get_available_slots(self, days_ahead=7, slot_duration=60):
+    def get_available_slots(self, days_ahead=7, slot_duration=60, service_type=None):
         """
         Pobierz dostępne terminy na najbliższe dni
         
         Args:
             days_ahead (int): Ile dni do przodu sprawdzać
             slot_duration (int): Długość slotu w minutach
+            service_type (str): Usługa - limit klientów z SERVICE_CONFIG (None = najmniejszy limit)
             
         Returns:
             list: Lista dostępnych terminów
@@ -92,6 +136,7 @@ class CalendarService:
             tz = pytz.timezone(self.timezone)
             days_checked = 0
             current_day = 0
+            dates = []
             
             # Sprawdzaj dni aż znajdziesz wystarczająco dni roboczych
             while days_checked < days_ahead and current_day < 21:  # 3 tygodnie
@@ -100,12 +145,24 @@ class CalendarService:
                 
                 # Sprawdź czy dzień roboczy
                 if day_name != 'sunday' and self.working_hours.get(day_name):
-                    day_slots = self._get_day_available_slots(date, slot_duration)
-                    available_slots.extend(day_slots)
+                    dates.append(date)
                     days_checked += 1
                     
                 current_day += 1
             
+            if self._index_ready():
+                # Indeks w pamięci - dni liczone od razu, bez zapytań
+                for date in dates:
+                    available_slots.extend(self._get_day_available_slots(date, slot_duration, service_type))
+            else:
+                # 🔧 BRAK INDEKSU - dni niezależne, pobierane równolegle (każdy wątek ma własnego klienta)
+                start = time.perf_counter()
+                for day_slots in self._get_fetch_pool().map(
+                    lambda date: self._get_day_available_slots(date, slot_duration, service_type, use_index=False), dates
+                ):
+                    available_slots.extend(day_slots)
+                logger.info(f"📅 Pobrano {len(dates)} dni równolegle w {time.perf_counter() - start:.2f}s")
+            
             # Sortuj po dacie i zwróć max 10
             available_slots.sort(key=lambda x: x['datetime'])
             
@@ -127,63 +184,110 @@ class CalendarService:
             logger.error(f"❌ Błąd pobierania terminów: {e}")
             return []
     
-    def _get_day_available_slots(self, date, slot_duration):
-        """Pobierz dostępne sloty dla konkretnego dnia"""
+    def _index_ready(self):
+        """Czy indeks zajętości jest włączony i aktualny (odświeżenie, jeśli trzeba)"""
+        if not CALENDAR_INDEX_ENABLED:
+            return False
+        try:
+            self.event_index.ensure_fresh()
+            return True
+        except Exception as e:
+            logger.error(f"❌ Indeks kalendarza niedostępny, pobieram dni bezpośrednio: {e}")
+            return False
+    
+    def _get_fetch_pool(self):
+        """Ograniczona pula wątków do równoległego pobierania dni"""
+        if self._fetch_pool is None:
+            with self._fetch_pool_lock:
+                if self._fetch_pool is None:
+                    self._fetch_pool = ThreadPoolExecutor(
+                        max_workers=CALENDAR_FETCH_WORKERS, thread_name_prefix='calendar-fetch'
+                    )
+        return self._fetch_pool
+    
+    def _get_thread_service(self):
+        """Klient Google Calendar bieżącego wątku (budowany raz na wątek)"""
+        if self.credentials is None:
+            return self.service
+        service = getattr(self._local, 'service', None)
+        if service is None:
+            service = build('calendar', 'v3', credentials=self.credentials, cache_discovery=False)
+            self._local.service = service
+        return service
+    
+    def _get_service_config(self, service_type):
+        """Konfiguracja usługi (max_clients, duration) - nieznane usługi jak 'default'"""
+        return self.SERVICE_CONFIG.get(service_type, self.SERVICE_CONFIG['default'])
+    
+    def _get_max_clients(self, service_type):
+        """Limit klientów usługi; bez usługi najmniejszy limit - podany termin da się zarezerwować na wszystko"""
+        if service_type is None:
+            return min(config['max_clients'] for config in self.SERVICE_CONFIG.values())
+        return self._get_service_config(service_type)['max_clients']
+    
+    def _event_weight(self, event):
+        """
+        Ile miejsc zajmuje wydarzenie: wizyta (bot albo "Usługa - Klient") to jeden klient,
+        wydarzenie całodniowe i inne wpisy (urlop, "Zamknięte") blokują cały termin
+        """
+        if 'dateTime' not in event.get('start', {}):
+            return BLOCKING_WEIGHT
+        if event.get('extendedProperties', {}).get('private', {}).get('bot_service'):
+            return 1
+        summary = event.get('summary', '')
+        service = summary.split(' - ')[0].strip()
+        if ' - ' in summary and service in self.SERVICE_CONFIG and service != 'default':
+            return 1
+        return BLOCKING_WEIGHT
+    
+    def _get_day_available_slots(self, date, slot_duration, service_type=None, use_index=True):
+        """Pobierz dostępne sloty dla konkretnego dnia (wolne = zmieści się jeszcze klient danej usługi)"""
         day_name = date.strftime('%A').lower()
         work_hours = self.working_hours.get(day_name)
         
         if not work_hours:
             return []
         
-        # Pobierz zajęte terminy
-        start_of_day = date.replace(hour=0, minute=0, second=0)
-        end_of_day = date.replace(hour=23, minute=59, second=59)
-        
         try:
-            events_result = self.service.events().list(
-                calendarId=self.calendar_id,
-                timeMin=start_of_day.isoformat(),
-                timeMax=end_of_day.isoformat(),
-                singleEvents=True,
-                orderBy='startTime'
-            ).execute()
-            
-            events = events_result.get('items', [])
-            
-            busy_times = []
-            for event in events:
-                start = event['start'].get('dateTime', event['start'].get('date'))
-                end = event['end'].get('dateTime', event['end'].get('date'))
-                if start and end:
-                    busy_times.append((start, end))
+            busy_times = self._get_busy_times(date, use_index)
             
             # Znajdź wolne sloty
             available_slots = []
             work_start, work_end = work_hours
             
-            now = datetime.now(pytz.timezone(self.timezone))
-            
-            for hour in range(work_start, work_end):
-                for minute in [0, 30]:  # Co 30 minut
-                    slot_time = date.replace(hour=hour, minute=minute, second=0, microsecond=0)
-                    slot_end = slot_time + timedelta(minutes=slot_duration)
-                    
-                    # Sprawdź czy slot nie jest w przeszłości
-                    if slot_time <= now:
-                        continue
-                    
-                    # Sprawdź czy nie wykracza poza godziny pracy
-                    if slot_end.hour > work_end:
-                        continue
-                    
-                    # Sprawdź czy nie koliduje z zajętymi terminami
-                    if not self._is_time_busy(slot_time, slot_end, busy_times):
-                        available_slots.append({
-                            'datetime': slot_time,
-                            'display': slot_time.strftime('%A %d.%m %H:%M'),
-                            'iso': slot_time.isoformat(),
-                            'day_name': self._get_polish_day_name(slot_time.strftime('%A'))
-                        })
+            tz = pytz.timezone(self.timezone)
+            now = datetime.now(tz)
+            
+            # 🔧 SIATKA ZAJĘTOŚCI - liczba równoczesnych wizyt w każdej minucie, jedno przejście NumPy
+            day_start = date.replace(hour=0, minute=0, second=0, microsecond=0)
+            grid = build_grid(busy_times, day_start, tz)
+            candidates = [hour * 60 + minute for hour in range(work_start, work_end) for minute in (0, 30)]  # Co 30 minut
+            max_clients = self._get_max_clients(service_type)
+            # Znana usługa - okno na cały czas jej trwania (jak przy rezerwacji)
+            window = max(slot_duration, self._get_service_config(service_type)['duration']) if service_type else slot_duration
+            capacity = remaining_capacity(grid, candidates, window, max_clients)
+            
+            for start_minute, places in zip(candidates, capacity):
+                slot_time = date.replace(hour=start_minute // 60, minute=start_minute % 60, second=0, microsecond=0)
+                slot_end = slot_time + timedelta(minutes=window)
+                
+                # Sprawdź czy slot nie jest w przeszłości
+                if slot_time <= now:
+                    continue
+                
+                # Sprawdź czy nie wykracza poza godziny pracy
+                if slot_end.hour > work_end:
+                    continue
+                
+                # Sprawdź czy zmieści się jeszcze klient (max_clients usługi)
+                if places > 0:
+                    available_slots.append({
+                        'datetime': slot_time,
+                        'display': slot_time.strftime('%A %d.%m %H:%M'),
+                        'iso': slot_time.isoformat(),
+                        'day_name': self._get_polish_day_name(slot_time.strftime('%A')),
+                        'capacity': int(places)
+                    })
         
             return available_slots
             
@@ -191,30 +295,88 @@ class CalendarService:
             logger.error(f"❌ Błąd pobierania slotów dla {date}: {e}")
             return []
     
-    def _is_time_busy(self, start_time, end_time, busy_times):
-        """Sprawdź czy termin koliduje z zajętymi"""
-        for busy_start, busy_end in busy_times:
-            # Konwertuj na datetime
-            if isinstance(busy_start, str):
-                try:
-                    busy_start = datetime.fromisoformat(busy_start.replace('Z', '+00:00'))
-                    if busy_start.tzinfo is None:
-                        busy_start = pytz.timezone(self.timezone).localize(busy_start)
-                except:
-                    continue
-                    
-            if isinstance(busy_end, str):
-                try:
-                    busy_end = datetime.fromisoformat(busy_end.replace('Z', '+00:00'))
-                    if busy_end.tzinfo is None:
-                        busy_end = pytz.timezone(self.timezone).localize(busy_end)
-                except:
-                    continue
+    def get_remaining_capacity(self, service_type, appointment_time, duration_minutes=None):
+        """
+        Ilu klientów danej usługi zmieści się jeszcze w terminie
+        
+        Args:
+            service_type (str): Rodzaj usługi (SERVICE_CONFIG)
+            appointment_time (datetime): Początek wizyty (ze strefą)
+            duration_minutes (int): Długość - domyślnie z SERVICE_CONFIG
             
-            # Sprawdź kolizję
-            if start_time < busy_end and end_time > busy_start:
-                return True
-        return False
+        Returns:
+            int: Wolne miejsca (0 = termin pełny)
+        """
+        service_config = self._get_service_config(service_type)
+        duration = duration_minutes or service_config['duration']
+        
+        day_start = appointment_time.replace(hour=0, minute=0, second=0, microsecond=0)
+        start_minute = int((appointment_time - day_start).total_seconds() // 60)
+        grid = build_grid(self._get_busy_times(appointment_time), day_start, pytz.timezone(self.timezone))
+        return int(remaining_capacity(grid, [start_minute], duration, self._get_max_clients(service_type))[0])
+    
+    def _get_busy_times(self, date, use_index=True):
+        """Zajęte terminy dnia - z indeksu w pamięci, a poza jego oknem osobnym zapytaniem"""
+        if use_index and CALENDAR_INDEX_ENABLED and self.event_index.covers(date.date()):
+            try:
+                busy_times = self.event_index.busy_times(date.date())
+                INDEX_READS.inc(source='index')
+                return busy_times
+            except Exception as e:
+                logger.error(f"❌ Indeks kalendarza niedostępny, pytam o dzień bezpośrednio: {e}")
+        
+        INDEX_READS.inc(source='api')
+        start_of_day = date.replace(hour=0, minute=0, second=0)
+        end_of_day = date.replace(hour=23, minute=59, second=59)
+        
+        events_result = execute_request(self._get_thread_service().events().list(
+            calendarId=self.calendar_id,
+            timeMin=start_of_day.isoformat(),
+            timeMax=end_of_day.isoformat(),
+            singleEvents=True,
+            orderBy='startTime',
+            fields='items(summary,start,end,extendedProperties/private)'
+        ), 'events.list')
+        
+        busy_times = []
+        for event in events_result.get('items', []):
+            start = event['start'].get('dateTime', event['start'].get('date'))
+            end = event['end'].get('dateTime', event['end'].get('date'))
+            if start and end:
+                busy_times.append((start, end, self._event_weight(event)))
+        return busy_times
+    
+    def _list_events(self, **params):
+        """Jedna strona events.list dla indeksu (410 Gone -> SyncTokenExpired)"""
+        if not self.service:
+            raise Exception("Calendar service nie jest zainicjalizowany")
+        try:
+            return execute_request(self.service.events().list(
+                calendarId=self.calendar_id, **params
+            ), 'events.list')
+        except HttpError as e:
+            if e.resp.status == 410:
+                raise SyncTokenExpired(str(e))
+            raise
+    
+    def _query_freebusy(self, time_min, time_max):
+        """Scalone przedziały zajętości z freebusy().query - jedno zapytanie na całe okno"""
+        if not self.service:
+            raise Exception("Calendar service nie jest zainicjalizowany")
+        result = execute_request(self.service.freebusy().query(
+            body={
+                'timeMin': time_min.isoformat(),
+                'timeMax': time_max.isoformat(),
+                'timeZone': self.timezone,
+                'items': [{'id': self.calendar_id}]
+            },
+            fields='calendars(busy,errors)'
+        ), 'freebusy.query')
+        
+        calendar = result.get('calendars', {}).get(self.calendar_id, {})
+        if calendar.get('errors'):
+            raise Exception(f"freebusy: {calendar['errors']}")
+        return calendar.get('busy', [])
     
     def create_appointment(self, client_name, client_phone, service_type, appointment_time, duration_minutes=60):
         """
@@ -236,7 +398,7 @@ class CalendarService:
         
         try:
             # Sprawdź maksymalną liczbę klientów dla danej usługi
-            service_config = self.SERVICE_CONFIG.get(service_type, self.SERVICE_CONFIG['default'])
+            service_config = self._get_service_config(service_type)
             max_clients = service_config['max_clients']
             duration_minutes = service_config['duration']
             
@@ -257,6 +419,10 @@ class CalendarService:
                     'dateTime': end_time.isoformat(),
                     'timeZone': self.timezone,
                 },
+                # Znacznik wizyty z bota - indeks liczy ją jako jednego klienta
+                'extendedProperties': {
+                    'private': {'bot_service': service_type},
+                },
                 'reminders': {
                     'useDefault': False,
                     'overrides': [
@@ -266,12 +432,26 @@ class CalendarService:
                 },
             }
             
-            created_event = self.service.events().insert(
-                calendarId=self.calendar_id, 
-                body=event
-            ).execute()
+            # 🔧 LIMIT KLIENTÓW - sprawdzenie i zapis pod blokadą, żeby dwie rezerwacje nie zajęły ostatniego miejsca
+            with self._booking_lock:
+                try:
+                    places = self.get_remaining_capacity(service_type, appointment_time, duration_minutes)
+                except Exception as e:
+                    places = None
+                    logger.warning(f"⚠️ Nie udało się sprawdzić wolnych miejsc, zapisuję bez sprawdzenia: {e}")
+                
+                if places == 0:
+                    logger.warning(f"⛔ Brak miejsc: {service_type} {appointment_time.strftime('%d.%m %H:%M')} (max {max_clients} klientów)")
+                    return False
+                
+                created_event = execute_request(self.service.events().insert(
+                    calendarId=self.calendar_id, 
+                    body=event
+                ), 'events.insert')
+                
+                event_id = created_event.get('id')
+                self.event_index.upsert(created_event)
             
-            event_id = created_event.get('id')
             logger.info(f"✅ Utworzono wizytę: {event_id} dla {client_name}")
             return event_id
             
@@ -285,10 +465,11 @@ class CalendarService:
             return False
         
         try:
-            self.service.events().delete(
+            execute_request(self.service.events().delete(
                 calendarId=self.calendar_id,
                 eventId=event_id
-            ).execute()
+            ), 'events.delete')
+            self.event_index.remove(event_id)
             
             logger.info(f"✅ Anulowano wizytę: {event_id}")
             return True
@@ -297,6 +478,34 @@ class CalendarService:
             logger.error(f"❌ Błąd anulowania wizyty: {e}")
             return False
     
+    def get_event(self, event_id):
+        """
+        Pobierz wydarzenie po ID (events.get - jedno zapytanie, bez przeszukiwania listy)
+
+        Returns:
+            dict|None: Wydarzenie albo None gdy nie istnieje / zostało usunięte
+
+        Raises:
+            Exception: Inne błędy API (np. sieć) - wynik nieznany
+        """
+        if not self.service:
+            raise Exception("Calendar service nie jest zainicjalizowany")
+
+        try:
+            event = execute_request(self.service.events().get(
+                calendarId=self.calendar_id,
+                eventId=event_id,
+                fields='id,status,start,end'
+            ), 'events.get')
+        except HttpError as e:
+            if e.resp.status in (404, 410):
+                return None
+            raise
+
+        if event.get('status') == 'cancelled':
+            return None
+        return event
+
     def _get_polish_day_name(self, english_day):
         """Konwertuj angielską nazwę dnia na polską"""
         days = {
@@ -312,18 +521,21 @@ class CalendarService:
 
 # Globalna instancja - singleton
 calendar_service = None
+_calendar_service_lock = threading.Lock()
 
 def get_calendar_service():
-    """Pobierz globalną instancję kalendarza"""
+    """Pobierz globalną instancję kalendarza (bezpieczne dla wątków - warmup i workery)"""
     global calendar_service
     if calendar_service is None:
-        calendar_service = CalendarService()
+        with _calendar_service_lock:
+            if calendar_service is None:
+                calendar_service = CalendarService()
     return calendar_service
 
 # Funkcje pomocnicze dla backward compatibility
-def get_available_slots(days_ahead=7):
+def get_available_slots(days_ahead=7, service_type=None):
     """Wrapper function dla kompatybilności"""
-    return get_calendar_service().get_available_slots(days_ahead)
+    return get_calendar_service().get_available_slots(days_ahead, service_type=service_type)
 
 def create_appointment(client_name, client_phone, service_type, appointment_time, duration_minutes=60):
     """Wrapper function dla kompatybilności"""
@@ -331,6 +543,14 @@ def create_appointment(client_name, client_phone, service_type, appointment_time
         client_name, client_phone, service_type, appointment_time, duration_minutes
     )
 
+def get_event(event_id):
+    """Wrapper - wydarzenie po ID (None gdy nie istnieje)"""
+    return get_calendar_service().get_event(event_id)
+
+def get_index_stats():
+    """Wrapper - statystyki indeksu zajętości (dla /api/health)"""
+    return get_calendar_service().event_index.get_stats()
+
 def cancel_appointment(client_name, client_phone, appointment_day, appointment_time):
     """Anuluj wizytę w kalendarzu Google"""
     try:
@@ -385,13 +605,14 @@ def cancel_appointment(client_name, client_phone, appointment_day, appointment_t
         
         logger.info(f"🔍 Zakres wyszukiwania: {search_start.strftime('%Y-%m-%d')} do {search_end.strftime('%Y-%m-%d')}")
         
-        events = calendar_service.service.events().list(
+        events = execute_request(calendar_service.service.events().list(
             calendarId=calendar_service.calendar_id,
             timeMin=search_start.isoformat(),
             timeMax=search_end.isoformat(),
             singleEvents=True,
-            orderBy='startTime'
-        ).execute()
+            orderBy='startTime',
+            fields='items(id,summary,description,start)'
+        ), 'events.list')
         
         events_list = events.get('items', [])
         logger.info(f"🔍 Znaleziono {len(events_list)} wydarzeń w zakresie")
@@ -433,10 +654,11 @@ def cancel_appointment(client_name, client_phone, appointment_day, appointment_t
             if time_match and day_match and (name_match or phone_match):
                 # USUŃ WIZYTĘ
                 try:
-                    calendar_service.service.events().delete(
+                    execute_request(calendar_service.service.events().delete(
                         calendarId=calendar_service.calendar_id,
                         eventId=event['id']
-                    ).execute()
+                    ), 'events.delete')
+                    calendar_service.event_index.remove(event['id'])
                     
                     logger.info(f"✅ Anulowano wizytę: {summary} - {event_start}")
                     return {
@@ -474,13 +696,14 @@ def get_upcoming_appointments(days_ahead=14):
         time_max = now + timedelta(days=days_ahead)
         
         # Pobierz wydarzenia
-        events_result = calendar_service.service.events().list(
+        events_result = execute_request(calendar_service.service.events().list(
             calendarId=calendar_service.calendar_id,  # ← POPRAWKA: użyj calendar_id z instancji
             timeMin=now.isoformat(),
             timeMax=time_max.isoformat(),
             singleEvents=True,
-            orderBy='startTime'
-        ).execute()
+            orderBy='startTime',
+            fields='items(id,summary,start,description,location)'
+        ), 'events.list')
         
         events = events_result.get('items', [])
         
@@ -504,13 +727,14 @@ def get_upcoming_appointments(days_ahead=14):
 
 # DODAJ na końcu calendar_service.py:
 
-def get_available_slots_for_day(target_day_name, slot_duration=30):
+def get_available_slots_for_day(target_day_name, slot_duration=30, service_type=None):
     """
     Pobierz WSZYSTKIE dostępne terminy dla konkretnego dnia
     
     Args:
         target_day_name (str): Nazwa dnia po polsku (np. "środa", "piątek")
         slot_duration (int): Długość slotu w minutach
+        service_type (str): Usługa - limit klientów z SERVICE_CONFIG (None = najmniejszy limit)
         
     Returns:
         list: Wszystkie dostępne terminy dla tego dnia
@@ -551,7 +775,7 @@ def get_available_slots_for_day(target_day_name, slot_duration=30):
         logger.info(f"🔍 Szukam terminów na: {target_date.strftime('%Y-%m-%d')} ({target_day_name})")
         
         # Pobierz wszystkie sloty dla tego dnia
-        day_slots = calendar_service._get_day_available_slots(target_date, slot_duration)
+        day_slots = calendar_service._get_day_available_slots(target_date, slot_duration, service_type)
         
         # Sortuj po godzinie
         day_slots.sort(key=lambda x: x['datetime'])
@@ -589,13 +813,14 @@ def verify_appointment_exists(client_name, client_phone, appointment_datetime, s
         
         logger.info(f"🔍 Weryfikacja spotkania: {client_name} na {appointment_datetime.strftime('%Y-%m-%d %H:%M')}")
         
-        events = calendar_service.service.events().list(
+        events = execute_request(calendar_service.service.events().list(
             calendarId=calendar_service.calendar_id,
             timeMin=search_start.isoformat(),
             timeMax=search_end.isoformat(),
             singleEvents=True,
-            orderBy='startTime'
-        ).execute()
+            orderBy='startTime',
+            fields='items(id,summary,description,start)'
+        ), 'events.list')
         
         events_list = events.get('items', [])
         
@@ -634,8 +859,8 @@ def verify_appointment_exists(client_name, client_phone, appointment_datetime, s
         logger.error(f"❌ Błąd weryfikacji spotkania: {e}")
         return False
 
-def format_available_slots(requested_day):
-    """Formatuje sloty w ładny sposób z polskimi nazwami dni"""
+def format_available_slots(requested_day, service_type=None):
+    """Formatuje sloty w ładny sposób z polskimi nazwami dni (service_type - limit klientów usługi)"""
     try:
         from datetime import datetime, timedelta
         import pytz
@@ -683,7 +908,7 @@ def format_available_slots(requested_day):
         logger.info(f"📅 Requested: {requested_day} → Date: {target_date} → Day: {target_day_name}")
         
         # 🔧 POBIERZ DANE DLA PRAWIDŁOWEGO DNIA:
-        slots_data = get_available_slots_for_day(target_day_name)
+        slots_data = get_available_slots_for_day(target_day_name, service_type=service_type)
         
         if not slots_data:
             return f"😔 Niestety, nie mamy wolnych terminów na {requested_day}."
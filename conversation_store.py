@@ -0,0 +1,246 @@
+"""
+Conversation Store - Ograniczona pamięć historii rozmów
+- zwarty zapis: wiadomość to krotka (rola, treść) zamiast słownika,
+  rola jednym znakiem ('u' / 'a' / 's')
+- TTL bezczynności: rozmowa nieużywana przez CONVERSATION_IDLE_TTL znika
+- limit pamięci (CONVERSATION_MAX_BYTES) z usuwaniem najdawniej używanych
+
+Na zewnątrz bez zmian: historia to lista {"role", "content"}, jest
+update_value i key_lock jak w state_backend. Przy STATE_BACKEND=sqlite
+historia leży na dysku - działa zwarty zapis i TTL (bez limitu pamięci).
+"""
+
+import logging
+import os
+import pickle
+import sys
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from contextlib import contextmanager
+
+from state_backend import STATE_BACKEND, SQLiteStore
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# ==============================================
+# KONFIGURACJA
+# ==============================================
+
+CONVERSATION_IDLE_TTL = float(os.getenv('CONVERSATION_IDLE_TTL', str(24 * 3600)))
+CONVERSATION_MAX_BYTES = int(os.getenv('CONVERSATION_MAX_BYTES', str(50 * 1024 * 1024)))
+CONVERSATION_SWEEP_INTERVAL = float(os.getenv('CONVERSATION_SWEEP_INTERVAL', '60'))
+
+CONVERSATION_EVICTIONS = metrics.counter(
+    'bot_conversation_evictions_total', 'Rozmowy usunięte z pamięci', ('reason',)
+)
+
+_ROLE_CODES = {'user': 'u', 'assistant': 'a', 'system': 's'}
+_ROLE_NAMES = {code: role for role, code in _ROLE_CODES.items()}
+
+# ==============================================
+# ZWARTY ZAPIS
+# ==============================================
+
+def encode_history(history):
+    """[{"role", "content"}, ...] -> ((kod roli, treść), ...)"""
+    return tuple((_ROLE_CODES.get(message['role'], message['role']), message['content']) for message in history)
+
+def decode_history(compact):
+    """((kod roli, treść), ...) -> [{"role", "content"}, ...]"""
+    return [{"role": _ROLE_NAMES.get(role, role), "content": content} for role, content in compact]
+
+def compact_size(compact):
+    """Przybliżony rozmiar w pamięci (krotki + napisy)"""
+    return sys.getsizeof(compact) + sum(
+        sys.getsizeof(message) + sys.getsizeof(message[1]) for message in compact
+    )
+
+# ==============================================
+# PAMIĘĆ W PROCESIE
+# ==============================================
+
+class ConversationStore(MutableMapping):
+    """Historia rozmów w pamięci: LRU z limitem bajtów + TTL bezczynności"""
+
+    def __init__(self, name, idle_ttl=CONVERSATION_IDLE_TTL, max_bytes=CONVERSATION_MAX_BYTES,
+                 sweep_interval=CONVERSATION_SWEEP_INTERVAL):
+        self.name = name
+        self.idle_ttl = idle_ttl
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+        self._entries = OrderedDict()      # klucz -> (ostatni dostęp, zwarta historia, rozmiar)
+        self._bytes = 0
+        self._last_sweep = time.monotonic()
+        self.evictions = {'idle': 0, 'memory': 0}
+        self._lock = threading.RLock()
+
+    # --- słownik ---
+
+    def __getitem__(self, key):
+        with self._lock:
+            return decode_history(self._touch(key))
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            self._store(key, encode_history(value))
+
+    def __delitem__(self, key):
+        with self._lock:
+            _, _, size = self._entries.pop(key)
+            self._bytes -= size
+
+    def __contains__(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and not self._is_idle(entry, time.monotonic())
+
+    def __iter__(self):
+        with self._lock:
+            return iter([key for key, _ in self._live_entries()])
+
+    def __len__(self):
+        with self._lock:
+            return len(self._live_entries())
+
+    def items(self):
+        """Migawka (klucz, historia) bez odświeżania kolejności LRU"""
+        with self._lock:
+            return [(key, decode_history(compact)) for key, (_, compact, _) in self._live_entries()]
+
+    def values(self):
+        with self._lock:
+            return [decode_history(compact) for _, (_, compact, _) in self._live_entries()]
+
+    # --- interfejs state_backend ---
+
+    def update_value(self, key, func, default_factory=None):
+        """Atomowo zmień historię: value = func(stara_historia)"""
+        with self._lock:
+            try:
+                current = decode_history(self._touch(key))
+            except KeyError:
+                current = default_factory() if default_factory else None
+            value = func(current)
+            self._store(key, encode_history(value))
+            return value
+
+    @contextmanager
+    def key_lock(self, key):
+        """W jednym procesie kolejność per nadawca zapewnia SenderLaneExecutor"""
+        yield
+
+    # --- LRU / TTL ---
+
+    def _is_idle(self, entry, now):
+        return now - entry[0] > self.idle_ttl
+
+    def _live_entries(self):
+        """Wpisy bez bezczynnych - jak __contains__, zanim sprzątanie je usunie"""
+        now = time.monotonic()
+        return [(key, entry) for key, entry in self._entries.items() if not self._is_idle(entry, now)]
+
+    def _touch(self, key):
+        """Zwarta historia + odświeżenie pozycji LRU (KeyError gdy brak lub wygasła)"""
+        now = time.monotonic()
+        entry = self._entries[key]
+        if self._is_idle(entry, now):
+            self._evict(key, 'idle')
+            raise KeyError(key)
+        self._entries[key] = (now, entry[1], entry[2])
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def _store(self, key, compact):
+        now = time.monotonic()
+        size = compact_size(compact)
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= old[2]
+        self._entries[key] = (now, compact, size)
+        self._bytes += size
+
+        if now - self._last_sweep >= self.sweep_interval:
+            self._sweep_idle(now)
+
+        # Limit pamięci - najdawniej używane rozmowy (nigdy bieżąca)
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            self._evict(next(iter(self._entries)), 'memory')
+
+    def _sweep_idle(self, now):
+        """Kolejność LRU = kolejność dostępu, więc wygasłe są na początku"""
+        self._last_sweep = now
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if not self._is_idle(entry, now):
+                break
+            self._evict(key, 'idle')
+
+    def _evict(self, key, reason):
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+        self.evictions[reason] += 1
+        CONVERSATION_EVICTIONS.inc(reason=reason)
+
+    def get_stats(self):
+        """Liczba rozmów, przybliżone bajty, usunięcia (dla /api/health)"""
+        with self._lock:
+            return {
+                'backend': 'memory',
+                'entries': len(self._live_entries()),
+                'approx_bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'idle_ttl_s': self.idle_ttl,
+                'evictions': dict(self.evictions)
+            }
+
+# ==============================================
+# SQLITE - ZWARTY ZAPIS + TTL
+# ==============================================
+
+class SQLiteConversationStore(SQLiteStore):
+    """Historia w SQLite w zwartym formacie; bezczynne rozmowy usuwane okresowo"""
+
+    def __init__(self, name, idle_ttl=CONVERSATION_IDLE_TTL, sweep_interval=CONVERSATION_SWEEP_INTERVAL, **kwargs):
+        super().__init__(name, **kwargs)
+        self.idle_ttl = idle_ttl
+        self.sweep_interval = sweep_interval
+        self._last_sweep = 0.0
+        self.evictions = {'idle': 0}
+
+    def _dumps(self, value):
+        return pickle.dumps(encode_history(value))
+
+    def _loads(self, blob):
+        compact = pickle.loads(blob)
+        if compact and isinstance(compact[0], dict):
+            return list(compact)      # zapis sprzed zwartego formatu
+        return decode_history(compact)
+
+    def update_value(self, key, func, default_factory=None):
+        now = time.monotonic()
+        if now - self._last_sweep >= self.sweep_interval:
+            self._last_sweep = now
+            expired = self.expire_idle(self.idle_ttl)
+            if expired:
+                self.evictions['idle'] += expired
+                CONVERSATION_EVICTIONS.inc(expired, reason='idle')
+                logger.info(f"🧹 Usunięto {expired} bezczynnych rozmów")
+        return super().update_value(key, func, default_factory)
+
+    def get_stats(self):
+        return {
+            'backend': 'sqlite',
+            'entries': len(self),
+            'approx_bytes': self.size_bytes(),
+            'idle_ttl_s': self.idle_ttl,
+            'evictions': dict(self.evictions)
+        }
+
+def create_conversation_store(name='user_conversations'):
+    """Store historii rozmów dla skonfigurowanego STATE_BACKEND"""
+    if STATE_BACKEND == 'sqlite':
+        return SQLiteConversationStore(name)
+    return ConversationStore(name)
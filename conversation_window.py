@@ -0,0 +1,131 @@
+"""
+Conversation Window - Historia rozmowy w budżecie tokenów
+- listy wolnych terminów (format_available_slots) po odpowiedzi klienta
+  zamieniane na jedną zwięzłą linię z samymi godzinami
+- najstarsze wiadomości, które nie mieszczą się w budżecie, trafiają
+  do krótkiego podsumowania (wpis "system" na początku historii)
+
+Bez dodatkowego wywołania LLM - podsumowanie to skrócone linie
+Klient/Asystent, najnowsze mają pierwszeństwo.
+"""
+
+import logging
+import os
+import re
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# ==============================================
+# KONFIGURACJA
+# ==============================================
+
+HISTORY_TOKEN_BUDGET = int(os.getenv('HISTORY_TOKEN_BUDGET', '1200'))
+HISTORY_MAX_MESSAGES = int(os.getenv('HISTORY_MAX_MESSAGES', '20'))
+HISTORY_MIN_RECENT = int(os.getenv('HISTORY_MIN_RECENT', '4'))
+HISTORY_SUMMARY_MAX_CHARS = int(os.getenv('HISTORY_SUMMARY_MAX_CHARS', '800'))
+
+SUMMARY_HEADER = "PODSUMOWANIE WCZEŚNIEJSZEJ ROZMOWY:"
+SUMMARY_LINE_CHARS = 120
+CHARS_PER_TOKEN = 3        # polski tekst w tokenizerze Llama - ostrożne przybliżenie
+
+HISTORY_FOLDED = metrics.counter(
+    'bot_history_folded_messages_total', 'Wiadomości przeniesione do podsumowania rozmowy'
+)
+HISTORY_COMPACTED = metrics.counter(
+    'bot_history_compacted_listings_total', 'Listy terminów zastąpione zwięzłą linią'
+)
+HISTORY_TOKENS = metrics.histogram(
+    'bot_history_tokens', 'Przybliżona liczba tokenów historii po przycięciu',
+    buckets=(100, 250, 500, 750, 1000, 1500, 2000, 3000, 5000)
+)
+
+# Lista z format_available_slots: nagłówek, linie "- *Dzień dd.mm HH:MM*", pytanie na końcu
+_SLOT_LISTING = re.compile(
+    r'Terminy na (?P<day>[^\n(]+?) \((?P<info>[^)\n]*)\):\n(?P<slots>(?:- \*[^\n]*\*(?:\n|$))+)'
+    r'(?:Który z tych terminów Ci najbardziej odpowiada\? 😊)?'
+)
+_SLOT_TIME = re.compile(r'(\d{1,2}:\d{2})\*')
+
+# ==============================================
+# SZACOWANIE I KOMPAKTOWANIE
+# ==============================================
+
+def estimate_tokens(text):
+    """Przybliżona liczba tokenów (bez tokenizera)"""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+def history_tokens(history):
+    """Przybliżona liczba tokenów całej historii (+ narzut na wiadomość)"""
+    return sum(estimate_tokens(message['content']) + 4 for message in history)
+
+def _compact_listing(match):
+    times = _SLOT_TIME.findall(match.group('slots'))
+    return f"[Podano wolne terminy na {match.group('day')} ({match.group('info')}): {', '.join(times)}]"
+
+def compact_slot_listing(text):
+    """Lista terminów -> jedna linia z godzinami (bez zmian, gdy listy nie ma)"""
+    if 'Terminy na ' not in text:
+        return text
+    return _SLOT_LISTING.sub(_compact_listing, text)
+
+def _summary_line(message):
+    who = "Klient" if message['role'] == 'user' else "Asystent"
+    text = ' '.join(message['content'].split())
+    if len(text) > SUMMARY_LINE_CHARS:
+        text = text[:SUMMARY_LINE_CHARS - 3] + "..."
+    return f"- {who}: {text}"
+
+def _split_summary(history):
+    """(linie podsumowania, wiadomości rozmowy)"""
+    if history and history[0]['role'] == 'system' and history[0]['content'].startswith(SUMMARY_HEADER):
+        lines = history[0]['content'].split('\n')[1:]
+        return lines, history[1:]
+    return [], list(history)
+
+# ==============================================
+# OKNO ROZMOWY
+# ==============================================
+
+def trim_history(history, token_budget=HISTORY_TOKEN_BUDGET, max_messages=HISTORY_MAX_MESSAGES,
+                 min_recent=HISTORY_MIN_RECENT, summary_max_chars=HISTORY_SUMMARY_MAX_CHARS):
+    """
+    Dopasuj historię do budżetu tokenów
+
+    Returns:
+        list: [opcjonalny wpis z podsumowaniem] + najnowsze wiadomości
+    """
+    summary_lines, turns = _split_summary(history)
+
+    # 1. Listy terminów, na które klient już odpowiedział
+    last_user = max((i for i, message in enumerate(turns) if message['role'] == 'user'), default=-1)
+    for i in range(last_user):
+        message = turns[i]
+        if message['role'] == 'assistant':
+            compacted = compact_slot_listing(message['content'])
+            if compacted != message['content']:
+                turns[i] = {"role": "assistant", "content": compacted}
+                HISTORY_COMPACTED.inc()
+
+    # 2. Najstarsze wiadomości do podsumowania, dopóki nie mieścimy się w budżecie
+    folded = 0
+    while len(turns) > min_recent and (
+            len(turns) > max_messages
+            or history_tokens(turns) + estimate_tokens('\n'.join(summary_lines)) > token_budget
+            or turns[0]['role'] != 'user'):
+        summary_lines.append(_summary_line(turns.pop(0)))
+        folded += 1
+
+    if folded:
+        HISTORY_FOLDED.inc(folded)
+        logger.info(f"📚 Przeniesiono {folded} wiadomości do podsumowania (zostało {len(turns)})")
+
+    # 3. Podsumowanie w limicie znaków - najnowsze linie mają pierwszeństwo
+    while summary_lines and len('\n'.join(summary_lines)) > summary_max_chars:
+        summary_lines.pop(0)
+
+    if summary_lines:
+        turns.insert(0, {"role": "system", "content": '\n'.join([SUMMARY_HEADER] + summary_lines)})
+    HISTORY_TOKENS.observe(history_tokens(turns))
+    return turns
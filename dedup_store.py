@@ -0,0 +1,206 @@
+"""
+Dedup Store - Pamięć przetworzonych wiadomości (message_id) z webhook'a
+Facebook potrafi dostarczyć tę samą wiadomość kilka razy - każde message_id
+obsługujemy tylko raz w oknie czasowym (TTL).
+
+Dwie implementacje:
+- MemoryDedupStore - w procesie, kolejność wstawienia + TTL, O(1) sprawdzenie
+- SQLiteDedupStore - plik SQLite (WAL) współdzielony przez kilka procesów
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# ==============================================
+# KONFIGURACJA
+# ==============================================
+
+# Domyślnie ten sam backend i plik co reszta stanu (state_backend)
+DEDUP_BACKEND = os.getenv('DEDUP_BACKEND', os.getenv('STATE_BACKEND', 'memory'))   # memory | sqlite
+DEDUP_TTL_SECONDS = float(os.getenv('DEDUP_TTL_SECONDS', '3600'))
+DEDUP_MAX_ENTRIES = int(os.getenv('DEDUP_MAX_ENTRIES', '10000'))
+DEDUP_SQLITE_PATH = os.getenv('DEDUP_SQLITE_PATH', os.getenv('STATE_SQLITE_PATH', 'bot_state.db'))
+
+# ==============================================
+# PAMIĘĆ W PROCESIE
+# ==============================================
+
+class MemoryDedupStore:
+    """Słownik uporządkowany wg czasu wstawienia - najstarsze wpisy wypadają pierwsze"""
+
+    def __init__(self, ttl_seconds=DEDUP_TTL_SECONDS, max_entries=DEDUP_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()   # message_id -> czas oznaczenia
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def check_and_mark(self, message_id):
+        """
+        Sprawdź i oznacz wiadomość jednym ruchem
+
+        Returns:
+            bool: True jeśli to duplikat (już przetworzona)
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._evict_expired(now)
+
+            if message_id in self._entries:
+                self._hits += 1
+                return True
+
+            self._misses += 1
+            self._entries[message_id] = now
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+            return False
+
+    def __contains__(self, message_id):
+        with self._lock:
+            self._evict_expired(time.monotonic())
+            return message_id in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get_stats(self):
+        """Liczniki trafień/pudeł/usunięć (dla /api/health)"""
+        with self._lock:
+            return {
+                'backend': 'memory',
+                'entries': len(self._entries),
+                'hits': self._hits,
+                'misses': self._misses,
+                'evictions': self._evictions
+            }
+
+    def _evict_expired(self, now):
+        """Usuń przeterminowane wpisy z początku (zamortyzowane O(1))"""
+        cutoff = now - self.ttl_seconds
+        while self._entries:
+            oldest_id, marked_at = next(iter(self._entries.items()))
+            if marked_at > cutoff:
+                break
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+# ==============================================
+# SQLITE - WSPÓLNE DLA WIELU PROCESÓW
+# ==============================================
+
+class SQLiteDedupStore:
+    """Tabela processed_messages w pliku SQLite (tryb WAL)"""
+
+    # Sprzątanie co N wstawień - żeby nie płacić za DELETE przy każdej wiadomości
+    CLEANUP_EVERY = 100
+
+    def __init__(self, path=DEDUP_SQLITE_PATH, ttl_seconds=DEDUP_TTL_SECONDS, max_entries=DEDUP_MAX_ENTRIES):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+        conn = self._connection()
+        conn.execute("""CREATE TABLE IF NOT EXISTS processed_messages (
+                            message_id TEXT PRIMARY KEY,
+                            seen_at REAL NOT NULL
+                        )""")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_processed_messages_seen_at ON processed_messages (seen_at)")
+        logger.info(f"✅ Dedup SQLite: {path}")
+
+    def _connection(self):
+        """Osobne połączenie na wątek"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def check_and_mark(self, message_id):
+        """
+        Sprawdź i oznacz wiadomość jednym zapytaniem (atomowo między procesami)
+
+        Returns:
+            bool: True jeśli to duplikat (już przetworzona)
+        """
+        now = time.time()
+        cursor = self._connection().execute(
+            """INSERT INTO processed_messages (message_id, seen_at) VALUES (?, ?)
+               ON CONFLICT(message_id) DO UPDATE SET seen_at = excluded.seen_at
+               WHERE processed_messages.seen_at < ?""",
+            (message_id, now, now - self.ttl_seconds)
+        )
+        is_duplicate = cursor.rowcount == 0
+
+        with self._lock:
+            if is_duplicate:
+                self._hits += 1
+            else:
+                self._misses += 1
+            cleanup = not is_duplicate and self._misses % self.CLEANUP_EVERY == 0
+        if cleanup:
+            self._cleanup(now)
+        return is_duplicate
+
+    def __contains__(self, message_id):
+        row = self._connection().execute(
+            "SELECT 1 FROM processed_messages WHERE message_id = ? AND seen_at >= ?",
+            (message_id, time.time() - self.ttl_seconds)
+        ).fetchone()
+        return row is not None
+
+    def __len__(self):
+        return self._connection().execute("SELECT COUNT(*) FROM processed_messages").fetchone()[0]
+
+    def get_stats(self):
+        """Liczniki trafień/pudeł/usunięć tego procesu (dla /api/health)"""
+        with self._lock:
+            return {
+                'backend': 'sqlite',
+                'entries': len(self),
+                'hits': self._hits,
+                'misses': self._misses,
+                'evictions': self._evictions
+            }
+
+    def _cleanup(self, now):
+        """Usuń przeterminowane wpisy i przytnij tabelę do max_entries"""
+        try:
+            conn = self._connection()
+            removed = conn.execute(
+                "DELETE FROM processed_messages WHERE seen_at < ?",
+                (now - self.ttl_seconds,)
+            ).rowcount
+            removed += conn.execute(
+                """DELETE FROM processed_messages WHERE message_id IN (
+                       SELECT message_id FROM processed_messages
+                       ORDER BY seen_at DESC LIMIT -1 OFFSET ?
+                   )""",
+                (self.max_entries,)
+            ).rowcount
+            with self._lock:
+                self._evictions += removed
+        except sqlite3.Error as e:
+            logger.error(f"❌ Błąd sprzątania dedup SQLite: {e}")
+
+def create_dedup_store():
+    """Utwórz store zgodnie z DEDUP_BACKEND"""
+    if DEDUP_BACKEND == 'sqlite':
+        return SQLiteDedupStore()
+    return MemoryDedupStore()
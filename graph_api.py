@@ -0,0 +1,165 @@
+"""
+Graph API - Wspólny klient HTTP dla Facebook Graph API
+Jedna sesja z pulą połączeń keep-alive, timeouty, retry z backoffem
+i pomiar czasu każdego wywołania
+"""
+
+import logging
+import os
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# ==============================================
+# KONFIGURACJA
+# ==============================================
+
+GRAPH_API_BASE_URL = os.getenv('GRAPH_API_BASE_URL', 'https://graph.facebook.com/v18.0')
+GRAPH_API_CONNECT_TIMEOUT = float(os.getenv('GRAPH_API_CONNECT_TIMEOUT', '3'))
+GRAPH_API_READ_TIMEOUT = float(os.getenv('GRAPH_API_READ_TIMEOUT', '10'))
+GRAPH_API_MAX_RETRIES = int(os.getenv('GRAPH_API_MAX_RETRIES', '3'))
+GRAPH_API_POOL_SIZE = int(os.getenv('GRAPH_API_POOL_SIZE', '10'))
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+GRAPH_API_LATENCY = metrics.histogram(
+    'bot_graph_api_request_seconds', 'Czas pojedynczego wywołania Graph API',
+    ('method', 'endpoint', 'outcome')
+)
+
+# ==============================================
+# KLIENT GRAPH API
+# ==============================================
+
+class GraphApiClient:
+    """Klient Graph API z pulą połączeń, retry i statystykami"""
+
+    def __init__(self, access_token, base_url=GRAPH_API_BASE_URL, transport=None, session=None,
+                 timeout=(GRAPH_API_CONNECT_TIMEOUT, GRAPH_API_READ_TIMEOUT),
+                 max_retries=GRAPH_API_MAX_RETRIES, backoff_base=0.5, backoff_max=8.0):
+        """
+        Args:
+            access_token (str): Page Access Token
+            base_url (str): Adres API - w testach lokalny serwer zastępczy
+            transport: Własny adapter requests (np. do testów) montowany na base_url
+            session: Gotowa sesja requests (zamiast tworzenia nowej)
+            timeout (tuple): (connect, read) w sekundach
+            max_retries (int): Ile razy ponawiać przy 5xx/429 i błędach sieci
+        """
+        self.access_token = access_token
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self.session = session or requests.Session()
+        if session is None:
+            # Retry robimy sami (z jitterem) - adapter ma ich nie dublować
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=GRAPH_API_POOL_SIZE, max_retries=0)
+            self.session.mount('https://', adapter)
+            self.session.mount('http://', adapter)
+        if transport is not None:
+            self.session.mount(self.base_url, transport)
+
+        self._lock = threading.Lock()
+        self._stats = {
+            'calls': 0,
+            'errors': 0,
+            'retries': 0,
+            'latency_total': 0.0,
+            'latency_max': 0.0,
+            'last_latency': 0.0
+        }
+
+    def get(self, path, params=None):
+        """GET na Graph API"""
+        return self.request('GET', path, params=params)
+
+    def post(self, path, json=None, params=None):
+        """POST na Graph API"""
+        return self.request('POST', path, params=params, json=json)
+
+    def request(self, method, path, params=None, json=None):
+        """
+        Wywołaj Graph API z retry na 5xx/429 i błędach połączenia
+
+        Returns:
+            requests.Response|None: Ostatnia odpowiedź lub None gdy nie udało się połączyć
+        """
+        url = f"{self.base_url}/{path.lstrip('/')}"
+        params = dict(params or {})
+        if self.access_token:
+            params.setdefault('access_token', self.access_token)
+
+        response = None
+        for attempt in range(self.max_retries + 1):
+            if attempt > 0:
+                with self._lock:
+                    self._stats['retries'] += 1
+                self._sleep_backoff(attempt, response)
+
+            start = time.perf_counter()
+            try:
+                response = self.session.request(method, url, params=params, json=json, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self._record(time.perf_counter() - start, error=True, method=method, path=path, outcome='connection_error')
+                logger.warning(f"⚠️ Graph API {method} {path} - błąd połączenia (próba {attempt + 1}): {e}")
+                response = None
+                continue
+
+            self._record(time.perf_counter() - start, error=response.status_code >= 400,
+                         method=method, path=path, outcome=str(response.status_code))
+
+            if response.status_code in RETRY_STATUS_CODES:
+                logger.warning(f"⚠️ Graph API {method} {path} - status {response.status_code} (próba {attempt + 1})")
+                continue
+
+            return response
+
+        logger.error(f"❌ Graph API {method} {path} - wyczerpano {self.max_retries} ponowień")
+        return response
+
+    def get_stats(self):
+        """Statystyki wywołań (dla /api/health)"""
+        with self._lock:
+            calls = self._stats['calls']
+            return {
+                'calls': calls,
+                'errors': self._stats['errors'],
+                'retries': self._stats['retries'],
+                'latency_avg_ms': round(self._stats['latency_total'] / calls * 1000, 1) if calls else 0.0,
+                'latency_max_ms': round(self._stats['latency_max'] * 1000, 1),
+                'last_latency_ms': round(self._stats['last_latency'] * 1000, 1)
+            }
+
+    def _record(self, latency, error=False, method='', path='', outcome=''):
+        """Zapisz czas wywołania (statystyki + histogram /metrics)"""
+        # Ostatni segment ścieżki ('messages', 'me') - bez ID strony w etykiecie
+        GRAPH_API_LATENCY.observe(latency, method=method, endpoint=path.rstrip('/').rsplit('/', 1)[-1], outcome=outcome)
+        with self._lock:
+            self._stats['calls'] += 1
+            self._stats['latency_total'] += latency
+            self._stats['latency_max'] = max(self._stats['latency_max'], latency)
+            self._stats['last_latency'] = latency
+            if error:
+                self._stats['errors'] += 1
+
+    def _sleep_backoff(self, attempt, response=None):
+        """Odczekaj przed ponowieniem - wykładniczo z pełnym jitterem, szanuj Retry-After"""
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1))))
+        if response is not None:
+            retry_after = response.headers.get('Retry-After')
+            if retry_after:
+                try:
+                    delay = min(self.backoff_max, max(delay, float(retry_after)))
+                except ValueError:
+                    pass
+        time.sleep(delay)
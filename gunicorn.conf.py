@@ -0,0 +1,28 @@
+"""
+Konfiguracja gunicorn - tryb wieloprocesowy
+Uruchomienie: STATE_BACKEND=sqlite gunicorn -c gunicorn.conf.py wsgi:app
+
+Każdy worker to osobny proces z własnymi kolejkami i wątkami, więc
+wspólny stan (historia rozmów, sesje, deduplikacja) musi być w SQLite.
+"""
+
+import logging
+import multiprocessing
+import os
+
+bind = os.getenv('BIND', '0.0.0.0:5000')
+workers = int(os.getenv('WEB_CONCURRENCY', str(multiprocessing.cpu_count())))
+worker_class = 'gthread'
+threads = int(os.getenv('WEB_THREADS', '4'))
+timeout = 30
+
+# Bez preload - każdy worker sam importuje backend i startuje swoje wątki (po fork)
+preload_app = False
+
+def on_starting(server):
+    """Ostrzeż, gdy kilka procesów miałoby osobne stany w pamięci"""
+    if workers > 1 and os.getenv('STATE_BACKEND', 'memory') != 'sqlite':
+        logging.getLogger('gunicorn.error').warning(
+            "⚠️ %d workerów ze STATE_BACKEND=memory - każdy proces ma własną historię rozmów! "
+            "Ustaw STATE_BACKEND=sqlite", workers
+        )
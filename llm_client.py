@@ -0,0 +1,296 @@
+"""
+LLM Client - Ochrona wywołań Together
+- ograniczona liczba równoczesnych wywołań (semafor) z limitem czekania
+- termin (deadline) na całe wywołanie razem z ponowieniami
+- ponowienia z wykładniczym odstępem przy 429 / 5xx / błędach połączenia
+- bezpiecznik (circuit breaker) per model: po serii błędów szybka odmowa
+  zamiast blokowania workerów, po czasie jedna próba kontrolna
+- opcjonalny model zapasowy (TOGETHER_FALLBACK_MODEL)
+"""
+
+import logging
+import os
+import random
+import threading
+import time
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# ==============================================
+# KONFIGURACJA
+# ==============================================
+
+LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', os.getenv('MESSAGE_WORKERS', '4')))
+LLM_QUEUE_TIMEOUT = float(os.getenv('LLM_QUEUE_TIMEOUT', '10'))
+LLM_DEADLINE = float(os.getenv('LLM_DEADLINE', '45'))
+LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', '2'))
+LLM_BACKOFF_BASE = float(os.getenv('LLM_BACKOFF_BASE', '0.5'))
+LLM_BREAKER_THRESHOLD = int(os.getenv('LLM_BREAKER_THRESHOLD', '5'))
+LLM_BREAKER_RESET = float(os.getenv('LLM_BREAKER_RESET', '30'))
+TOGETHER_FALLBACK_MODEL = os.getenv('TOGETHER_FALLBACK_MODEL') or None
+
+# Błędy przejściowe bez kodu HTTP (nazwy klas z SDK Together v1 i v2)
+_TRANSIENT_ERRORS = {'APIConnectionError', 'APITimeoutError', 'Timeout', 'TimeoutError',
+                     'ServiceUnavailableError', 'RateLimitError'}
+
+LLM_REQUESTS = metrics.counter(
+    'bot_llm_requests_total', 'Próby wywołania LLM', ('model', 'outcome')
+)
+LLM_RETRIES = metrics.counter(
+    'bot_llm_retries_total', 'Ponowienia wywołań LLM', ('model', 'reason')
+)
+LLM_REJECTIONS = metrics.counter(
+    'bot_llm_rejections_total', 'Wywołania LLM odrzucone bez odpowiedzi', ('reason',)
+)
+LLM_FALLBACKS = metrics.counter(
+    'bot_llm_fallbacks_total', 'Odpowiedzi z modelu zapasowego', ('model',)
+)
+LLM_PERMIT_WAIT = metrics.histogram(
+    'bot_llm_permit_wait_seconds', 'Czas czekania na wolne miejsce wywołania LLM',
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+LLM_CIRCUIT_STATE = metrics.gauge(
+    'bot_llm_circuit_state', 'Stan bezpiecznika LLM (0 zamknięty, 1 próba, 2 otwarty)', ('model',)
+)
+
+class LLMUnavailable(Exception):
+    """LLM niedostępny: brak miejsca, otwarty bezpiecznik albo przekroczony termin"""
+
+    def __init__(self, reason, last_error=None):
+        super().__init__(f"LLM niedostępny ({reason})" + (f": {last_error}" if last_error else ""))
+        self.reason = reason
+        self.last_error = last_error
+
+def error_status(error):
+    """Kod HTTP błędu SDK (v2: status_code, v1: http_status) albo None"""
+    for attribute in ('status_code', 'http_status'):
+        status = getattr(error, attribute, None)
+        if isinstance(status, int):
+            return status
+    status = getattr(getattr(error, 'response', None), 'status_code', None)
+    return status if isinstance(status, int) else None
+
+def is_retryable(error):
+    """429, 5xx, timeouty i błędy połączenia - tak; 400/401/404 - nie"""
+    status = error_status(error)
+    if status is not None:
+        return status == 429 or status >= 500
+    return type(error).__name__ in _TRANSIENT_ERRORS
+
+def retry_after(error):
+    """Nagłówek Retry-After (sekundy) z odpowiedzi 429, jeśli jest"""
+    headers = getattr(getattr(error, 'response', None), 'headers', None) or {}
+    try:
+        return float(headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+# ==============================================
+# BEZPIECZNIK
+# ==============================================
+
+CLOSED, HALF_OPEN, OPEN = 'closed', 'half_open', 'open'
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+class CircuitBreaker:
+    """Otwiera się po `threshold` kolejnych błędach; po `reset_timeout` przepuszcza jedną próbę"""
+
+    def __init__(self, name, threshold=LLM_BREAKER_THRESHOLD, reset_timeout=LLM_BREAKER_RESET):
+        self.name = name
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trips = 0
+        self.probing = False          # próba kontrolna w toku - musi skończyć się wynikiem albo abort_probe
+        self._lock = threading.Lock()
+        LLM_CIRCUIT_STATE.set(0, model=name)
+
+    def allow(self):
+        """Czy można teraz wywołać model"""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                # Jedna próba kontrolna - kolejne czekają na jej wynik
+                self.probing = True
+                self._set_state(HALF_OPEN)
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.probing = False
+            if self.state != CLOSED:
+                logger.info(f"✅ Bezpiecznik LLM {self.name} zamknięty")
+                self._set_state(CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self.probing = False
+            if self.state == HALF_OPEN or self.failures >= self.threshold:
+                if self.state != OPEN:
+                    self.trips += 1
+                    logger.error(f"🔌 Bezpiecznik LLM {self.name} otwarty po {self.failures} błędach")
+                self.opened_at = time.monotonic()
+                self._set_state(OPEN)
+
+    def abort_probe(self):
+        """Próba kontrolna skończyła się bez odpowiedzi dostawcy (termin, brak klienta) - z powrotem OPEN"""
+        with self._lock:
+            if not self.probing:
+                return
+            self.probing = False
+            self.opened_at = time.monotonic()
+            self._set_state(OPEN)
+            logger.warning(f"🔌 Bezpiecznik LLM {self.name} - próba kontrolna bez wyniku, ponownie otwarty")
+
+    def _set_state(self, state):
+        self.state = state
+        LLM_CIRCUIT_STATE.set(_STATE_VALUES[state], model=self.name)
+
+# ==============================================
+# KLIENT
+# ==============================================
+
+class LLMClient:
+    """Wywołania LLM przez semafor, termin, ponowienia, bezpiecznik i model zapasowy"""
+
+    def __init__(self, client_factory, model, fallback_model=TOGETHER_FALLBACK_MODEL,
+                 max_concurrency=LLM_MAX_CONCURRENCY, queue_timeout=LLM_QUEUE_TIMEOUT,
+                 deadline=LLM_DEADLINE, max_retries=LLM_MAX_RETRIES, backoff_base=LLM_BACKOFF_BASE,
+                 breaker_threshold=LLM_BREAKER_THRESHOLD, breaker_reset=LLM_BREAKER_RESET,
+                 sleep=time.sleep):
+        """
+        Args:
+            client_factory: () -> klient Together (np. get_ai_client)
+            model (str): Model podstawowy
+            fallback_model (str|None): Model zapasowy, gdy podstawowy zawiedzie
+        """
+        self.client_factory = client_factory
+        self.models = [model] + ([fallback_model] if fallback_model and fallback_model != model else [])
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.breakers = {name: CircuitBreaker(name, breaker_threshold, breaker_reset) for name in self.models}
+        self._sleep = sleep
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    def in_flight(self):
+        """Liczba zajętych miejsc (wywołania w toku) - sygnał dla kontroli przyjęć"""
+        with self._lock:
+            return self._in_flight
+
+    def execute(self, fn):
+        """
+        Wykonaj wywołanie LLM
+
+        Args:
+            fn: (klient, model, timeout) -> wynik; strumień czytany wewnątrz fn
+                trzyma miejsce w semaforze do końca
+
+        Raises:
+            LLMUnavailable: brak miejsca, otwarte bezpieczniki albo koniec terminu
+            Exception: błąd nieprzejściowy (np. 400) - bez ponowień
+        """
+        wait_start = time.perf_counter()
+        if not self._semaphore.acquire(timeout=self.queue_timeout):
+            LLM_REJECTIONS.inc(reason='busy')
+            raise LLMUnavailable('busy')
+        LLM_PERMIT_WAIT.observe(time.perf_counter() - wait_start)
+
+        with self._lock:
+            self._in_flight += 1
+        try:
+            return self._execute(fn, time.monotonic() + self.deadline)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+            self._semaphore.release()
+
+    def _execute(self, fn, deadline_at):
+        last_error = None
+        tried_any = False
+        for index, model in enumerate(self.models):
+            if not self.breakers[model].allow():
+                continue
+            tried_any = True
+            try:
+                result = self._call_with_retries(fn, model, deadline_at)
+            except LLMUnavailable as e:
+                last_error = e.last_error
+                continue
+            if index > 0:
+                LLM_FALLBACKS.inc(model=model)
+                logger.warning(f"🔁 Odpowiedź z modelu zapasowego {model}")
+            return result
+
+        reason = 'deadline' if tried_any and time.monotonic() >= deadline_at else (
+            'failed' if tried_any else 'circuit_open')
+        LLM_REJECTIONS.inc(reason=reason)
+        raise LLMUnavailable(reason, last_error)
+
+    def _call_with_retries(self, fn, model, deadline_at):
+        breaker = self.breakers[model]
+        try:
+            return self._attempts(fn, model, breaker, deadline_at)
+        finally:
+            # Każde wyjście z próby kontrolnej ją rozstrzyga - inaczej HALF_OPEN zostałby na zawsze
+            breaker.abort_probe()
+
+    def _attempts(self, fn, model, breaker, deadline_at):
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            remaining = deadline_at - time.monotonic()
+            if remaining <= 0:
+                break
+            client = self.client_factory()
+            try:
+                result = fn(client, model, remaining)
+            except Exception as e:
+                last_error = e
+                if not is_retryable(e):
+                    # Błąd zapytania (400, 401...) - dostawca odpowiedział, bez ponowień
+                    LLM_REQUESTS.inc(model=model, outcome='error')
+                    breaker.record_success()
+                    raise
+                LLM_REQUESTS.inc(model=model, outcome='retryable_error')
+                breaker.record_failure()
+                status = error_status(e)
+                logger.warning(f"⚠️ LLM {model} próba {attempt + 1}: {type(e).__name__} ({status})")
+                if attempt == self.max_retries or not breaker.allow():
+                    break
+                delay = retry_after(e) or self.backoff_base * (2 ** attempt) * (1 + random.random() / 2)
+                if time.monotonic() + delay >= deadline_at:
+                    break
+                LLM_RETRIES.inc(model=model, reason=str(status or type(e).__name__))
+                self._sleep(delay)
+                continue
+
+            LLM_REQUESTS.inc(model=model, outcome='ok')
+            breaker.record_success()
+            return result
+        raise LLMUnavailable('failed', last_error)
+
+    def get_stats(self):
+        """Stan dla /api/health"""
+        return {
+            'in_flight': self.in_flight(),
+            'max_concurrency': self.max_concurrency,
+            'deadline_s': self.deadline,
+            'max_retries': self.max_retries,
+            'models': self.models,
+            'circuits': {
+                name: {'state': breaker.state, 'failures': breaker.failures, 'trips': breaker.trips}
+                for name, breaker in self.breakers.items()
+            }
+        }
@@ -0,0 +1,183 @@
+"""
+LLM Stream - Strumieniowe odpowiedzi Together z odfiltrowaniem <think>
+Tokeny są czytane na bieżąco, blok rozumowania DeepSeek-R1 odrzucany
+przyrostowo, a zapytanie kończone, gdy w widocznej części pojawi się
+kompletna komenda sterująca (CHECK_AVAILABILITY:dzień albo pełna linia
+✅ REZERWACJA POTWIERDZONA: ... tel: 123456789).
+
+Zwracany jest surowy tekst (z <think>) - dalsze przetwarzanie
+w bot_logic_ai działa bez zmian.
+"""
+
+import logging
+import re
+import time
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+FIRST_USEFUL_BYTE = metrics.histogram(
+    'bot_together_first_useful_byte_seconds', 'Czas do pierwszego widocznego znaku odpowiedzi (po <think>)', ('model',)
+)
+EARLY_STOPS = metrics.counter(
+    'bot_together_early_stops_total', 'Strumienie zakończone po komendzie sterującej', ('reason',)
+)
+
+# Tagi rozumowania (<think>, <thinking>) - początek i koniec
+_THINK_OPEN = re.compile(r'<think(?:ing)?>', re.IGNORECASE)
+_THINK_CLOSE = re.compile(r'</think(?:ing)?>', re.IGNORECASE)
+_MAX_TAG_LENGTH = len('</thinking>')
+
+# Komendy sterujące - kompletne dopiero, gdy po nich pojawił się znak kończący
+_CHECK_AVAILABILITY_DONE = re.compile(r'CHECK_AVAILABILITY:\w+\W')
+_BOOKING_DONE = re.compile(r'✅ REZERWACJA POTWIERDZONA:\s*\n?\s*[^,]+, [^,]+, [^,]+, tel: \d+\D')
+
+# ==============================================
+# FILTR <think>
+# ==============================================
+
+class ThinkFilter:
+    """Przyrostowe usuwanie bloków <think>...</think> z kolejnych fragmentów strumienia"""
+
+    def __init__(self):
+        self.visible = ''
+        self._buffer = ''
+        self._in_think = False
+
+    def feed(self, text):
+        """
+        Dodaj fragment strumienia
+
+        Returns:
+            str: Nowy widoczny tekst (poza blokami rozumowania)
+        """
+        self._buffer += text
+        emitted = []
+
+        while self._buffer:
+            if self._in_think:
+                close = _THINK_CLOSE.search(self._buffer)
+                if close is None:
+                    # Cały bufor to rozumowanie - zostaw tylko ewentualny początek tagu zamykającego
+                    self._buffer = self._buffer[-(_MAX_TAG_LENGTH - 1):]
+                    break
+                self._buffer = self._buffer[close.end():]
+                self._in_think = False
+                continue
+
+            open_tag = _THINK_OPEN.search(self._buffer)
+            close = _THINK_CLOSE.search(self._buffer)
+            if open_tag and (close is None or open_tag.start() < close.start()):
+                emitted.append(self._buffer[:open_tag.start()])
+                self._buffer = self._buffer[open_tag.end():]
+                self._in_think = True
+                continue
+            if close:
+                # Samotny tag zamykający - usuń sam tag (jak clean_thinking_response_enhanced)
+                emitted.append(self._buffer[:close.start()])
+                self._buffer = self._buffer[close.end():]
+                continue
+
+            # Przytrzymaj końcówkę, która może być początkiem tagu
+            hold_from = self._buffer.rfind('<')
+            if hold_from != -1 and len(self._buffer) - hold_from < _MAX_TAG_LENGTH and '>' not in self._buffer[hold_from:]:
+                emitted.append(self._buffer[:hold_from])
+                self._buffer = self._buffer[hold_from:]
+            else:
+                emitted.append(self._buffer)
+                self._buffer = ''
+            break
+
+        new_text = ''.join(emitted)
+        self.visible += new_text
+        return new_text
+
+    def flush(self):
+        """Koniec strumienia - oddaj przytrzymaną końcówkę (poza blokiem rozumowania)"""
+        rest = '' if self._in_think else self._buffer
+        self._buffer = ''
+        self.visible += rest
+        return rest
+
+def find_stop_reason(visible_text):
+    """Czy widoczna część zawiera już kompletną komendę sterującą"""
+    if 'CHECK_AVAILABILITY:' in visible_text and _CHECK_AVAILABILITY_DONE.search(visible_text):
+        return 'check_availability'
+    if 'REZERWACJA POTWIERDZONA:' in visible_text and _BOOKING_DONE.search(visible_text):
+        return 'booking_confirmed'
+    return None
+
+# ==============================================
+# STRUMIEŃ TOGETHER
+# ==============================================
+
+class StreamResult:
+    """Wynik strumienia - surowy tekst + informacje o przebiegu"""
+
+    def __init__(self, text, visible, chunks, usage=None, stop_reason=None, first_useful_s=None):
+        self.text = text
+        self.visible = visible
+        self.chunks = chunks
+        self.usage = usage
+        self.stop_reason = stop_reason
+        self.first_useful_s = first_useful_s
+
+def stream_completion(client, model, messages, max_tokens, temperature, timeout=None):
+    """
+    Wywołaj chat.completions w trybie stream i zakończ po kompletnej odpowiedzi
+
+    Args:
+        timeout (float|None): Limit czasu całego strumienia (sekundy) - po nim TimeoutError
+
+    Returns:
+        StreamResult
+    """
+    start = time.perf_counter()
+    request_options = {'timeout': timeout} if timeout is not None else {}
+    stream = client.chat.completions.create(
+        model=model,
+        messages=messages,
+        max_tokens=max_tokens,
+        temperature=temperature,
+        stream=True,
+        **request_options
+    )
+
+    think_filter = ThinkFilter()
+    raw_parts = []
+    chunks = 0
+    usage = None
+    stop_reason = None
+    first_useful_s = None
+
+    try:
+        for chunk in stream:
+            if timeout is not None and time.perf_counter() - start > timeout:
+                raise TimeoutError(f"Strumień {model} przekroczył {timeout:.1f}s")
+            usage = getattr(chunk, 'usage', None) or usage
+            if not chunk.choices:
+                continue
+            content = chunk.choices[0].delta.content
+            if not content:
+                continue
+            chunks += 1
+            raw_parts.append(content)
+
+            if think_filter.feed(content).strip() and first_useful_s is None:
+                first_useful_s = time.perf_counter() - start
+                FIRST_USEFUL_BYTE.observe(first_useful_s, model=model)
+
+            stop_reason = find_stop_reason(think_filter.visible)
+            if stop_reason:
+                EARLY_STOPS.inc(reason=stop_reason)
+                logger.info(f"✂️ Strumień zakończony wcześniej ({stop_reason}) po {chunks} fragmentach")
+                break
+    finally:
+        # Zamknięcie połączenia przerywa generowanie po stronie Together
+        close = getattr(stream, 'close', None)
+        if close:
+            close()
+
+    think_filter.flush()
+    return StreamResult(''.join(raw_parts), think_filter.visible, chunks, usage, stop_reason, first_useful_s)
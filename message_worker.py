@@ -0,0 +1,294 @@
+"""
+Message Worker - Pula wątków przetwarzających wiadomości z webhook'a Facebook
+Webhook tylko kolejkuje eventy i od razu zwraca 200 OK, a LLM, kalendarz
+i wysyłka odpowiedzi dzieją się w tle.
+
+Każdy nadawca (sender_id) ma własny "pas" - jego wiadomości są obsługiwane
+po kolei, a pasy różnych nadawców przetwarzane są równolegle.
+
+Przed executorem stoi MessageCoalescer - seria szybkich wiadomości jednego
+nadawcy ("hej", "chcę się umówić", "na jutro") trafia do LLM jako jedna tura.
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# ==============================================
+# KONFIGURACJA
+# ==============================================
+
+MESSAGE_WORKERS = int(os.getenv('MESSAGE_WORKERS', '4'))
+MESSAGE_QUEUE_MAX = int(os.getenv('MESSAGE_QUEUE_MAX', '1000'))
+COALESCE_WINDOW = float(os.getenv('COALESCE_WINDOW', '1.2'))      # Cisza po ostatniej wiadomości (0 = wyłączone)
+COALESCE_MAX_WAIT = float(os.getenv('COALESCE_MAX_WAIT', '4.0'))  # Maks. czekanie od pierwszej wiadomości serii
+
+# ==============================================
+# EXECUTOR Z PASAMI NA NADAWCĘ
+# ==============================================
+
+class SenderLaneExecutor:
+    """
+    Executor kluczowany po sender_id
+
+    - zadania jednego klucza wykonują się ściśle po kolei (jeden na raz)
+    - różne klucze wykonują się równolegle na wspólnej puli wątków
+    - wolne zadanie jednego klienta blokuje tylko jego pas
+    """
+
+    def __init__(self, handler, workers=MESSAGE_WORKERS, max_queue_size=MESSAGE_QUEUE_MAX):
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.max_queue_size = max_queue_size
+        self._lanes = {}              # klucz -> deque zadań czekających
+        self._ready = queue.Queue()   # klucze gotowe do obsłużenia (nie w trakcie!)
+        self._threads = []
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._in_progress = 0
+        self._processed = 0
+        self._failed = 0
+        self._rejected = 0
+
+    def start(self):
+        """Uruchom wątki workerów (idempotentne)"""
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(
+                    target=self._worker_loop,
+                    name=f"message-worker-{i}",
+                    daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+        logger.info(f"🧵 Uruchomiono {self.workers} workerów wiadomości")
+
+    def submit(self, key, *args):
+        """
+        Dodaj zadanie do pasa danego klucza bez blokowania
+
+        Args:
+            key: Klucz pasa (sender_id)
+            *args: Argumenty przekazywane do handlera
+
+        Returns:
+            bool: False jeśli kolejka jest pełna
+        """
+        self.start()
+        with self._lock:
+            if self._pending >= self.max_queue_size:
+                self._rejected += 1
+                logger.error(f"❌ Kolejka wiadomości pełna ({self.max_queue_size}) - odrzucam zadanie")
+                return False
+
+            self._pending += 1
+            lane = self._lanes.get(key)
+            if lane is None:
+                # Nowy pas - od razu gotowy do obsłużenia
+                self._lanes[key] = deque([(args, time.monotonic())])
+                self._ready.put(key)
+            else:
+                # Pas już czeka lub jest w trakcie - worker go podejmie po kolei
+                lane.append((args, time.monotonic()))
+        return True
+
+    def queue_depth(self):
+        """Liczba zadań czekających we wszystkich pasach"""
+        with self._lock:
+            return self._pending
+
+    def get_stats(self):
+        """Statystyki executora (dla /api/health)"""
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'queue_depth': self._pending,
+                'queue_max': self.max_queue_size,
+                'active_lanes': len(self._lanes),
+                'in_progress': self._in_progress,
+                'processed': self._processed,
+                'failed': self._failed,
+                'rejected': self._rejected
+            }
+
+    def _worker_loop(self):
+        """Pętla workera - weź gotowy pas, wykonaj jedno zadanie, oddaj pas"""
+        while True:
+            key = self._ready.get()
+            with self._lock:
+                args, enqueued_at = self._lanes[key].popleft()
+                self._pending -= 1
+                self._in_progress += 1
+            try:
+                waited = time.monotonic() - enqueued_at
+                if waited > 5:
+                    logger.warning(f"⏳ Zadanie {key} czekało w kolejce {waited:.1f}s")
+                self.handler(*args)
+                with self._lock:
+                    self._processed += 1
+            except Exception as e:
+                with self._lock:
+                    self._failed += 1
+                logger.error(f"❌ Błąd workera wiadomości ({key}): {e}")
+            finally:
+                with self._lock:
+                    self._in_progress -= 1
+                    if self._lanes[key]:
+                        # Kolejne zadanie tego nadawcy - na koniec kolejki (sprawiedliwość)
+                        self._ready.put(key)
+                    else:
+                        del self._lanes[key]
+
+# ==============================================
+# ŁĄCZENIE SERII WIADOMOŚCI (DEBOUNCE)
+# ==============================================
+
+class MessageCoalescer:
+    """
+    Okno debounce na nadawcę przed SenderLaneExecutor
+
+    Wiadomości nadawcy przychodzące w odstępach < window są zbierane w jedną
+    serię, która trafia do executora jako jedno zadanie:
+    executor.submit(key, key, [(message_id, text, received_at), ...])
+    Seria czeka najwyżej max_wait od pierwszej wiadomości. Gdy executor jest
+    pełny w chwili wysyłki, seria wraca do bufora i czeka na kolejną próbę
+    (webhook już odpowiedział 200 - wiadomości nie wolno zgubić).
+    """
+
+    def __init__(self, executor, window=COALESCE_WINDOW, max_wait=COALESCE_MAX_WAIT):
+        self.executor = executor
+        self.window = window
+        self.max_wait = max(window, max_wait)
+        self._buffers = {}     # klucz -> {'messages': [...], 'first_at': t, 'flush_at': t}
+        self._lock = threading.Lock()
+        self._messages_in = 0
+        self._batches_out = 0
+        self._largest_batch = 0
+        self._calls_saved = 0
+        self._rejected = 0
+        self._retries = 0
+
+    def add(self, key, message_id, text):
+        """
+        Dodaj wiadomość do serii nadawcy
+
+        Returns:
+            bool: False jeśli executor nie przyjmie już więcej zadań
+        """
+        message = (message_id, text, time.monotonic())
+        if self.window <= 0:
+            with self._lock:
+                self._messages_in += 1
+            return self._submit(key, [message])
+
+        with self._lock:
+            buffer = self._buffers.get(key)
+            if buffer is None:
+                if self.executor.queue_depth() >= self.executor.max_queue_size:
+                    self._rejected += 1
+                    return False
+                now = message[2]
+                self._buffers[key] = {
+                    'messages': [message],
+                    'first_at': now,
+                    'flush_at': now + self.window
+                }
+                self._schedule(key, self.window)
+            else:
+                # Kolejna wiadomość serii - przesuń termin, ale nie dalej niż max_wait
+                buffer['messages'].append(message)
+                buffer['flush_at'] = min(time.monotonic() + self.window,
+                                         buffer['first_at'] + self.max_wait)
+            self._messages_in += 1
+        return True
+
+    def has_pending(self, key):
+        """Czy nadawca ma serię czekającą w oknie łączenia"""
+        with self._lock:
+            return key in self._buffers
+
+    def flush_all(self):
+        """Wyślij od razu wszystkie czekające serie (np. przy zamykaniu)"""
+        with self._lock:
+            keys = list(self._buffers)
+        for key in keys:
+            self._flush(key, force=True)
+
+    def get_stats(self):
+        """Statystyki łączenia (dla /api/health)"""
+        with self._lock:
+            return {
+                'window_s': self.window,
+                'max_wait_s': self.max_wait,
+                'pending_senders': len(self._buffers),
+                'messages_in': self._messages_in,
+                'turns_out': self._batches_out,
+                'llm_calls_saved': self._calls_saved,
+                'largest_batch': self._largest_batch,
+                'rejected': self._rejected,
+                'flush_retries': self._retries
+            }
+
+    def _schedule(self, key, delay):
+        timer = threading.Timer(delay, self._flush, args=(key,))
+        timer.daemon = True
+        timer.start()
+
+    def _flush(self, key, force=False):
+        """Termin minął - przekaż serię do executora albo poczekaj na przesunięty termin"""
+        with self._lock:
+            buffer = self._buffers.get(key)
+            if buffer is None:
+                return
+            remaining = buffer['flush_at'] - time.monotonic()
+            if remaining > 0 and not force:
+                self._schedule(key, remaining)
+                return
+            del self._buffers[key]
+            messages = buffer['messages']
+        if force:
+            self._submit(key, messages)
+            return
+        if not self.executor.submit(key, key, messages):
+            self._requeue(key, buffer)
+            return
+        if len(messages) > 1:
+            logger.info(f"🧩 Połączono {len(messages)} wiadomości od {key} w jedną turę")
+        self._record_batch(messages)
+
+    def _requeue(self, key, buffer):
+        """Executor pełny - seria wraca do bufora (przed nowszymi wiadomościami), ponowna próba po window"""
+        with self._lock:
+            self._retries += 1
+            pending = self._buffers.get(key)
+            if pending is None:
+                buffer['flush_at'] = time.monotonic() + self.window
+                self._buffers[key] = buffer
+                self._schedule(key, self.window)
+            else:
+                # W międzyczasie przyszła nowa wiadomość - jej timer już czeka
+                pending['messages'][:0] = buffer['messages']
+                pending['first_at'] = buffer['first_at']
+        logger.warning(f"⏳ Kolejka pełna - seria od {key} czeka na ponowną próbę")
+
+    def _submit(self, key, messages):
+        if not self.executor.submit(key, key, messages):
+            with self._lock:
+                self._rejected += 1
+            logger.error(f"❌ Seria wiadomości od {key} odrzucona - kolejka pełna")
+            return False
+        self._record_batch(messages)
+        return True
+
+    def _record_batch(self, messages):
+        with self._lock:
+            self._batches_out += 1
+            self._calls_saved += len(messages) - 1
+            self._largest_batch = max(self._largest_batch, len(messages))
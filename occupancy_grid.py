@@ -0,0 +1,92 @@
+"""
+Occupancy Grid - Wolne terminy z minutowej siatki zajętości (NumPy)
+Zamiast sprawdzać każdy kandydat na slot względem każdego wydarzenia
+(parsowanie ISO przy każdym porównaniu), wydarzenia dnia są raz
+zamieniane na siatkę: ile wizyt trwa w danej minucie. Wolne starty dla
+dowolnej długości usługi to jedno przejście: suma w przesuwanym oknie
+(różnica sum skumulowanych) równa zero = w oknie nic się nie dzieje.
+
+Siatka to licznik równoczesnych wizyt (sweep-line: +1 na starcie, -1 na
+końcu, suma skumulowana), więc maksimum w oknie mówi też, ilu klientów
+danej usługi (SERVICE_CONFIG max_clients) zmieści się jeszcze w slocie.
+Wydarzenia, które nie są wizytą (cały dzień, urlop, "Zamknięte"), mają
+wagę BLOCKING_WEIGHT - zajmują cały limit niezależnie od usługi.
+"""
+
+import math
+from datetime import datetime
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Dwie doby od północy dnia - slot pod koniec dnia może wyjść poza północ
+GRID_MINUTES = 2 * 24 * 60
+
+# Waga wydarzenia blokującego - więcej niż jakikolwiek max_clients
+BLOCKING_WEIGHT = 1000
+
+def to_datetime(value, tz):
+    """Czas wydarzenia (ISO z API albo datetime z indeksu) -> datetime ze strefą; None gdy nieczytelny"""
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+        if value.tzinfo is None:
+            value = tz.localize(value)
+    return value
+
+def build_grid(busy_times, base, tz):
+    """
+    Siatka zajętości: grid[m] = suma wag wydarzeń trwających w minucie m od base
+
+    Args:
+        busy_times: [(start, koniec), ...] albo [(start, koniec, waga), ...] - napisy ISO
+                    albo datetime; bez wagi wydarzenie to jedna wizyta
+        base: północ dnia (ten sam offset co sprawdzane sloty)
+        tz: strefa dla czasów bez offsetu
+
+    Returns:
+        np.ndarray: int32, długość GRID_MINUTES
+    """
+    starts, ends, weights = [], [], []
+    for busy in busy_times:
+        busy_start, busy_end = to_datetime(busy[0], tz), to_datetime(busy[1], tz)
+        if busy_start is None or busy_end is None:
+            continue
+        # Minuta zajęta, jeśli wydarzenie obejmuje choć jej część
+        start = max(0, math.floor((busy_start - base).total_seconds() / 60))
+        end = min(GRID_MINUTES, math.ceil((busy_end - base).total_seconds() / 60))
+        if end > start:
+            starts.append(start)
+            ends.append(end)
+            weights.append(busy[2] if len(busy) > 2 else 1)
+
+    # Tablica różnic: +waga na starcie, -waga na końcu, suma skumulowana = zajęte miejsca
+    weights = np.asarray(weights, dtype=np.int32)
+    diff = np.zeros(GRID_MINUTES + 1, dtype=np.int32)
+    np.add.at(diff, np.asarray(starts, dtype=np.intp), weights)
+    np.add.at(diff, np.asarray(ends, dtype=np.intp), -weights)
+    return np.cumsum(diff[:-1], dtype=np.int32)
+
+def free_starts(grid, candidates, duration):
+    """
+    Które kandydackie starty (minuty od base) mają całe okno [start, start + duration) wolne
+
+    Returns:
+        np.ndarray: maska bool dla candidates
+    """
+    candidates = np.asarray(candidates, dtype=np.intp)
+    busy_before = np.concatenate(([0], np.cumsum(grid > 0)))
+    return busy_before[candidates + duration] - busy_before[candidates] == 0
+
+def remaining_capacity(grid, candidates, duration, max_clients):
+    """
+    Ilu klientów zmieści się jeszcze w oknie [start, start + duration) dla każdego startu
+
+    Returns:
+        np.ndarray: max_clients - najwięcej równoczesnych wizyt w oknie (nie mniej niż 0)
+    """
+    candidates = np.asarray(candidates, dtype=np.intp)
+    peak = sliding_window_view(grid, duration)[candidates].max(axis=1)
+    return np.maximum(max_clients - peak, 0)
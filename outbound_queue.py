@@ -0,0 +1,247 @@
+"""
+Outbound Queue - Kolejka wysyłki wiadomości do Messengera
+Dzieli długie odpowiedzi na części i planuje ich wysyłkę w tle:
+odstęp między częściami dla jednego odbiorcy, limit wysyłek na całą stronę
+i pomiar czasu dostarczenia. Żaden wątek nie śpi w oczekiwaniu na odstęp.
+"""
+
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# ==============================================
+# KONFIGURACJA
+# ==============================================
+
+OUTBOUND_CHUNK_SIZE = int(os.getenv('OUTBOUND_CHUNK_SIZE', '1500'))         # Bezpieczny limit (Facebook: 2000)
+OUTBOUND_CHUNK_DELAY = float(os.getenv('OUTBOUND_CHUNK_DELAY', '0.5'))     # Odstęp między częściami (s)
+OUTBOUND_PAGE_RATE = float(os.getenv('OUTBOUND_PAGE_RATE', '20'))          # Wysyłek na sekundę dla strony
+OUTBOUND_PAGE_BURST = int(os.getenv('OUTBOUND_PAGE_BURST', '40'))
+OUTBOUND_SENDERS = int(os.getenv('OUTBOUND_SENDERS', '4'))
+
+DELIVERY_LATENCY = metrics.histogram(
+    'bot_outbound_delivery_seconds', 'Czas od zakolejkowania odpowiedzi do wysłania ostatniej części'
+)
+WEBHOOK_TO_SEND_LATENCY = metrics.histogram(
+    'bot_webhook_to_send_seconds', 'Czas od odebrania wiadomości przez webhook do wysłania odpowiedzi'
+)
+
+def split_message(message_text, chunk_size=OUTBOUND_CHUNK_SIZE):
+    """Podziel wiadomość na części o maksymalnej długości"""
+    if len(message_text) <= chunk_size:
+        return [message_text]
+    return [message_text[i:i + chunk_size] for i in range(0, len(message_text), chunk_size)]
+
+# ==============================================
+# LIMIT WYSYŁEK STRONY
+# ==============================================
+
+class TokenBucket:
+    """Prosty token bucket - limit wysyłek dla całej strony"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+
+    def take(self, now):
+        """
+        Spróbuj pobrać token
+
+        Returns:
+            float: 0 jeśli pobrano, inaczej ile sekund czekać na token
+        """
+        if self.rate <= 0:
+            return 0.0
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+# ==============================================
+# DISPATCHER
+# ==============================================
+
+class _Delivery:
+    """Jedna wiadomość do dostarczenia (może mieć kilka części)"""
+
+    __slots__ = ('recipient_id', 'chunks', 'next_index', 'enqueued_at', 'received_at')
+
+    def __init__(self, recipient_id, chunks, received_at=None):
+        self.recipient_id = recipient_id
+        self.chunks = chunks
+        self.next_index = 0
+        self.enqueued_at = time.monotonic()
+        self.received_at = received_at
+
+class OutboundDispatcher:
+    """
+    Planista wysyłek
+
+    - wiadomości i ich części dla jednego odbiorcy idą ściśle po kolei
+    - między częściami jednej wiadomości jest odstęp (bez sleep w wątku)
+    - limit wysyłek strony obowiązuje wszystkich odbiorców razem
+    """
+
+    def __init__(self, send_func, chunk_size=OUTBOUND_CHUNK_SIZE, chunk_delay=OUTBOUND_CHUNK_DELAY,
+                 page_rate=OUTBOUND_PAGE_RATE, page_burst=OUTBOUND_PAGE_BURST, senders=OUTBOUND_SENDERS):
+        """
+        Args:
+            send_func: Funkcja (recipient_id, text) -> bool wysyłająca jedną część
+        """
+        self.send_func = send_func
+        self.chunk_size = chunk_size
+        self.chunk_delay = chunk_delay
+        self.senders = max(1, senders)
+        self._bucket = TokenBucket(page_rate, page_burst)
+        self._recipients = {}          # recipient_id -> deque(_Delivery)
+        self._schedule = []            # heap (due, seq, recipient_id)
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._pool = None
+        self._thread = None
+        self._stats = {
+            'enqueued': 0,
+            'delivered': 0,
+            'failed': 0,
+            'chunks_sent': 0,
+            'rate_limited': 0,
+            'latency_total': 0.0,
+            'latency_max': 0.0
+        }
+
+    def start(self):
+        """Uruchom wątek planisty i pulę wysyłających (idempotentne)"""
+        with self._cond:
+            if self._thread:
+                return
+            self._pool = ThreadPoolExecutor(max_workers=self.senders, thread_name_prefix='outbound-sender')
+            self._thread = threading.Thread(target=self._scheduler_loop, name='outbound-scheduler', daemon=True)
+            self._thread.start()
+        logger.info(f"📤 Uruchomiono kolejkę wysyłki ({self.senders} wątków wysyłających)")
+
+    def enqueue(self, recipient_id, message_text, received_at=None):
+        """
+        Zaplanuj wysyłkę wiadomości (nie blokuje)
+
+        Args:
+            received_at (float): time.monotonic() odebrania wiadomości klienta - do pomiaru webhook→wysyłka
+
+        Returns:
+            bool: True jeśli przyjęto do wysyłki
+        """
+        if not message_text:
+            return False
+        self.start()
+        delivery = _Delivery(recipient_id, split_message(message_text, self.chunk_size), received_at)
+        with self._cond:
+            self._stats['enqueued'] += 1
+            queue_for_recipient = self._recipients.get(recipient_id)
+            if queue_for_recipient is None:
+                self._recipients[recipient_id] = deque([delivery])
+                self._push(recipient_id, time.monotonic())
+            else:
+                # Odbiorca już ma coś w drodze - ta wiadomość pójdzie po niej
+                queue_for_recipient.append(delivery)
+        return True
+
+    def pending(self):
+        """Liczba wiadomości czekających na dostarczenie"""
+        with self._cond:
+            return sum(len(q) for q in self._recipients.values())
+
+    def get_stats(self):
+        """Statystyki wysyłki (dla /api/health)"""
+        with self._cond:
+            delivered = self._stats['delivered']
+            return {
+                'pending': sum(len(q) for q in self._recipients.values()),
+                'enqueued': self._stats['enqueued'],
+                'delivered': delivered,
+                'failed': self._stats['failed'],
+                'chunks_sent': self._stats['chunks_sent'],
+                'rate_limited': self._stats['rate_limited'],
+                'delivery_latency_avg_ms': round(self._stats['latency_total'] / delivered * 1000, 1) if delivered else 0.0,
+                'delivery_latency_max_ms': round(self._stats['latency_max'] * 1000, 1)
+            }
+
+    def _push(self, recipient_id, due):
+        """Dodaj odbiorcę do harmonogramu (wywoływać pod self._cond)"""
+        heapq.heappush(self._schedule, (due, next(self._seq), recipient_id))
+        self._cond.notify()
+
+    def _scheduler_loop(self):
+        """Czekaj na najbliższy termin, pilnuj limitu strony i przekaż wysyłkę do puli"""
+        while True:
+            with self._cond:
+                while True:
+                    now = time.monotonic()
+                    if not self._schedule:
+                        self._cond.wait()
+                        continue
+                    due, _, recipient_id = self._schedule[0]
+                    if due > now:
+                        self._cond.wait(due - now)
+                        continue
+                    wait = self._bucket.take(now)
+                    if wait > 0:
+                        # Limit strony - przesuń termin zamiast blokować
+                        self._stats['rate_limited'] += 1
+                        heapq.heapreplace(self._schedule, (now + wait, next(self._seq), recipient_id))
+                        continue
+                    heapq.heappop(self._schedule)
+                    break
+            self._pool.submit(self._send_next_chunk, recipient_id)
+
+    def _send_next_chunk(self, recipient_id):
+        """Wyślij kolejną część najstarszej wiadomości odbiorcy i zaplanuj następną"""
+        with self._cond:
+            delivery = self._recipients[recipient_id][0]
+            chunk = delivery.chunks[delivery.next_index]
+
+        try:
+            success = self.send_func(recipient_id, chunk)
+        except Exception as e:
+            logger.error(f"❌ Błąd wysyłki do {recipient_id}: {e}")
+            success = False
+
+        with self._cond:
+            queue_for_recipient = self._recipients[recipient_id]
+            delay = 0.0
+            if success:
+                self._stats['chunks_sent'] += 1
+                delivery.next_index += 1
+                if delivery.next_index >= len(delivery.chunks):
+                    now = time.monotonic()
+                    latency = now - delivery.enqueued_at
+                    DELIVERY_LATENCY.observe(latency)
+                    if delivery.received_at is not None:
+                        WEBHOOK_TO_SEND_LATENCY.observe(now - delivery.received_at)
+                    self._stats['delivered'] += 1
+                    self._stats['latency_total'] += latency
+                    self._stats['latency_max'] = max(self._stats['latency_max'], latency)
+                    queue_for_recipient.popleft()
+                else:
+                    delay = self.chunk_delay  # Przerwa między częściami
+            else:
+                # Nie wysyłaj reszty urwanej wiadomości
+                self._stats['failed'] += 1
+                logger.error(f"❌ Nie dostarczono wiadomości do {recipient_id} (część {delivery.next_index + 1}/{len(delivery.chunks)})")
+                queue_for_recipient.popleft()
+
+            if queue_for_recipient:
+                self._push(recipient_id, time.monotonic() + delay)
+            else:
+                del self._recipients[recipient_id]
@@ -0,0 +1,191 @@
+"""
+Response Cleaner - Czyszczenie odpowiedzi DeepSeek-R1 z procesu myślowego
+Wszystkie wzorce kompilowane raz przy imporcie. Na każdą odpowiedź:
+- tagi <think>/<thinking> tylko gdy w tekście jest '<'
+- frazy rozumowania: szybkie wyszukanie fraz w tekście małymi literami,
+  regex uruchamiany tylko dla fraz, które występują
+- linie rozumowania: jeden wzorzec dla wszystkich prefiksów
+- kategorie: usuwanie tylko gdy któraś występuje
+
+Wynik jest identyczny z dawnym clean_thinking_response_enhanced
+(korpus referencyjny: tests/data/cleaner_golden.json).
+"""
+
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RESPONSE = "Cześć! Jak mogę ci pomóc? 😊"
+MAX_RESPONSE_LENGTH = 500      # Limit dla Facebook Messenger
+
+# ==============================================
+# TABELE WZORCÓW (KOMPILOWANE RAZ)
+# ==============================================
+
+# 1-3. Tagi - kolejność ma znaczenie (zamknięte bloki, potem niedomknięte, potem reszta tagów)
+_TAG_PASSES = [
+    re.compile(r'<think>.*?</think>', re.DOTALL | re.IGNORECASE),
+    re.compile(r'<thinking>.*?</thinking>', re.DOTALL | re.IGNORECASE),
+    re.compile(r'<think[^>]*>.*?$', re.DOTALL | re.IGNORECASE),
+    re.compile(r'<thinking[^>]*>.*?$', re.DOTALL | re.IGNORECASE),
+    re.compile(r'<[^>]*>'),
+]
+
+# 4. Frazy rozumowania - usuwane od frazy do następnej linii zaczynającej się literą
+_THINKING_PHRASES = [
+    r'Okay, I need to handle',
+    r'First, I remember',
+    r'The client wrote',
+    r'I should start with',
+    r'Then, on the next line',
+    r'But wait, the system',
+    r'So, the correct command',
+    r'Putting it all together',
+    r'That should correctly',
+    r'which means',
+    r'Since tomorrow is',
+    r'my response will be',
+    r'trigger the system',
+    r'so earlier times',
+    r'So, in this case',
+    r'Wait, but the example',
+    r'Therefore, I should',
+    r'applying that logic',
+    r'since it\'s \d+:\d+',
+    r'Therefore, the available',
+    r'would be from',
+    r'as the next day',
+    r'in 30-minute',
+    r'but only the ones',
+]
+_THINKING_PASSES = [
+    re.compile(phrase + r'.*?(?=\n[A-ZĄĆĘŁŃÓŚŹŻ]|$)', re.DOTALL | re.IGNORECASE)
+    for phrase in _THINKING_PHRASES
+]
+# Dosłowne początki fraz (małymi literami) do szybkiego sprawdzenia `in`
+_THINKING_HEADS = [phrase.replace(r'\d+:\d+', '').replace("\\'", "'").lower() for phrase in _THINKING_PHRASES]
+
+# Znaki, które w re.IGNORECASE pasują do liter ASCII, a str.lower() ich na nie nie zamienia
+# (İ, ı, ſ, znak Kelvina) - wtedy sprawdzamy wszystkie reguły jak dawniej
+_CASE_TRAPS = re.compile('[\u0130\u0131\u017f\u212a]')
+
+# 5. Linie zaczynające się od typowych fraz AI (dopasowanie do początku linii po strip)
+_THINKING_LINE_PREFIXES = [
+    r'Okay, I need to',
+    r'First, I remember',
+    r'The client wrote',
+    r'I should start',
+    r'Then, on the next',
+    r'But wait, the system',
+    r'So, the correct',
+    r'Putting it all',
+    r'That should correctly',
+    r'which means',
+    r'Since tomorrow is',
+    r'my response will be',
+    r'trigger the system',
+    r's \d+:\d+',
+    r'So, ',
+    r'Wait, ',
+    r'Therefore, ',
+    r'Since ',
+    r'Looking at ',
+    r'Based on ',
+    r'Given that ',
+    r'This means ',
+    r'The logic ',
+    r'I need to ',
+    r'Let me ',
+    r'which is ',
+    r'from \d+:\d+ AM',
+    r'would be:',
+    r'as the next day',
+    r'in 30-minute',
+    r'but only the ones',
+]
+_THINKING_LINE = re.compile('(?:' + '|'.join(_THINKING_LINE_PREFIXES) + ')', re.IGNORECASE)
+
+# 6. Wstępy AI - tylko na samym początku tekstu
+_INTRO_PASSES = [
+    re.compile(r'^okay,?\s+so.*?[.!]\s*', re.IGNORECASE),
+    re.compile(r'^let\s+me\s+go\s+through.*?[.!]\s*', re.IGNORECASE),
+    re.compile(r'^i\s+need\s+to\s+analyze.*?[.!]\s*', re.IGNORECASE),
+    re.compile(r'^looking\s+at\s+this\s+message.*?[.!]\s*', re.IGNORECASE),
+]
+
+# 7-8. Wewnętrzne kategorie klasyfikatora
+CATEGORIES = ["CONTACT_DATA", "BOOKING", "ASK_AVAILABILITY", "WANT_APPOINTMENT", "CANCEL_VISIT", "OTHER_QUESTION"]
+_CATEGORY_SET = frozenset(CATEGORIES)
+_CATEGORY_HEADS = [category.lower() for category in CATEGORIES]
+_CATEGORY_PASSES = []
+for _category in CATEGORIES:
+    _CATEGORY_PASSES.append(re.compile(rf'^{_category}[\s\.\-]*', re.IGNORECASE | re.MULTILINE))
+    _CATEGORY_PASSES.append(re.compile(rf'[\s\.\-]*{_category}$', re.IGNORECASE | re.MULTILINE))
+
+# ==============================================
+# CZYSZCZENIE
+# ==============================================
+
+def _matching_passes(text, heads, passes):
+    """Reguły (w oryginalnej kolejności), których dosłowny początek występuje w tekście"""
+    if _CASE_TRAPS.search(text):
+        return passes
+    lowered = text.lower()
+    return [rule for head, rule in zip(heads, passes) if head in lowered]
+
+def clean_response(response_text):
+    """Usuwa procesy myślowe i znajduje prawdziwą odpowiedź"""
+    if not response_text:
+        return ""
+
+    cleaned = response_text
+
+    # 1-3. THINKING BLOKI, NIEDOMKNIĘTE TAGI, RESZTA TAGÓW HTML
+    if '<' in cleaned:
+        for pattern in _TAG_PASSES:
+            cleaned = pattern.sub('', cleaned)
+
+    # 4. PROCESY MYŚLOWE AI - tylko reguły, których frazy występują w tekście
+    # (usunięcie fragmentu nie tworzy nowych wystąpień, więc reszta reguł i tak nic by nie zmieniła)
+    for pattern in _matching_passes(cleaned, _THINKING_HEADS, _THINKING_PASSES):
+        cleaned = pattern.sub('', cleaned)
+
+    # 5. LINIE ZACZYNAJĄCE SIĘ OD TYPOWYCH FRAZ AI
+    cleaned = '\n'.join(line for line in cleaned.split('\n') if not _THINKING_LINE.match(line.strip()))
+
+    # 6. TYPOWE AI INTRO PHRASES (TYLKO NA POCZĄTKU)
+    for pattern in _INTRO_PASSES:
+        cleaned = pattern.sub('', cleaned)
+
+    # 7. SAMA KATEGORIA ZAMIAST ODPOWIEDZI
+    cleaned_stripped = cleaned.strip()
+    if cleaned_stripped in _CATEGORY_SET:
+        logger.warning(f"⚠️ AI zwróciło tylko kategorię: {cleaned_stripped}")
+        return DEFAULT_RESPONSE
+
+    # 8. KATEGORIE TYLKO Z POCZĄTKU/KOŃCA LINII
+    if _matching_passes(cleaned, _CATEGORY_HEADS, _CATEGORY_HEADS):
+        for pattern in _CATEGORY_PASSES:
+            cleaned = pattern.sub('', cleaned)
+
+    # 9. PUSTE LINIE I BIAŁE ZNAKI
+    cleaned = '\n'.join(line.strip() for line in cleaned.split('\n') if line.strip())
+    cleaned = cleaned.strip()
+
+    # 10. LIMIT ODPOWIEDZI
+    if len(cleaned) > MAX_RESPONSE_LENGTH:
+        logger.warning(f"⚠️ Skracam długą odpowiedź z {len(cleaned)} do {MAX_RESPONSE_LENGTH} znaków")
+        cleaned = cleaned[:MAX_RESPONSE_LENGTH] + "..."
+
+    # 11. SEPARATORY - tylko pierwsza część przed pierwszym ---
+    if '---' in cleaned:
+        logger.warning(f"⚠️ USUWAM WSZYSTKIE SEPARATORY - biorę tylko pierwszą część")
+        cleaned = cleaned.split('---')[0].strip()
+
+    # 12. PO CZYSZCZENIU NICZEGO NIE MA
+    if not cleaned or len(cleaned) < 5:
+        logger.warning(f"⚠️ Pusta odpowiedź po czyszczeniu z: '{response_text[:100]}...'")
+        return DEFAULT_RESPONSE
+
+    return cleaned
@@ -0,0 +1,90 @@
+"""
+Router - Szybka ścieżka regex przed process_user_message_smart
+- ASK_AVAILABILITY z jednoznacznym dniem -> od razu format_available_slots
+- OTHER_QUESTION z gotową odpowiedzią FAQ -> odpowiedź lokalna
+- wszystko inne (niejasne wiadomości, rezerwacja w toku) -> Together
+
+Licznik tras pokazuje, jaka część tur obyła się bez wywołania LLM.
+"""
+
+import logging
+import os
+import threading
+
+from bot_logic import analyze_intent_regex_only, extract_requested_day, get_quick_response
+from answer_cache import has_booking_state
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# ==============================================
+# KONFIGURACJA
+# ==============================================
+
+ROUTER_ENABLED = os.getenv('ROUTER_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+
+# Trasy tury
+ROUTE_AVAILABILITY = 'availability'    # lista terminów z kalendarza, bez LLM
+ROUTE_FAQ = 'faq'                      # gotowa odpowiedź FAQ, bez LLM
+ROUTE_CACHE = 'cache'                  # pamięć odpowiedzi FAQ (answer_cache), bez LLM
+ROUTE_LLM = 'llm'                      # pełna ścieżka Together
+
+LOCAL_ROUTES = (ROUTE_AVAILABILITY, ROUTE_FAQ, ROUTE_CACHE)
+
+ROUTER_TURNS = metrics.counter(
+    'bot_router_turns_total', 'Tury rozmowy według trasy (llm = wywołanie Together)', ('route',)
+)
+
+_route_counts = {route: 0 for route in LOCAL_ROUTES + (ROUTE_LLM,)}
+_route_counts_lock = threading.Lock()
+
+# ==============================================
+# ROUTING
+# ==============================================
+
+def route_message(user_message, history):
+    """
+    Wybierz trasę dla wiadomości
+
+    Args:
+        history (list): Historia rozmowy PRZED tą wiadomością
+
+    Returns:
+        tuple: (trasa, dzień dla ROUTE_AVAILABILITY / odpowiedź dla ROUTE_FAQ / None)
+    """
+    if not ROUTER_ENABLED or has_booking_state(history):
+        return ROUTE_LLM, None
+
+    intent = analyze_intent_regex_only(user_message)
+
+    if intent == "ASK_AVAILABILITY":
+        day = extract_requested_day(user_message)
+        if day:
+            return ROUTE_AVAILABILITY, day
+
+    elif intent == "OTHER_QUESTION":
+        quick_response = get_quick_response(user_message)
+        if quick_response:
+            return ROUTE_FAQ, quick_response
+
+    return ROUTE_LLM, None
+
+def record_turn(route):
+    """Zapisz trasę obsłużonej tury"""
+    ROUTER_TURNS.inc(route=route)
+    with _route_counts_lock:
+        _route_counts[route] += 1
+
+def get_router_stats():
+    """Trasy tur i odsetek odpowiedzi bez LLM (dla /api/health)"""
+    with _route_counts_lock:
+        counts = dict(_route_counts)
+    total = sum(counts.values())
+    local = sum(counts[route] for route in LOCAL_ROUTES)
+    return {
+        'enabled': ROUTER_ENABLED,
+        'turns': total,
+        'routes': counts,
+        'answered_without_llm': local,
+        'local_fraction': round(local / total, 3) if total else 0.0
+    }
@@ -0,0 +1,131 @@
+"""
+Slot Prefetch - Wyprzedzające pobieranie wolnych terminów
+Gdy wiadomość klienta wskazuje dzień ("a w środę?", "jutro po 15"), lista
+terminów na ten dzień jest pobierana z kalendarza równolegle z wywołaniem
+Together. Jeśli model odpowie CHECK_AVAILABILITY:<ten dzień>, wynik jest
+już gotowy (albo w drodze) - dwa wolne zapytania nie idą jedno po drugim.
+Kluczem jest (dzień, usługa) - limit klientów zależy od usługi.
+"""
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from bot_logic import extract_requested_day
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# ==============================================
+# KONFIGURACJA
+# ==============================================
+
+SLOT_PREFETCH_ENABLED = os.getenv('SLOT_PREFETCH_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+SLOT_PREFETCH_WORKERS = int(os.getenv('SLOT_PREFETCH_WORKERS', '2'))
+SLOT_PREFETCH_WAIT = float(os.getenv('SLOT_PREFETCH_WAIT', '20'))
+
+# Wyniki (każdy prefetch liczony raz): hit = użyty, miss = model pytał o inny dzień / prefetch nieudany /
+# brak prefetchu, unused = model nie pytał o terminy
+PREFETCH_RESULTS = metrics.counter(
+    'bot_slot_prefetch_total', 'Wyprzedzające pobrania terminów według wyniku', ('result',)
+)
+PREFETCH_SAVED = metrics.histogram(
+    'bot_slot_prefetch_saved_seconds', 'Czas kalendarza ukryty za wywołaniem LLM (trafione prefetche)'
+)
+
+class Prefetch:
+    """Pobieranie terminów na dzień uruchomione w tle"""
+
+    def __init__(self, day, service_type, future):
+        self.day = day
+        self.service_type = service_type
+        self.future = future
+        self.used = False
+
+class SlotPrefetcher:
+    """Uruchamia pobranie terminów w tle i oddaje wynik, gdy model poprosi o ten sam dzień"""
+
+    def __init__(self, fetch_func, max_workers=SLOT_PREFETCH_WORKERS, wait_timeout=SLOT_PREFETCH_WAIT):
+        """
+        Args:
+            fetch_func: (dzień, usługa) -> tekst z terminami (format_available_slots)
+        """
+        self.fetch_func = fetch_func
+        self.wait_timeout = wait_timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='slot-prefetch')
+        self._stats = {'started': 0, 'hit': 0, 'miss': 0, 'unused': 0, 'saved_seconds': 0.0}
+        self._lock = threading.Lock()
+
+    def start(self, message, service_type=None):
+        """
+        Rozpocznij pobieranie, jeśli wiadomość jednoznacznie wskazuje dzień
+
+        Args:
+            service_type (str|None): Usługa klienta - limit klientów przy liście terminów
+
+        Returns:
+            Prefetch|None
+        """
+        day = extract_requested_day(message)
+        if not day:
+            return None
+        future = self._executor.submit(self._timed_fetch, day, service_type)
+        with self._lock:
+            self._stats['started'] += 1
+        logger.info(f"🚀 Prefetch terminów na: {day}")
+        return Prefetch(day, service_type, future)
+
+    def _timed_fetch(self, day, service_type):
+        start = time.perf_counter()
+        result = self.fetch_func(day, service_type)
+        return result, time.perf_counter() - start
+
+    def resolve(self, prefetch, requested_day, service_type=None):
+        """
+        Terminy na dzień, o który poprosił model - z prefetchu albo pobrane teraz
+
+        Returns:
+            str: Tekst z terminami
+        """
+        canonical = extract_requested_day(requested_day) or requested_day.lower()
+        if prefetch is not None:
+            prefetch.used = True          # rozliczony tutaj (hit albo miss) - discard już go nie liczy
+        if prefetch is not None and prefetch.day == canonical and prefetch.service_type == service_type:
+            wait_start = time.perf_counter()
+            try:
+                result, fetch_seconds = prefetch.future.result(timeout=self.wait_timeout)
+            except Exception as e:
+                logger.error(f"❌ Prefetch terminów na {prefetch.day} nieudany: {e}")
+            else:
+                # Zaoszczędzone = ta część zapytania, która wykonała się w trakcie LLM
+                saved = max(0.0, fetch_seconds - (time.perf_counter() - wait_start))
+                PREFETCH_SAVED.observe(saved)
+                self._record('hit', saved)
+                logger.info(f"⚡ Prefetch trafiony ({prefetch.day}) - zaoszczędzono {saved:.2f}s")
+                return result
+
+        self._record('miss')
+        return self.fetch_func(requested_day, service_type)
+
+    def discard(self, prefetch):
+        """Koniec tury - policz prefetch, z którego model nie skorzystał"""
+        if prefetch is not None and not prefetch.used:
+            prefetch.used = True
+            self._record('unused')
+
+    def _record(self, result, saved=0.0):
+        PREFETCH_RESULTS.inc(result=result)
+        with self._lock:
+            self._stats[result] += 1
+            self._stats['saved_seconds'] += saved
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        requested = stats['hit'] + stats['miss']
+        stats['enabled'] = SLOT_PREFETCH_ENABLED
+        stats['hit_rate'] = round(stats['hit'] / requested, 3) if requested else 0.0
+        stats['saved_seconds'] = round(stats['saved_seconds'], 3)
+        return stats
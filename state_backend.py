@@ -0,0 +1,240 @@
+"""
+State Backend - Wspólny stan bota niezależny od procesu
+Za jednym interfejsem (słownik + atomowa aktualizacja) kryją się:
+- MemoryStore - domyślny, stan w pamięci procesu (jeden worker)
+- SQLiteStore - lokalny plik SQLite (WAL) współdzielony przez N procesów
+
+Używane dla: user_conversations, user_sessions (+ deduplikacja w dedup_store)
+"""
+
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections.abc import MutableMapping
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# ==============================================
+# KONFIGURACJA
+# ==============================================
+
+STATE_BACKEND = os.getenv('STATE_BACKEND', 'memory')          # memory | sqlite
+STATE_SQLITE_PATH = os.getenv('STATE_SQLITE_PATH', 'bot_state.db')
+SENDER_LOCK_TTL = float(os.getenv('SENDER_LOCK_TTL', '120'))   # Maks. czas obsługi jednej wiadomości
+
+# ==============================================
+# PAMIĘĆ W PROCESIE
+# ==============================================
+
+class MemoryStore(dict):
+    """Zwykły słownik + atomowa aktualizacja w obrębie procesu"""
+
+    def __init__(self, name):
+        super().__init__()
+        self.name = name
+        self._lock = threading.RLock()
+
+    def update_value(self, key, func, default_factory=None):
+        """
+        Atomowo zmień wartość: value = func(stara_wartość)
+
+        Returns:
+            Nowa wartość
+        """
+        with self._lock:
+            current = self[key] if key in self else (default_factory() if default_factory else None)
+            value = func(current)
+            self[key] = value
+            return value
+
+    @contextmanager
+    def key_lock(self, key):
+        """W jednym procesie kolejność per nadawca zapewnia SenderLaneExecutor"""
+        yield
+
+# ==============================================
+# SQLITE - WSPÓLNE DLA WIELU PROCESÓW
+# ==============================================
+
+class SQLiteStore(MutableMapping):
+    """Słownik w tabeli state (namespace, key) -> pickle(value)"""
+
+    def __init__(self, name, path=STATE_SQLITE_PATH):
+        self.name = name
+        self.path = path
+        self._local = threading.local()
+        conn = self._connection()
+        conn.execute("""CREATE TABLE IF NOT EXISTS state (
+                            namespace TEXT NOT NULL,
+                            key TEXT NOT NULL,
+                            value BLOB NOT NULL,
+                            updated_at REAL NOT NULL,
+                            PRIMARY KEY (namespace, key)
+                        )""")
+        conn.execute("""CREATE TABLE IF NOT EXISTS key_locks (
+                            namespace TEXT NOT NULL,
+                            key TEXT NOT NULL,
+                            owner TEXT NOT NULL,
+                            expires_at REAL NOT NULL,
+                            PRIMARY KEY (namespace, key)
+                        )""")
+
+    def _dumps(self, value):
+        return pickle.dumps(value)
+
+    def _loads(self, blob):
+        return pickle.loads(blob)
+
+    def _connection(self):
+        """Osobne połączenie na wątek"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def __getitem__(self, key):
+        row = self._connection().execute(
+            "SELECT value FROM state WHERE namespace = ? AND key = ?",
+            (self.name, str(key))
+        ).fetchone()
+        if row is None:
+            raise KeyError(key)
+        return self._loads(row[0])
+
+    def __setitem__(self, key, value):
+        self._connection().execute(
+            "INSERT OR REPLACE INTO state (namespace, key, value, updated_at) VALUES (?, ?, ?, ?)",
+            (self.name, str(key), self._dumps(value), time.time())
+        )
+
+    def __delitem__(self, key):
+        cursor = self._connection().execute(
+            "DELETE FROM state WHERE namespace = ? AND key = ?",
+            (self.name, str(key))
+        )
+        if cursor.rowcount == 0:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        row = self._connection().execute(
+            "SELECT 1 FROM state WHERE namespace = ? AND key = ?",
+            (self.name, str(key))
+        ).fetchone()
+        return row is not None
+
+    def __iter__(self):
+        rows = self._connection().execute(
+            "SELECT key FROM state WHERE namespace = ?", (self.name,)
+        ).fetchall()
+        return iter([row[0] for row in rows])
+
+    def __len__(self):
+        return self._connection().execute(
+            "SELECT COUNT(*) FROM state WHERE namespace = ?", (self.name,)
+        ).fetchone()[0]
+
+    def values(self):
+        """Wszystkie wartości jednym zapytaniem (zamiast zapytania na klucz)"""
+        rows = self._connection().execute(
+            "SELECT value FROM state WHERE namespace = ?", (self.name,)
+        ).fetchall()
+        return [self._loads(row[0]) for row in rows]
+
+    def update_value(self, key, func, default_factory=None):
+        """
+        Atomowo (między procesami) zmień wartość: value = func(stara_wartość)
+
+        Returns:
+            Nowa wartość
+        """
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT value FROM state WHERE namespace = ? AND key = ?",
+                (self.name, str(key))
+            ).fetchone()
+            current = self._loads(row[0]) if row else (default_factory() if default_factory else None)
+            value = func(current)
+            conn.execute(
+                "INSERT OR REPLACE INTO state (namespace, key, value, updated_at) VALUES (?, ?, ?, ?)",
+                (self.name, str(key), self._dumps(value), time.time())
+            )
+            conn.execute("COMMIT")
+            return value
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def expire_idle(self, max_idle):
+        """
+        Usuń wpisy niezmieniane dłużej niż max_idle sekund
+
+        Returns:
+            int: Liczba usuniętych wpisów
+        """
+        cursor = self._connection().execute(
+            "DELETE FROM state WHERE namespace = ? AND updated_at < ?",
+            (self.name, time.time() - max_idle)
+        )
+        return cursor.rowcount
+
+    def size_bytes(self):
+        """Łączny rozmiar zapisanych wartości"""
+        return self._connection().execute(
+            "SELECT COALESCE(SUM(LENGTH(value)), 0) FROM state WHERE namespace = ?", (self.name,)
+        ).fetchone()[0]
+
+    @contextmanager
+    def key_lock(self, key, ttl=SENDER_LOCK_TTL, poll_interval=0.05):
+        """
+        Blokada klucza między procesami (dzierżawa z wygaśnięciem)
+
+        Dwie wiadomości jednego nadawcy trafiające do różnych procesów
+        nie są przetwarzane jednocześnie.
+        """
+        conn = self._connection()
+        owner = f"{os.getpid()}:{threading.get_ident()}"
+        while True:
+            now = time.time()
+            cursor = conn.execute(
+                """INSERT INTO key_locks (namespace, key, owner, expires_at) VALUES (?, ?, ?, ?)
+                   ON CONFLICT(namespace, key) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at
+                   WHERE key_locks.expires_at < ?""",
+                (self.name, str(key), owner, now + ttl, now)
+            )
+            if cursor.rowcount:
+                break
+            time.sleep(poll_interval)
+        try:
+            yield
+        finally:
+            conn.execute(
+                "DELETE FROM key_locks WHERE namespace = ? AND key = ? AND owner = ?",
+                (self.name, str(key), owner)
+            )
+
+# ==============================================
+# REJESTR STORÓW
+# ==============================================
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+def get_store(name):
+    """Pobierz store o danej nazwie dla skonfigurowanego STATE_BACKEND"""
+    with _stores_lock:
+        if name not in _stores:
+            if STATE_BACKEND == 'sqlite':
+                _stores[name] = SQLiteStore(name)
+                logger.info(f"✅ Stan '{name}' w SQLite: {STATE_SQLITE_PATH}")
+            else:
+                _stores[name] = MemoryStore(name)
+        return _stores[name]
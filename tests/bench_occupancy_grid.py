@@ -0,0 +1,54 @@
+"""
+Mikrobenchmark wolnych terminów dnia - dotychczasowa pętla vs siatka zajętości
+Uruchomienie: python tests/bench_occupancy_grid.py
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import logging
+import random
+import time
+from datetime import datetime, timedelta
+
+import pytz
+
+from calendar_service import CalendarService
+from tests.test_occupancy_grid import legacy_free_slots, random_busy_times
+
+TZ = pytz.timezone('Europe/Warsaw')
+
+def bench(days=500, events_per_day=(5, 12, 30)):
+    logging.disable(logging.WARNING)
+    service = CalendarService(calendar_id='test')
+    today = datetime.now(TZ).date()
+    monday = today + timedelta(days=7 - today.weekday())
+
+    for events in events_per_day:
+        rng = random.Random(events)
+        cases = []
+        for case in range(days):
+            day = monday + timedelta(days=case % 6)
+            busy_times = []
+            while len(busy_times) < events:
+                busy_times.extend(random_busy_times(rng, day))
+            date = TZ.localize(datetime.combine(day, datetime.min.time()).replace(hour=8))
+            cases.append((date, busy_times[:events]))
+
+        start = time.perf_counter()
+        for date, busy_times in cases:
+            legacy_free_slots(service, date, 60, busy_times)
+        legacy = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for date, busy_times in cases:
+            service._get_busy_times = lambda date, use_index=True, busy_times=busy_times: busy_times
+            service._get_day_available_slots(date, 60, 'Farbowanie')
+        grid = time.perf_counter() - start
+
+        print(f"📅 {events:>2} wydarzeń/dzień: pętla {legacy / days * 1e6:7.0f} µs, "
+              f"siatka {grid / days * 1e6:7.0f} µs na dzień ({legacy / grid:.1f}x)")
+
+if __name__ == '__main__':
+    bench()
@@ -0,0 +1,36 @@
+"""
+Mikrobenchmark czyszczenia odpowiedzi - koszt na jedną odpowiedź
+Uruchomienie: python tests/bench_response_cleaner.py
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+import logging
+import time
+
+from response_cleaner import clean_response
+
+GOLDEN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'cleaner_golden.json')
+
+def bench(repeats=2000):
+    with open(GOLDEN_PATH, encoding='utf-8') as f:
+        corpus = [case['raw'] for case in json.load(f)]
+
+    logging.disable(logging.WARNING)   # Ostrzeżenia czyszczenia nie wchodzą do pomiaru
+    for raw in corpus:
+        clean_response(raw)
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for raw in corpus:
+            clean_response(raw)
+    elapsed = time.perf_counter() - start
+
+    replies = repeats * len(corpus)
+    print(f"🧹 {replies} odpowiedzi w {elapsed:.2f}s - {elapsed / replies * 1e6:.1f} µs na odpowiedź")
+
+if __name__ == '__main__':
+    bench()
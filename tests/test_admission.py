@@ -0,0 +1,50 @@
+"""Testy kontroli przyjęć (load shedding)"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from admission import AdmissionController, ADMIT, ANSWER_LOCAL, DEFER, BUSY_REPLY
+from bot_logic import get_quick_response, get_welcome_menu
+
+def make_controller(in_flight=0, queue=0, **kwargs):
+    load = {'in_flight': in_flight, 'queue': queue}
+    controller = AdmissionController(lambda: load['in_flight'], lambda: load['queue'],
+                                     max_in_flight=4, max_queue=10, **kwargs)
+    return controller, load
+
+def test_normal_load_admits_everything():
+    """Bez przeciążenia każda wiadomość idzie normalną ścieżką"""
+    controller, _ = make_controller(in_flight=2, queue=3)
+
+    assert controller.decide('user_1', 'jakie usługi oferujecie?') == (ADMIT, None)
+    assert controller.decide('user_1', 'chcę się umówić') == (ADMIT, None)
+
+def test_overload_answers_faq_locally():
+    """Przy przeciążeniu pytania FAQ dostają lokalną odpowiedź"""
+    controller, _ = make_controller(in_flight=4)
+
+    action, reply = controller.decide('user_1', 'Jakie usługi oferujecie?')
+    assert action == ANSWER_LOCAL
+    assert reply == get_quick_response('jakie usługi oferujecie')
+
+    action, reply = controller.decide('user_2', 'Gdzie jesteście?')
+    assert action == ANSWER_LOCAL
+    assert 'ul. Piękna 15' in reply
+
+    # Nowy klient z ogólnym powitaniem - menu
+    action, reply = controller.decide('user_3', 'Dzień dobry', has_history=False)
+    assert action == ANSWER_LOCAL
+    assert reply == get_welcome_menu()
+
+def test_overload_defers_booking_with_single_notice():
+    """Rezerwacje czekają w kolejce - "moment proszę" tylko raz na okno"""
+    controller, load = make_controller(queue=10)
+
+    assert controller.decide('user_1', 'chcę się umówić') == (DEFER, BUSY_REPLY)
+    assert controller.decide('user_1', 'na jutro') == (DEFER, None)
+    assert controller.decide('user_1', 'Jan Kowalski 123456789') == (DEFER, None)
+    assert controller.decide('user_2', 'wolne terminy na piątek') == (DEFER, BUSY_REPLY)
+
+    load['queue'] = 0
+    assert controller.decide('user_1', 'chcę się umówić') == (ADMIT, None)
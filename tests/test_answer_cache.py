@@ -0,0 +1,90 @@
+"""Testy pamięci odpowiedzi FAQ (klucz, LRU + TTL, tylko rozmowy bez rezerwacji)"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datetime import datetime
+
+import pytz
+
+import bot_logic_ai
+from answer_cache import AnswerCache, get_answer_cache, is_cacheable_turn, make_key, normalize_message
+
+TZ = pytz.timezone('Europe/Warsaw')
+MONDAY_10 = TZ.localize(datetime(2025, 3, 10, 10, 5))
+MONDAY_11 = TZ.localize(datetime(2025, 3, 10, 11, 5))
+TUESDAY_10 = TZ.localize(datetime(2025, 3, 11, 10, 5))
+
+def test_normalized_key_ignores_case_diacritics_and_punctuation():
+    """Ta sama treść pisana różnie daje ten sam klucz"""
+    assert normalize_message("Gdzie jesteście?!  😊") == "gdzie jestescie"
+    assert normalize_message("Ile kosztuje STRZYŻENIE męskie?") == normalize_message("ile kosztuje strzyzenie meskie")
+    assert normalize_message("Jak dojechać, czy jest parking?") == "jak dojechac czy jest parking"
+
+def test_key_date_bucket():
+    """Klucz zależy od dnia, a pytania o "teraz" także od godziny"""
+    assert make_key("czy jutro otwarte", MONDAY_10) != make_key("czy jutro otwarte", TUESDAY_10)
+    assert make_key("jaki adres", MONDAY_10) == make_key("jaki adres", MONDAY_11)
+    assert make_key("czy teraz jest czynne", MONDAY_10) != make_key("czy teraz jest czynne", MONDAY_11)
+
+def test_lru_and_ttl_eviction():
+    """Limit wpisów usuwa najdawniej używane, TTL - przeterminowane"""
+    cache = AnswerCache(max_entries=2, ttl=3600)
+    cache.put("adres", "ul. Piękna 15", MONDAY_10)
+    cache.put("ceny", "Cennik...", MONDAY_10)
+    assert cache.get("adres", MONDAY_10) == "ul. Piękna 15"   # adres świeżo użyty
+    cache.put("parking", "Parking za salonem", MONDAY_10)
+
+    assert cache.get("ceny", MONDAY_10) is None
+    assert cache.get("adres", MONDAY_10) == "ul. Piękna 15"
+    stats = cache.get_stats()
+    assert stats['evictions'] == 1
+    assert stats['hits'] == 2 and stats['misses'] == 1
+
+    expired = AnswerCache(ttl=0)
+    expired.put("adres", "ul. Piękna 15", MONDAY_10)
+    assert expired.get("adres", MONDAY_10) is None
+
+def test_only_faq_questions_without_history():
+    """Pamięć tylko dla pytań FAQ na początku rozmowy - nie dla odpowiedzi zależnych od kontekstu"""
+    listing = "Terminy na jutro (wtorek, 11.03.2025):\n- *Wtorek 11.03 10:00*"
+
+    assert is_cacheable_turn("Gdzie jesteście?", [])
+    assert is_cacheable_turn("Czy macie parking?", [])
+    assert not is_cacheable_turn("Chcę się umówić", [])
+    assert not is_cacheable_turn("Gdzie jesteście?", [{"role": "assistant", "content": listing}])
+    assert not is_cacheable_turn("Gdzie jesteście?", [{"role": "user", "content": "hej"}])
+    for message in ("Jan Kowalski", "o 17:30", "dziękuję", "hej"):
+        assert not is_cacheable_turn(message, []), message
+
+def test_process_message_served_from_cache(monkeypatch):
+    """Drugie identyczne pytanie FAQ nie wywołuje LLM"""
+    calls = []
+
+    def fake_llm(messages, **kwargs):
+        calls.append(messages)
+        return "<think>parking</think>Tak, parking jest tuż za salonem 😊"
+
+    monkeypatch.setattr(bot_logic_ai, 'call_llm', fake_llm)
+    get_answer_cache().clear()
+
+    first = bot_logic_ai.process_user_message_smart("Czy macie parking?", "cache_user_1")
+    second = bot_logic_ai.process_user_message_smart("czy macie parking", "cache_user_2")
+
+    assert first == second == "Tak, parking jest tuż za salonem 😊"
+    assert len(calls) == 1
+    assert bot_logic_ai.get_user_history("cache_user_2")[-1]['content'] == first
+
+def test_reply_with_history_not_served_to_other_sender(monkeypatch):
+    """Odpowiedź wygenerowana z historii klienta nie trafia do innego nadawcy"""
+    replies = iter(["Miło mi, Anno! Parking jest za salonem 😊", "Parking jest tuż za salonem 😊"])
+    monkeypatch.setattr(bot_logic_ai, 'call_llm', lambda messages, **kwargs: next(replies))
+    get_answer_cache().clear()
+
+    bot_logic_ai.add_to_history("cache_user_3", "user", "Jestem Anna")
+    first = bot_logic_ai.process_user_message_smart("Czy macie parking?", "cache_user_3")
+    second = bot_logic_ai.process_user_message_smart("Czy macie parking?", "cache_user_4")
+
+    assert "Anno" in first
+    assert second == "Parking jest tuż za salonem 😊"
@@ -0,0 +1,93 @@
+"""Testy weryfikacji wizyt w tle (events.get po ID, wiadomość tylko przy problemie)"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytz
+from googleapiclient.errors import HttpError
+
+from booking_verifier import BookingVerifier, MISMATCH, MISSING, UNKNOWN, VERIFIED
+from calendar_service import CalendarService
+
+TZ = pytz.timezone('Europe/Warsaw')
+APPOINTMENT = TZ.localize(datetime(2025, 3, 12, 15, 0))
+
+def event_at(iso):
+    return {'id': 'evt_1', 'status': 'confirmed', 'start': {'dateTime': iso}}
+
+def make_verifier(event=None, error=None):
+    sent = []
+
+    def get_event(event_id):
+        if error:
+            raise error
+        return event
+
+    verifier = BookingVerifier(get_event, delay=0, notify_func=lambda user_id, text: sent.append((user_id, text)))
+    return verifier, sent
+
+def test_verified_booking_sends_nothing():
+    """Wizyta o właściwej godzinie - brak dodatkowej wiadomości"""
+    verifier, sent = make_verifier(event_at('2025-03-12T14:00:00Z'))   # 15:00 w Warszawie
+
+    assert verifier.verify('user_1', 'evt_1', APPOINTMENT) == VERIFIED
+    assert sent == []
+
+def test_missing_or_moved_booking_notifies_client():
+    """Brak wydarzenia albo inna godzina - klient dostaje wiadomość"""
+    verifier, sent = make_verifier(None)
+    assert verifier.verify('user_1', 'evt_1', APPOINTMENT) == MISSING
+
+    moved, moved_sent = make_verifier(event_at('2025-03-12T17:00:00+01:00'))
+    assert moved.verify('user_2', 'evt_1', APPOINTMENT) == MISMATCH
+
+    assert sent[0][0] == 'user_1' and '12.03.2025 15:00' in sent[0][1]
+    assert moved_sent[0][0] == 'user_2'
+
+def test_api_error_does_not_alarm_client():
+    """Błąd API = wynik nieznany, bez wiadomości do klienta"""
+    verifier, sent = make_verifier(error=Exception("timeout"))
+
+    assert verifier.verify('user_1', 'evt_1', APPOINTMENT) == UNKNOWN
+    assert sent == []
+    assert verifier.get_stats()[UNKNOWN] == 1
+
+def test_schedule_runs_in_background():
+    """schedule() nie blokuje - sprawdzenie w osobnym wątku"""
+    verifier, sent = make_verifier(None)
+
+    timer = verifier.schedule('user_1', 'evt_1', APPOINTMENT)
+    timer.join(2)
+
+    assert len(sent) == 1
+    assert verifier.get_stats()['scheduled'] == 1
+
+class FakeEvents:
+    def __init__(self, result):
+        self.result = result
+
+    def get(self, calendarId, eventId, fields=None):
+        return SimpleNamespace(execute=self._execute)
+
+    def _execute(self):
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+def test_get_event_by_id():
+    """events.get: wydarzenie, None dla 404 i anulowanych"""
+    service = CalendarService(calendar_id='test')
+
+    service.service = SimpleNamespace(events=lambda: FakeEvents(event_at('2025-03-12T14:00:00Z')))
+    assert service.get_event('evt_1')['id'] == 'evt_1'
+
+    service.service = SimpleNamespace(events=lambda: FakeEvents({'id': 'evt_1', 'status': 'cancelled'}))
+    assert service.get_event('evt_1') is None
+
+    not_found = HttpError(SimpleNamespace(status=404, reason='Not Found'), b'{}')
+    service.service = SimpleNamespace(events=lambda: FakeEvents(not_found))
+    assert service.get_event('evt_1') is None
@@ -0,0 +1,193 @@
+"""Testy indeksu zajętości kalendarza (jedno pobranie, synchronizacja przyrostowa, freebusy)"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+import pytz
+
+from calendar_index import INDEX_FIELDS, EventIndex, FreeBusyIndex, SyncTokenExpired
+from calendar_service import CalendarService
+
+TZ = pytz.timezone('Europe/Warsaw')
+TOMORROW = (datetime.now(TZ) + timedelta(days=1)).date()
+if TOMORROW.weekday() == 6:                              # niedziela - salon zamknięty
+    TOMORROW += timedelta(days=1)
+
+def event(event_id, hour, minutes=60, day=TOMORROW, status='confirmed'):
+    start = TZ.localize(datetime.combine(day, datetime.min.time()).replace(hour=hour))
+    return {
+        'id': event_id, 'status': status,
+        'start': {'dateTime': start.isoformat()},
+        'end': {'dateTime': (start + timedelta(minutes=minutes)).isoformat()}
+    }
+
+class FakeCalendar:
+    """events.list: pełne pobranie w stronach, potem zmiany dla tokenu"""
+
+    def __init__(self, pages, changes=None):
+        self.pages = pages
+        self.changes = changes or []
+        self.calls = []
+
+    def list_events(self, **params):
+        self.calls.append(params)
+        if 'syncToken' in params:
+            if params['syncToken'] == 'expired':
+                raise SyncTokenExpired('410')
+            return {'items': self.changes, 'nextSyncToken': 'token_2'}
+        index = int(params.get('pageToken') or 0)
+        page = {'items': self.pages[index]}
+        if index + 1 < len(self.pages):
+            page['nextPageToken'] = str(index + 1)
+        else:
+            page['nextSyncToken'] = 'token_1'
+        return page
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def make_index(calendar, **kwargs):
+    clock = Clock()
+    return EventIndex(calendar.list_events, clock=clock, ttl=900, sync_interval=30, **kwargs), clock
+
+def test_one_ranged_fetch_serves_every_day():
+    """Całe okno jednym pobraniem (ze stronicowaniem), kolejne dni z pamięci"""
+    calendar = FakeCalendar([[event('a', 10)], [event('b', 14), event('c', 9, day=TOMORROW + timedelta(days=2))]])
+    index, _ = make_index(calendar)
+
+    assert [start.hour for start, *_ in index.busy_times(TOMORROW)] == [10, 14]
+    assert len(index.busy_times(TOMORROW + timedelta(days=2))) == 1
+    assert index.busy_times(TOMORROW + timedelta(days=1)) == []
+
+    assert len(calendar.calls) == 2                     # dwie strony jednego zapytania
+    assert 'timeMin' in calendar.calls[0] and 'orderBy' not in calendar.calls[0]
+    assert 'description' not in calendar.calls[0]['fields']           # bez telefonów klientów
+    assert index.get_stats()['has_sync_token']
+
+def test_incremental_sync_applies_changes():
+    """Po interwale tylko zmiany: nowe wydarzenia dochodzą, anulowane znikają"""
+    calendar = FakeCalendar([[event('a', 10), event('b', 14)]],
+                            changes=[event('a', 10, status='cancelled'), event('d', 16)])
+    index, clock = make_index(calendar)
+    index.busy_times(TOMORROW)
+
+    clock.now = 31
+    assert [start.hour for start, *_ in index.busy_times(TOMORROW)] == [14, 16]
+    assert calendar.calls[-1] == {'syncToken': 'token_1', 'singleEvents': True, 'fields': INDEX_FIELDS}
+    assert index.get_stats()['incremental_syncs'] == 1
+
+def test_expired_token_and_ttl_trigger_full_sync():
+    """410 Gone albo upływ TTL -> ponowne pełne pobranie"""
+    calendar = FakeCalendar([[event('a', 10)]])
+    index, clock = make_index(calendar)
+    index.busy_times(TOMORROW)
+
+    index._sync_token = 'expired'
+    clock.now = 31
+    index.busy_times(TOMORROW)
+    assert index.get_stats()['expired_tokens'] == 1
+    assert index.get_stats()['full_syncs'] == 2
+
+    clock.now = 1000
+    index.busy_times(TOMORROW)
+    assert index.get_stats()['full_syncs'] == 3
+
+def test_failed_refresh_serves_previous_data():
+    """Błąd API przy odświeżaniu - poprzednie dane zamiast braku terminów"""
+    calendar = FakeCalendar([[event('a', 10)]])
+    index, clock = make_index(calendar)
+    index.busy_times(TOMORROW)
+
+    def broken(**params):
+        raise ConnectionError("sieć")
+
+    index.list_events = broken
+    clock.now = 31
+    assert len(index.busy_times(TOMORROW)) == 1
+    assert index.get_stats()['stale_reads'] == 1
+
+    empty = EventIndex(broken)
+    with pytest.raises(ConnectionError):
+        empty.busy_times(TOMORROW)
+
+def test_local_booking_visible_immediately():
+    """Wizyta utworzona / anulowana przez bota widoczna bez synchronizacji"""
+    index, _ = make_index(FakeCalendar([[]]))
+    index.busy_times(TOMORROW)
+
+    index.upsert(event('new', 12))
+    assert len(index.busy_times(TOMORROW)) == 1
+    index.remove('new')
+    assert index.busy_times(TOMORROW) == []
+
+def test_calendar_service_slots_from_index():
+    """CalendarService: sloty kolejnych dni bez kolejnych zapytań do Google"""
+    calendar = FakeCalendar([[event('a', 10, minutes=120)]])
+    service = CalendarService(calendar_id='test')
+    service.event_index = EventIndex(service._list_events)
+    service.service = SimpleNamespace(events=lambda: SimpleNamespace(
+        list=lambda calendarId, **params: SimpleNamespace(execute=lambda: calendar.list_events(**params))
+    ))
+    day = TZ.localize(datetime.combine(TOMORROW, datetime.min.time()).replace(hour=8))
+
+    slots = service._get_day_available_slots(day, 30, 'Farbowanie')      # max 1 klient, 90 minut
+    hours = {slot['datetime'].strftime('%H:%M') for slot in slots}
+    assert '12:00' in hours
+    assert '09:00' not in hours and '10:00' not in hours and '11:30' not in hours
+
+    service._get_day_available_slots(day + timedelta(days=1), 30)
+    assert len(calendar.calls) == 1
+
+def test_freebusy_index_one_query_for_window():
+    """freebusy: jedno zapytanie na całe okno, anulowanie wymusza odświeżenie"""
+    day_start = TZ.localize(datetime.combine(TOMORROW, datetime.min.time()))
+    queries = []
+
+    def query_busy(time_min, time_max):
+        queries.append((time_min, time_max))
+        return [{'start': (day_start + timedelta(hours=10)).isoformat(),
+                 'end': (day_start + timedelta(hours=11)).isoformat()}]
+
+    clock = Clock()
+    index = FreeBusyIndex(query_busy, clock=clock, ttl=900, sync_interval=30)
+
+    assert [start.hour for start, *_ in index.busy_times(TOMORROW)] == [10]
+    assert index.busy_times(TOMORROW + timedelta(days=1)) == []
+    assert len(queries) == 1
+    assert (queries[0][1] - queries[0][0]).days == index.days
+
+    index.upsert(event('new', 14))
+    assert len(index.busy_times(TOMORROW)) == 2
+    index.remove('busy_0')
+    index.busy_times(TOMORROW)
+    assert len(queries) == 2
+    assert index.get_stats()['source'] == 'freebusy'
+
+def test_calendar_service_freebusy_request():
+    """_query_freebusy: zapytanie z fields=, błędy kalendarza jako wyjątek"""
+    sent = []
+    response = {'calendars': {'test': {'busy': [{'start': 'a', 'end': 'b'}]}}}
+
+    def query(body, fields):
+        sent.append((body, fields))
+        return SimpleNamespace(execute=lambda: response)
+
+    service = CalendarService(calendar_id='test')
+    service.service = SimpleNamespace(freebusy=lambda: SimpleNamespace(query=query))
+    now = datetime.now(TZ)
+
+    assert service._query_freebusy(now, now + timedelta(days=21)) == [{'start': 'a', 'end': 'b'}]
+    assert sent[0][0]['items'] == [{'id': 'test'}] and sent[0][1] == 'calendars(busy,errors)'
+
+    response['calendars']['test'] = {'errors': [{'reason': 'notFound'}]}
+    with pytest.raises(Exception):
+        service._query_freebusy(now, now + timedelta(days=21))
@@ -0,0 +1,101 @@
+"""Testy ograniczonej pamięci rozmów (zwarty zapis, TTL, limit bajtów)"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pickle
+import time
+
+from conversation_store import (
+    ConversationStore, SQLiteConversationStore, compact_size, decode_history, encode_history
+)
+
+HISTORY = [
+    {"role": "system", "content": "PODSUMOWANIE WCZEŚNIEJSZEJ ROZMOWY:\n- Klient: cześć"},
+    {"role": "user", "content": "Chcę się umówić na jutro"},
+    {"role": "assistant", "content": "Sprawdzam terminy... 😊"},
+]
+
+def test_compact_roundtrip():
+    """Zwarty zapis nie gubi ról ani treści i zajmuje mniej niż słowniki"""
+    compact = encode_history(HISTORY)
+
+    assert compact[1] == ('u', "Chcę się umówić na jutro")
+    assert decode_history(compact) == HISTORY
+    dict_size = sys.getsizeof(HISTORY) + sum(
+        sys.getsizeof(message) + sys.getsizeof(message['role']) + sys.getsizeof(message['content'])
+        for message in HISTORY
+    )
+    assert compact_size(compact) < dict_size
+
+def test_store_behaves_like_history_dict():
+    """Odczyt, zapis, update_value - jak dotychczasowy słownik list"""
+    store = ConversationStore('test')
+    store['user_1'] = HISTORY[:1]
+    store.update_value('user_1', lambda history: history + [HISTORY[1]], list)
+    store.update_value('user_2', lambda history: history + [HISTORY[2]], list)
+
+    assert store['user_1'] == HISTORY[:2]
+    assert store.get('user_2') == [HISTORY[2]]
+    assert store.get('missing', []) == []
+    assert 'user_1' in store and len(store) == 2
+    del store['user_1']
+    assert 'user_1' not in store
+
+def test_idle_ttl_forgets_conversation():
+    """Rozmowa bezczynna dłużej niż TTL znika"""
+    store = ConversationStore('test', idle_ttl=0.05, sweep_interval=0)
+    store['user_1'] = HISTORY
+    time.sleep(0.1)
+
+    assert 'user_1' not in store
+    store['user_2'] = HISTORY                # zapis uruchamia sprzątanie
+    assert list(store) == ['user_2']
+    assert store.get_stats()['evictions']['idle'] == 1
+
+def test_idle_entries_not_counted_before_sweep():
+    """Bezczynne rozmowy znikają z len/iter/items od razu, nie dopiero po sprzątaniu"""
+    store = ConversationStore('test', idle_ttl=0.05, sweep_interval=3600)
+    store['user_1'] = HISTORY
+    store['user_2'] = HISTORY
+    time.sleep(0.1)
+    store['user_3'] = HISTORY
+
+    assert len(store) == 1 and list(store) == ['user_3']
+    assert [key for key, _ in store.items()] == ['user_3'] and len(store.values()) == 1
+    assert store.get_stats()['entries'] == 1
+
+def test_memory_cap_evicts_least_recently_used():
+    """Po przekroczeniu limitu bajtów usuwana jest najdawniej używana rozmowa"""
+    size = compact_size(encode_history(HISTORY))
+    store = ConversationStore('test', max_bytes=size * 2 + 10)
+    store['user_1'] = HISTORY
+    store['user_2'] = HISTORY
+    store['user_1']                          # user_1 świeżo użyty
+    store['user_3'] = HISTORY
+
+    assert sorted(store) == ['user_1', 'user_3']
+    stats = store.get_stats()
+    assert stats['evictions']['memory'] == 1
+    assert stats['approx_bytes'] <= stats['max_bytes']
+
+def test_sqlite_store_compact_and_expiring(tmp_path):
+    """SQLite: zwarty zapis, odczyt starego formatu i usuwanie bezczynnych"""
+    store = SQLiteConversationStore('user_conversations', path=str(tmp_path / 'state.db'),
+                                    idle_ttl=0.05, sweep_interval=0)
+    store.update_value('user_1', lambda history: history + HISTORY, list)
+    assert store['user_1'] == HISTORY
+    assert store.get_stats()['approx_bytes'] > 0
+
+    # Wiersz zapisany przed zwartym formatem - lista słowników
+    store._connection().execute(
+        "INSERT INTO state (namespace, key, value, updated_at) VALUES (?, ?, ?, ?)",
+        ('user_conversations', 'legacy', pickle.dumps(HISTORY), time.time())
+    )
+    assert store['legacy'] == HISTORY
+
+    time.sleep(0.1)
+    store.update_value('user_2', lambda history: history + HISTORY[1:], list)
+    assert 'user_1' not in store and 'legacy' not in store
+    assert store.get_stats()['evictions']['idle'] == 2
@@ -0,0 +1,68 @@
+"""Testy okna rozmowy (budżet tokenów, podsumowanie, skracanie list terminów)"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from conversation_window import (
+    SUMMARY_HEADER, compact_slot_listing, history_tokens, trim_history
+)
+
+LISTING = ("Terminy na jutro (czwartek, 10.07.2025):\n"
+           "- *Czwartek 10.07 09:00*\n"
+           "- *Czwartek 10.07 09:30*\n"
+           "- *Czwartek 10.07 14:00*\n"
+           "Który z tych terminów Ci najbardziej odpowiada? 😊")
+
+def user(text):
+    return {"role": "user", "content": text}
+
+def assistant(text):
+    return {"role": "assistant", "content": text}
+
+def test_compact_slot_listing_keeps_times():
+    """Lista terminów zamieniona na jedną linię z godzinami"""
+    compacted = compact_slot_listing(f"Sprawdziłam kalendarz!\n\n{LISTING}")
+
+    assert compacted == ("Sprawdziłam kalendarz!\n\n"
+                         "[Podano wolne terminy na jutro (czwartek, 10.07.2025): 09:00, 09:30, 14:00]")
+    assert compact_slot_listing("Zapraszamy od 9:00 do 19:00") == "Zapraszamy od 9:00 do 19:00"
+
+def test_listing_compacted_only_after_user_reply():
+    """Lista zostaje w całości, dopóki klient na nią nie odpowie"""
+    history = [user("Jakie terminy jutro?"), assistant(LISTING)]
+    assert trim_history(list(history)) == history
+
+    trimmed = trim_history(history + [user("14:00 poproszę")])
+    assert trimmed[1]['content'].startswith("[Podano wolne terminy na jutro")
+    assert trimmed[2] == user("14:00 poproszę")
+
+def test_old_turns_folded_into_summary():
+    """Po przekroczeniu budżetu najstarsze tury trafiają do podsumowania"""
+    history = []
+    for i in range(8):
+        history.append(user(f"Pytanie numer {i} " + "o salon " * 20))
+        history.append(assistant(f"Odpowiedź numer {i} " + "dla klienta " * 20))
+
+    trimmed = trim_history(history, token_budget=400, min_recent=2)
+
+    assert trimmed[0]['role'] == 'system'
+    assert trimmed[0]['content'].startswith(SUMMARY_HEADER)
+    assert trimmed[1]['role'] == 'user'
+    assert trimmed[-1] == history[-1]
+    assert history_tokens(trimmed[1:]) <= 400
+    assert "Klient: Pytanie numer" in trimmed[0]['content']
+
+def test_summary_accumulates_and_respects_char_limit():
+    """Podsumowanie rośnie z kolejnymi turami, ale w limicie znaków (najnowsze zostają)"""
+    history = []
+    for i in range(30):
+        history.append(user(f"Wiadomość {i}"))
+        history = trim_history(history, max_messages=4, min_recent=2, summary_max_chars=120)
+        history.append(assistant(f"Odpowiedź {i}"))
+
+    summary = history[0]['content']
+    assert summary.startswith(SUMMARY_HEADER)
+    assert len(summary) <= len(SUMMARY_HEADER) + 1 + 120
+    assert "Wiadomość 0" not in summary
+    assert history[-1] == assistant("Odpowiedź 29")
@@ -0,0 +1,61 @@
+"""Testy deduplikacji message_id"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import time
+
+import pytest
+
+from dedup_store import MemoryDedupStore, SQLiteDedupStore
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def make_store(request, tmp_path):
+    def factory(**kwargs):
+        if request.param == 'sqlite':
+            return SQLiteDedupStore(path=str(tmp_path / 'dedup.db'), **kwargs)
+        return MemoryDedupStore(**kwargs)
+    return factory
+
+def test_second_delivery_is_duplicate(make_store):
+    """Ponowne dostarczenie tej samej wiadomości = duplikat"""
+    store = make_store()
+
+    assert store.check_and_mark('mid.1') is False
+    assert store.check_and_mark('mid.1') is True
+    assert store.check_and_mark('mid.2') is False
+    assert 'mid.1' in store
+
+    stats = store.get_stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 2
+
+def test_entries_expire_after_ttl(make_store):
+    """Po TTL wiadomość może zostać przetworzona ponownie"""
+    store = make_store(ttl_seconds=0.05)
+
+    assert store.check_and_mark('mid.1') is False
+    time.sleep(0.1)
+    assert 'mid.1' not in store
+    assert store.check_and_mark('mid.1') is False
+
+def test_memory_store_evicts_oldest_first():
+    """Przy limicie wypadają najstarsze wpisy, nie losowe"""
+    store = MemoryDedupStore(max_entries=3)
+    for i in range(5):
+        store.check_and_mark(f'mid.{i}')
+
+    assert 'mid.0' not in store
+    assert 'mid.1' not in store
+    assert all(f'mid.{i}' in store for i in range(2, 5))
+    assert store.get_stats()['evictions'] == 2
+
+def test_sqlite_store_is_shared_between_instances(tmp_path):
+    """Dwa procesy (tu: dwie instancje) widzą wspólne oznaczenia"""
+    path = str(tmp_path / 'shared.db')
+    worker_a = SQLiteDedupStore(path=path)
+    worker_b = SQLiteDedupStore(path=path)
+
+    assert worker_a.check_and_mark('mid.1') is False
+    assert worker_b.check_and_mark('mid.1') is True
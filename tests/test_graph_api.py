@@ -0,0 +1,99 @@
+"""Testy klienta Graph API na lokalnym serwerze zastępczym"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from graph_api import GraphApiClient
+
+class FakeGraphHandler(BaseHTTPRequestHandler):
+    """Serwer udający graph.facebook.com - odpowiada kolejnymi statusami ze skryptu"""
+
+    def do_GET(self):
+        self._respond()
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        self.server.bodies.append(json.loads(self.rfile.read(length) or b'{}'))
+        self._respond()
+
+    def _respond(self):
+        self.server.paths.append(self.path)
+        status = self.server.statuses.pop(0) if self.server.statuses else 200
+        body = json.dumps({'id': '123'}).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        if status == 429:
+            self.send_header('Retry-After', '0')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture
+def fake_graph():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeGraphHandler)
+    server.statuses = []
+    server.paths = []
+    server.bodies = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+
+def make_client(server, **kwargs):
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/v18.0"
+    return GraphApiClient('TOKEN', base_url=base_url, backoff_base=0.01, **kwargs)
+
+def test_retries_on_5xx_and_429(fake_graph):
+    """5xx i 429 są ponawiane, kolejne wywołania idą tą samą sesją"""
+    fake_graph.statuses = [500, 429, 200]
+    client = make_client(fake_graph)
+
+    response = client.post('PAGE/messages', json={'message': {'text': 'hej'}})
+
+    assert response.status_code == 200
+    assert len(fake_graph.paths) == 3
+    assert 'access_token=TOKEN' in fake_graph.paths[0]
+    assert fake_graph.bodies[-1] == {'message': {'text': 'hej'}}
+
+    stats = client.get_stats()
+    assert stats['calls'] == 3
+    assert stats['retries'] == 2
+    assert stats['errors'] == 2
+
+def test_client_errors_are_not_retried(fake_graph):
+    """Błąd 400 wraca od razu bez ponowień"""
+    fake_graph.statuses = [400]
+    client = make_client(fake_graph)
+
+    response = client.get('me')
+
+    assert response.status_code == 400
+    assert len(fake_graph.paths) == 1
+    assert client.get_stats()['retries'] == 0
+
+def test_gives_up_after_max_retries(fake_graph):
+    """Po wyczerpaniu ponowień zwracana jest ostatnia odpowiedź"""
+    fake_graph.statuses = [503, 503, 503]
+    client = make_client(fake_graph, max_retries=2)
+
+    response = client.get('me')
+
+    assert response.status_code == 503
+    assert len(fake_graph.paths) == 3
+
+def test_connection_error_returns_none():
+    """Brak serwera - None zamiast wyjątku"""
+    client = GraphApiClient('TOKEN', base_url='http://127.0.0.1:9', max_retries=1, backoff_base=0.01)
+
+    assert client.get('me') is None
+    assert client.get_stats()['errors'] == 2
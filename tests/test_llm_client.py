@@ -0,0 +1,167 @@
+"""Testy ochrony wywołań LLM (semafor, ponowienia, bezpiecznik, model zapasowy)"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import threading
+
+import pytest
+
+from llm_client import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, LLMClient, LLMUnavailable, is_retryable
+
+class StatusError(Exception):
+    """Błąd z kodem HTTP jak w SDK Together"""
+
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+def make_client(**kwargs):
+    sleeps = []
+    options = dict(max_concurrency=2, queue_timeout=0.1, deadline=5, max_retries=2,
+                   backoff_base=0.01, breaker_threshold=3, breaker_reset=60)
+    options.update(kwargs)
+    client = LLMClient(lambda: 'client', 'primary', sleep=sleeps.append, **options)
+    return client, sleeps
+
+def test_retryable_errors():
+    """429 i 5xx ponawiamy, błędy zapytania nie"""
+    assert is_retryable(StatusError(429))
+    assert is_retryable(StatusError(503))
+    assert not is_retryable(StatusError(400))
+    assert is_retryable(TimeoutError("strumień"))
+    assert not is_retryable(ValueError("zły format"))
+
+def test_retry_with_backoff_then_success():
+    """Dwa 429, potem odpowiedź - rosnące odstępy między próbami"""
+    client, sleeps = make_client()
+    attempts = []
+
+    def call(llm, model, timeout):
+        attempts.append(model)
+        if len(attempts) < 3:
+            raise StatusError(429)
+        return "ok"
+
+    assert client.execute(call) == "ok"
+    assert len(attempts) == 3
+    assert len(sleeps) == 2 and sleeps[1] > sleeps[0]
+
+def test_non_retryable_error_is_raised_immediately():
+    """Błąd 400 przechodzi od razu, bez ponowień"""
+    client, sleeps = make_client()
+
+    with pytest.raises(StatusError):
+        client.execute(lambda llm, model, timeout: (_ for _ in ()).throw(StatusError(400)))
+    assert sleeps == []
+    assert client.breakers['primary'].state == CLOSED
+
+def test_circuit_opens_and_fails_fast():
+    """Po serii błędów bezpiecznik otwarty - kolejne wywołania bez dotykania API"""
+    client, _ = make_client(max_retries=0)
+    calls = []
+
+    def failing(llm, model, timeout):
+        calls.append(model)
+        raise StatusError(503)
+
+    for _ in range(3):
+        with pytest.raises(LLMUnavailable):
+            client.execute(failing)
+    assert client.breakers['primary'].state == OPEN
+
+    with pytest.raises(LLMUnavailable) as error:
+        client.execute(failing)
+    assert error.value.reason == 'circuit_open'
+    assert len(calls) == 3
+
+def test_half_open_single_probe():
+    """Po czasie jedna próba kontrolna; sukces zamyka bezpiecznik"""
+    breaker = CircuitBreaker('test', threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+
+def test_fallback_model_used_when_primary_fails():
+    """Model zapasowy odpowiada, gdy podstawowy zawodzi"""
+    client, _ = make_client(fallback_model='backup', max_retries=1)
+
+    def call(llm, model, timeout):
+        if model == 'primary':
+            raise StatusError(500)
+        return f"odpowiedź z {model}"
+
+    assert client.execute(call) == "odpowiedź z backup"
+
+def test_semaphore_limits_concurrency():
+    """Ponad limit równoległych wywołań - odmowa po czasie czekania"""
+    client, _ = make_client(max_concurrency=1)
+    started, release = threading.Event(), threading.Event()
+
+    def slow(llm, model, timeout):
+        started.set()
+        release.wait(2)
+        return "ok"
+
+    worker = threading.Thread(target=client.execute, args=(slow,))
+    worker.start()
+    started.wait(1)
+    assert client.in_flight() == 1
+
+    with pytest.raises(LLMUnavailable) as error:
+        client.execute(slow)
+    assert error.value.reason == 'busy'
+
+    release.set()
+    worker.join(2)
+    assert client.in_flight() == 0
+
+def open_breaker_for_probe(client):
+    """Bezpiecznik podstawowego modelu po czasie otwarcia - następne wywołanie to próba kontrolna"""
+    breaker = client.breakers['primary']
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.opened_at -= breaker.reset_timeout
+    return breaker
+
+def test_half_open_probe_with_client_error_closes_breaker():
+    """Próba kontrolna kończy się 400 - dostawca odpowiedział, bezpiecznik zamknięty"""
+    client, _ = make_client()
+    breaker = open_breaker_for_probe(client)
+
+    with pytest.raises(StatusError):
+        client.execute(lambda llm, model, timeout: (_ for _ in ()).throw(StatusError(400)))
+    assert breaker.state == CLOSED and not breaker.probing
+    assert client.execute(lambda llm, model, timeout: "ok") == "ok"
+
+def test_half_open_probe_without_answer_reopens_breaker():
+    """Termin przed wywołaniem albo błąd tworzenia klienta - z powrotem OPEN ze świeżym czasem"""
+    client, _ = make_client(deadline=0)
+    breaker = open_breaker_for_probe(client)
+    stale = breaker.opened_at
+
+    with pytest.raises(LLMUnavailable):
+        client.execute(lambda llm, model, timeout: "ok")
+    assert breaker.state == OPEN and breaker.opened_at > stale and not breaker.probing
+
+    def missing_key():
+        raise Exception("Brak Together API key")
+
+    client, _ = make_client()
+    client.client_factory = missing_key
+    breaker = open_breaker_for_probe(client)
+    with pytest.raises(Exception, match="API key"):
+        client.execute(lambda llm, model, timeout: "ok")
+    assert breaker.state == OPEN and not breaker.probing
+
+    breaker.opened_at -= breaker.reset_timeout             # po kolejnym czasie znów jedna próba
+    client.client_factory = lambda: 'client'
+    assert client.execute(lambda llm, model, timeout: "ok") == "ok"
+    assert breaker.state == CLOSED
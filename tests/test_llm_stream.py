@@ -0,0 +1,87 @@
+"""Testy strumieniowania odpowiedzi LLM z filtrem <think>"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import random
+from types import SimpleNamespace
+
+from llm_stream import ThinkFilter, stream_completion
+
+RAW = ("<think>\nThe client wants tomorrow. So, the correct command is CHECK_AVAILABILITY:jutro\n</think>\n\n"
+       "Sprawdzam wolne terminy 😊\nCHECK_AVAILABILITY:jutro\nJeśli żaden nie pasuje, napisz!")
+
+def split_randomly(text, seed):
+    rng = random.Random(seed)
+    parts, i = [], 0
+    while i < len(text):
+        step = rng.randint(1, 6)
+        parts.append(text[i:i + step])
+        i += step
+    return parts
+
+class FakeStream:
+    """Strumień jak z Together - iterowalne fragmenty + close()"""
+
+    def __init__(self, parts):
+        self.parts = parts
+        self.consumed = 0
+        self.closed = False
+
+    def __iter__(self):
+        for part in self.parts:
+            self.consumed += 1
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=part))], usage=None)
+
+    def close(self):
+        self.closed = True
+
+def fake_client(stream):
+    create = lambda **kwargs: stream
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+def test_think_filter_handles_tags_split_across_chunks():
+    """Tagi pocięte między fragmenty nie przeciekają do widocznej części"""
+    for seed in range(50):
+        think_filter = ThinkFilter()
+        for part in split_randomly(RAW, seed):
+            think_filter.feed(part)
+        think_filter.flush()
+        assert think_filter.visible.startswith("\n\nSprawdzam wolne terminy")
+        assert 'think' not in think_filter.visible
+        assert 'So, the correct command' not in think_filter.visible
+
+def test_stream_stops_after_complete_control_marker():
+    """Strumień kończy się po komendzie z widocznej części, nie z rozumowania"""
+    stream = FakeStream(split_randomly(RAW, 7))
+    result = stream_completion(fake_client(stream), 'model', [], 700, 0.2)
+
+    assert result.stop_reason == 'check_availability'
+    assert stream.closed
+    assert stream.consumed < len(stream.parts)
+    assert result.text.startswith('<think>')
+    assert 'CHECK_AVAILABILITY:jutro\n' in result.text
+    assert 'Jeśli żaden nie pasuje' not in result.text
+    assert result.first_useful_s is not None
+
+def test_stream_stops_after_full_booking_line():
+    """Potwierdzenie rezerwacji kończy strumień dopiero po pełnym numerze telefonu"""
+    raw = ("<think>ok</think>✅ REZERWACJA POTWIERDZONA: Anna Nowak, środa 10:00, strzyżenie damskie, tel: 987654321\n"
+           "Do zobaczenia w salonie!")
+    stream = FakeStream(list(raw))
+    result = stream_completion(fake_client(stream), 'model', [], 700, 0.2)
+
+    assert result.stop_reason == 'booking_confirmed'
+    assert 'tel: 987654321\n' in result.text
+    assert 'Do zobaczenia' not in result.text
+
+def test_plain_answer_is_read_to_the_end():
+    """Zwykła odpowiedź bez komend - cały strumień"""
+    raw = "<think>\nKlient pyta o cennik.\n</think>\nStrzyżenie damskie: 80-120 zł ✂️"
+    stream = FakeStream(split_randomly(raw, 3))
+    result = stream_completion(fake_client(stream), 'model', [], 700, 0.2)
+
+    assert result.stop_reason is None
+    assert result.text == raw
+    assert result.visible.strip() == "Strzyżenie damskie: 80-120 zł ✂️"
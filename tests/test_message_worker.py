@@ -0,0 +1,148 @@
+"""Testy executora z pasami na nadawcę"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import threading
+import time
+
+from message_worker import SenderLaneExecutor, MessageCoalescer
+
+def wait_until(condition, timeout=5):
+    """Czekaj aż warunek będzie spełniony"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+def test_messages_of_one_sender_are_processed_in_order():
+    """Wiadomości jednego nadawcy obsługiwane ściśle po kolei"""
+    processed = []
+    active = {'now': 0, 'max': 0}
+    lock = threading.Lock()
+
+    def handler(sender_id, text):
+        with lock:
+            active['now'] += 1
+            active['max'] = max(active['max'], active['now'])
+        time.sleep(0.01)
+        processed.append(text)
+        with lock:
+            active['now'] -= 1
+
+    executor = SenderLaneExecutor(handler, workers=4)
+    for i in range(10):
+        assert executor.submit('user_1', 'user_1', f"msg {i}")
+
+    assert wait_until(lambda: len(processed) == 10)
+    assert processed == [f"msg {i}" for i in range(10)]
+    assert active['max'] == 1
+
+def test_slow_sender_does_not_block_others():
+    """Wolne zadanie jednego klienta nie blokuje pozostałych"""
+    release = threading.Event()
+    processed = []
+
+    def handler(sender_id, text):
+        if sender_id == 'slow':
+            release.wait(5)
+        processed.append(sender_id)
+
+    executor = SenderLaneExecutor(handler, workers=2)
+    executor.submit('slow', 'slow', 'długie zapytanie do LLM')
+    executor.submit('slow', 'slow', 'druga wiadomość')
+    executor.submit('fast', 'fast', 'hej')
+
+    assert wait_until(lambda: 'fast' in processed)
+    assert 'slow' not in processed
+
+    release.set()
+    assert wait_until(lambda: processed.count('slow') == 2)
+    assert executor.get_stats()['active_lanes'] == 0
+
+def test_queue_limit_rejects_tasks():
+    """Pełna kolejka odrzuca nowe zadania"""
+    release = threading.Event()
+    executor = SenderLaneExecutor(lambda *args: release.wait(5), workers=1, max_queue_size=2)
+
+    assert executor.submit('a', 'a')
+    assert wait_until(lambda: executor.get_stats()['in_progress'] == 1)
+    assert executor.submit('a', 'a')
+    assert executor.submit('b', 'b')
+    assert not executor.submit('c', 'c')
+    assert executor.get_stats()['rejected'] == 1
+    release.set()
+
+def test_burst_of_messages_becomes_one_turn():
+    """Szybka seria wiadomości nadawcy = jedno zadanie, inni nadawcy osobno"""
+    batches = []
+    executor = SenderLaneExecutor(lambda sender_id, messages: batches.append((sender_id, messages)))
+    coalescer = MessageCoalescer(executor, window=0.1, max_wait=1)
+
+    for mid, text in [('m1', 'hej'), ('m2', 'chcę się umówić'), ('m3', 'na jutro')]:
+        assert coalescer.add('user_1', mid, text)
+        time.sleep(0.03)
+    coalescer.add('user_2', 'm4', 'cennik?')
+
+    assert wait_until(lambda: len(batches) == 2)
+    merged = dict(batches)
+    assert [text for _, text, _ in merged['user_1']] == ['hej', 'chcę się umówić', 'na jutro']
+    assert [(mid, text) for mid, text, _ in merged['user_2']] == [('m4', 'cennik?')]
+
+    stats = coalescer.get_stats()
+    assert stats['messages_in'] == 4
+    assert stats['turns_out'] == 2
+    assert stats['llm_calls_saved'] == 2
+
+def test_coalescing_window_is_bounded_by_max_wait():
+    """Ciągły strumień wiadomości nie odkłada odpowiedzi w nieskończoność"""
+    batches = []
+    executor = SenderLaneExecutor(lambda sender_id, messages: batches.append(messages))
+    coalescer = MessageCoalescer(executor, window=0.1, max_wait=0.3)
+
+    start = time.monotonic()
+    while not batches and time.monotonic() - start < 2:
+        coalescer.add('user_1', f'm{time.monotonic()}', 'x')
+        time.sleep(0.02)
+
+    assert batches
+    assert time.monotonic() - start < 0.6
+
+def test_batch_waits_when_executor_is_full():
+    """Pełny executor przy wysyłce serii - wiadomości czekają w buforze, nie giną"""
+    release = threading.Event()
+    batches = []
+
+    def handle(sender_id, messages):
+        if sender_id == 'busy':
+            release.wait(5)
+        else:
+            batches.append([text for _, text, _ in messages])
+
+    executor = SenderLaneExecutor(handle, workers=1, max_queue_size=1)
+    coalescer = MessageCoalescer(executor, window=0.05, max_wait=1)
+
+    assert coalescer.add('user_1', 'm1', 'hej')             # bufor powstaje przy wolnej kolejce
+    assert executor.submit('busy', 'busy', [])               # ...która zapełnia się przed wysyłką
+    assert wait_until(lambda: executor.get_stats()['in_progress'] == 1)
+    assert executor.submit('busy', 'busy', [])
+    assert wait_until(lambda: coalescer.get_stats()['flush_retries'] >= 1)
+    coalescer.add('user_1', 'm2', 'na jutro')
+    assert not batches
+
+    release.set()
+    assert wait_until(lambda: batches == [['hej', 'na jutro']])
+    stats = coalescer.get_stats()
+    assert stats['rejected'] == 0 and stats['pending_senders'] == 0
+
+def test_has_pending_while_batch_is_buffered():
+    """has_pending: nadawca ma serię w oknie łączenia aż do jej wysyłki"""
+    executor = SenderLaneExecutor(lambda sender_id, messages: None)
+    coalescer = MessageCoalescer(executor, window=0.05, max_wait=1)
+
+    coalescer.add('user_1', 'm1', 'hej')
+    assert coalescer.has_pending('user_1') and not coalescer.has_pending('user_2')
+    assert wait_until(lambda: not coalescer.has_pending('user_1'))
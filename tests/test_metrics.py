@@ -0,0 +1,60 @@
+"""Testy metryk w formacie Prometheusa"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from metrics import MetricsRegistry
+
+def test_histogram_renders_cumulative_buckets():
+    """Kubełki skumulowane, suma i liczba obserwacji per zestaw etykiet"""
+    registry = MetricsRegistry()
+    latency = registry.histogram('calendar_seconds', 'Czas Calendar API', ('operation',), buckets=(0.1, 1.0))
+
+    latency.observe(0.05, operation='events.list')
+    latency.observe(0.5, operation='events.list')
+    latency.observe(3.0, operation='events.list')
+    latency.observe(0.2, operation='events.insert')
+
+    text = registry.render()
+    assert '# TYPE calendar_seconds histogram' in text
+    assert 'calendar_seconds_bucket{operation="events.list",le="0.1"} 1' in text
+    assert 'calendar_seconds_bucket{operation="events.list",le="1"} 2' in text
+    assert 'calendar_seconds_bucket{operation="events.list",le="+Inf"} 3' in text
+    assert 'calendar_seconds_count{operation="events.list"} 3' in text
+    assert 'calendar_seconds_sum{operation="events.list"} 3.55' in text
+    assert 'calendar_seconds_count{operation="events.insert"} 1' in text
+
+def test_timer_records_outcome_label():
+    """Etykietę wyniku można ustawić wewnątrz mierzonego bloku"""
+    registry = MetricsRegistry()
+    latency = registry.histogram('llm_seconds', 'Czas LLM', ('outcome',))
+
+    with latency.time(outcome='error') as call:
+        call['outcome'] = 'ok'
+    try:
+        with latency.time(outcome='error'):
+            raise TimeoutError()
+    except TimeoutError:
+        pass
+
+    assert latency.count(outcome='ok') == 1
+    assert latency.count(outcome='error') == 1
+
+def test_counter_and_gauge_function():
+    """Licznik z etykietami i gauge czytany przy odczycie"""
+    registry = MetricsRegistry()
+    tokens = registry.counter('tokens_total', 'Tokeny', ('type',))
+    tokens.inc(120, type='prompt')
+    tokens.inc(30, type='completion')
+    tokens.inc(80, type='prompt')
+
+    depth = {'value': 3}
+    registry.gauge('queue_depth', 'Głębokość kolejki', func=lambda: depth['value'])
+    depth['value'] = 7
+
+    text = registry.render()
+    assert 'tokens_total{type="prompt"} 200' in text
+    assert 'tokens_total{type="completion"} 30' in text
+    assert 'queue_depth 7' in text
+    assert registry.counter('tokens_total', 'Tokeny', ('type',)) is tokens
@@ -0,0 +1,198 @@
+"""Testy siatki zajętości - te same wolne terminy co dotychczasowa pętla, limity klientów"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import random
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytz
+
+from calendar_service import CalendarService
+from occupancy_grid import BLOCKING_WEIGHT, build_grid, free_starts, remaining_capacity
+
+TZ = pytz.timezone('Europe/Warsaw')
+
+def legacy_is_busy(service, start_time, end_time, busy_times):
+    """Dawne CalendarService._is_time_busy: kolizja z którymkolwiek wydarzeniem (waga pomijana)"""
+    for busy in busy_times:
+        busy_start, busy_end = busy[0], busy[1]
+        if isinstance(busy_start, str):
+            try:
+                busy_start = datetime.fromisoformat(busy_start.replace('Z', '+00:00'))
+                if busy_start.tzinfo is None:
+                    busy_start = TZ.localize(busy_start)
+            except ValueError:
+                continue
+        if isinstance(busy_end, str):
+            try:
+                busy_end = datetime.fromisoformat(busy_end.replace('Z', '+00:00'))
+                if busy_end.tzinfo is None:
+                    busy_end = TZ.localize(busy_end)
+            except ValueError:
+                continue
+        if start_time < busy_end and end_time > busy_start:
+            return True
+    return False
+
+def legacy_free_slots(service, date, slot_duration, busy_times):
+    """Dotychczasowy algorytm: każdy kandydat sprawdzany z każdym wydarzeniem"""
+    work_start, work_end = service.working_hours[date.strftime('%A').lower()]
+    slots = []
+    for hour in range(work_start, work_end):
+        for minute in [0, 30]:
+            slot_time = date.replace(hour=hour, minute=minute, second=0, microsecond=0)
+            slot_end = slot_time + timedelta(minutes=slot_duration)
+            if slot_end.hour > work_end:
+                continue
+            if not legacy_is_busy(service, slot_time, slot_end, busy_times):
+                slots.append(slot_time)
+    return slots
+
+def random_busy_times(rng, day):
+    """Wydarzenia w różnych formatach: offset, Z, bez strefy, sekundy, cały dzień"""
+    busy = []
+    for _ in range(rng.randint(0, 12)):
+        start = TZ.localize(datetime.combine(day, datetime.min.time())) + timedelta(
+            minutes=rng.randint(7 * 60, 20 * 60), seconds=rng.choice([0, 0, 0, 30])
+        )
+        end = start + timedelta(minutes=rng.choice([15, 30, 45, 60, 90, 120]))
+        fmt = rng.choice(['offset', 'utc', 'naive', 'datetime'])
+        if fmt == 'offset':
+            busy.append((start.isoformat(), end.isoformat()))
+        elif fmt == 'utc':
+            busy.append((start.astimezone(pytz.utc).isoformat().replace('+00:00', 'Z'),
+                         end.astimezone(pytz.utc).isoformat().replace('+00:00', 'Z')))
+        elif fmt == 'naive':
+            busy.append((start.replace(tzinfo=None).isoformat(), end.replace(tzinfo=None).isoformat()))
+        else:
+            busy.append((start, end))
+    if rng.random() < 0.05:
+        busy.append((day.isoformat(), (day + timedelta(days=1)).isoformat()))
+    return busy
+
+def test_grid_counts_overlapping_events():
+    """Siatka liczy wydarzenia trwające w danej minucie"""
+    base = TZ.localize(datetime(2025, 3, 12))
+    grid = build_grid([
+        ('2025-03-12T10:00:00+01:00', '2025-03-12T11:00:00+01:00'),
+        (base.replace(hour=10, minute=30), base.replace(hour=12)),
+        ('zepsuty', '2025-03-12T12:00:00+01:00'),
+    ], base, TZ)
+
+    assert grid[9 * 60 + 59] == 0
+    assert grid[10 * 60] == 1 and grid[10 * 60 + 45] == 2
+    assert grid[11 * 60 + 59] == 1 and grid[12 * 60] == 0
+
+def test_free_starts_sliding_window():
+    """Okno [start, start + długość) musi być całe wolne"""
+    base = TZ.localize(datetime(2025, 3, 12))
+    grid = build_grid([('2025-03-12T10:00:00+01:00', '2025-03-12T11:00:00+01:00')], base, TZ)
+
+    mask = free_starts(grid, [9 * 60 + 30, 9 * 60 + 45, 10 * 60 + 30, 11 * 60], 30)
+    assert mask.tolist() == [True, False, False, True]
+    assert free_starts(grid, [9 * 60], 61).tolist() == [False]
+
+def test_same_slots_as_legacy_loop():
+    """Losowe dni i wydarzenia: przy max_clients=1 wynik identyczny z dotychczasową pętlą"""
+    rng = random.Random(2025)
+    service = CalendarService(calendar_id='test')
+    today = datetime.now(TZ).date()
+    monday = today + timedelta(days=7 - today.weekday())     # przyszły tydzień - żaden slot nie jest w przeszłości
+
+    for case in range(300):
+        day = monday + timedelta(days=case % 6)
+        date = TZ.localize(datetime.combine(day, datetime.min.time()).replace(hour=8))
+        busy_times = random_busy_times(rng, day)
+        duration = rng.choice([30, 45, 60, 90])
+        service._get_busy_times = lambda date, use_index=True, busy_times=busy_times: busy_times
+
+        slots = [slot['datetime'] for slot in service._get_day_available_slots(date, duration, 'Farbowanie')]
+        expected = legacy_free_slots(service, date, max(duration, 90), busy_times)   # okno = czas farbowania
+        assert slots == expected, busy_times
+
+def test_remaining_capacity_counts_parallel_visits():
+    """Wolne miejsca = max_clients - najwięcej równoczesnych wizyt w oknie"""
+    base = TZ.localize(datetime(2025, 3, 12))
+    grid = build_grid([
+        ('2025-03-12T10:00:00+01:00', '2025-03-12T11:00:00+01:00'),
+        ('2025-03-12T10:30:00+01:00', '2025-03-12T11:30:00+01:00'),
+    ], base, TZ)
+
+    assert remaining_capacity(grid, [9 * 60, 10 * 60, 11 * 60, 11 * 60 + 30], 30, 3).tolist() == [3, 2, 2, 3]
+    assert remaining_capacity(grid, [10 * 60, 11 * 60 + 30], 90, 1).tolist() == [0, 1]
+
+class FakeInsert:
+    """events.insert zapisujący do listy - wydarzenie od razu w indeksie"""
+
+    def __init__(self, inserted):
+        self.inserted = inserted
+
+    def insert(self, calendarId, body):
+        event = dict(body, id=f"evt_{len(self.inserted)}")
+        self.inserted.append(event)
+        return SimpleNamespace(execute=lambda: event)
+
+def make_booking_service(busy_times):
+    service = CalendarService(calendar_id='test')
+    inserted = []
+    service.service = SimpleNamespace(events=lambda: FakeInsert(inserted))
+    service._get_busy_times = lambda date, use_index=True: list(busy_times) + [
+        (event['start']['dateTime'], event['end']['dateTime']) for event in inserted
+    ]
+    return service, inserted
+
+def test_listing_and_booking_honour_max_clients():
+    """Strzyżenie: 3 równolegle; Farbowanie: jeden klient - lista i rezerwacja liczą tak samo"""
+    today = datetime.now(TZ).date()
+    day = today + timedelta(days=7 - today.weekday())
+    at = lambda hour, minute=0: TZ.localize(datetime.combine(day, datetime.min.time()).replace(hour=hour, minute=minute))
+    service, inserted = make_booking_service([(at(10), at(10, 30)), (at(10), at(10, 30))])
+
+    haircut = {slot['datetime'].hour * 60 + slot['datetime'].minute: slot['capacity']
+               for slot in service._get_day_available_slots(at(8), 30, 'Strzyżenie')}
+    assert haircut[10 * 60] == 1 and haircut[9 * 60] == 3
+    colouring = [slot['datetime'] for slot in service._get_day_available_slots(at(8), 90, 'Farbowanie')]
+    assert at(9) not in colouring and at(10, 30) in colouring
+
+    assert service.create_appointment('Anna', '123', 'Strzyżenie', at(10))
+    assert service.create_appointment('Ewa', '456', 'Strzyżenie', at(10)) is False
+    assert service.create_appointment('Ola', '789', 'Farbowanie', at(14))
+    assert service.create_appointment('Iza', '012', 'Farbowanie', at(15)) is False
+    assert len(inserted) == 2
+
+def test_blocking_events_take_whole_capacity():
+    """Urlop na cały dzień i wpis "Zamknięte" blokują termin; wizyta to jeden klient"""
+    service = CalendarService(calendar_id='test')
+    today = datetime.now(TZ).date()
+    day = today + timedelta(days=7 - today.weekday())
+    at = lambda hour, minute=0: TZ.localize(datetime.combine(day, datetime.min.time()).replace(hour=hour, minute=minute))
+    timed = lambda summary, **extra: dict({'summary': summary, 'start': {'dateTime': at(10).isoformat()},
+                                           'end': {'dateTime': at(11).isoformat()}}, **extra)
+
+    assert service._event_weight({'summary': 'Urlop', 'start': {'date': day.isoformat()}}) == BLOCKING_WEIGHT
+    assert service._event_weight(timed('Zamknięte')) == BLOCKING_WEIGHT
+    assert service._event_weight(timed('Strzyżenie - Anna')) == 1
+    assert service._event_weight(timed('Wizyta', extendedProperties={'private': {'bot_service': 'Pasemka'}})) == 1
+
+    service._get_busy_times = lambda date, use_index=True: [
+        (day.isoformat(), (day + timedelta(days=1)).isoformat(), BLOCKING_WEIGHT)
+    ]
+    assert service._get_day_available_slots(at(8), 30, 'Strzyżenie') == []
+
+    service._get_busy_times = lambda date, use_index=True: [(at(10), at(11), BLOCKING_WEIGHT)]
+    hours = [slot['datetime'].hour for slot in service._get_day_available_slots(at(8), 30, 'Strzyżenie')]
+    assert 10 not in hours and 11 in hours
+
+def test_listing_without_service_uses_smallest_limit():
+    """Bez usługi lista liczy najmniejszy max_clients - pokazany termin przyjmie też farbowanie"""
+    today = datetime.now(TZ).date()
+    day = today + timedelta(days=7 - today.weekday())
+    at = lambda hour, minute=0: TZ.localize(datetime.combine(day, datetime.min.time()).replace(hour=hour, minute=minute))
+    service, inserted = make_booking_service([(at(14), at(15))])
+
+    listed = [slot['datetime'] for slot in service._get_day_available_slots(at(8), 30)]
+    assert at(14) not in listed and at(14, 30) not in listed and at(15) in listed
+    assert service.create_appointment('Ola', '789', 'Farbowanie', at(14)) is False
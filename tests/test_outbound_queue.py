@@ -0,0 +1,89 @@
+"""Testy kolejki wysyłki wiadomości"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import threading
+import time
+
+from outbound_queue import OutboundDispatcher, split_message
+
+def wait_until(condition, timeout=5):
+    """Czekaj aż warunek będzie spełniony"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+class RecordingSender:
+    """Zapisuje wysłane części razem z czasem wysyłki"""
+
+    def __init__(self, fail_on=None):
+        self.sent = []
+        self.fail_on = fail_on
+        self.lock = threading.Lock()
+
+    def __call__(self, recipient_id, text):
+        with self.lock:
+            self.sent.append((recipient_id, text, time.monotonic()))
+        return text != self.fail_on
+
+def test_split_message():
+    """Długa wiadomość dzielona na części po 1500 znaków"""
+    parts = split_message("a" * 3200)
+    assert [len(p) for p in parts] == [1500, 1500, 200]
+    assert split_message("krótka") == ["krótka"]
+
+def test_chunks_are_paced_and_ordered():
+    """Części jednego odbiorcy idą po kolei z odstępem"""
+    sender = RecordingSender()
+    dispatcher = OutboundDispatcher(sender, chunk_size=5, chunk_delay=0.05)
+
+    assert dispatcher.enqueue('user_1', 'aaaaabbbbbccccc')
+    assert dispatcher.enqueue('user_1', 'druga')
+    assert wait_until(lambda: dispatcher.get_stats()['delivered'] == 2)
+
+    texts = [text for _, text, _ in sender.sent]
+    assert texts == ['aaaaa', 'bbbbb', 'ccccc', 'druga']
+    gaps = [b[2] - a[2] for a, b in zip(sender.sent, sender.sent[1:3])]
+    assert all(gap >= 0.045 for gap in gaps)
+
+def test_pacing_does_not_block_other_recipients():
+    """Odstęp u jednego odbiorcy nie wstrzymuje innych"""
+    sender = RecordingSender()
+    dispatcher = OutboundDispatcher(sender, chunk_size=5, chunk_delay=0.5, senders=1)
+
+    dispatcher.enqueue('slow', 'aaaaabbbbb')
+    assert wait_until(lambda: len(sender.sent) == 1)
+    dispatcher.enqueue('fast', 'hej')
+
+    assert wait_until(lambda: any(r == 'fast' for r, _, _ in sender.sent), timeout=0.3)
+    assert wait_until(lambda: dispatcher.get_stats()['delivered'] == 2)
+
+def test_page_rate_limit_applies_to_all_recipients():
+    """Limit strony rozkłada wysyłki w czasie"""
+    sender = RecordingSender()
+    dispatcher = OutboundDispatcher(sender, page_rate=20, page_burst=1)
+
+    start = time.monotonic()
+    for i in range(5):
+        dispatcher.enqueue(f'user_{i}', 'hej')
+    assert wait_until(lambda: dispatcher.get_stats()['delivered'] == 5)
+
+    assert time.monotonic() - start >= 0.18
+    assert dispatcher.get_stats()['rate_limited'] > 0
+
+def test_failed_chunk_drops_rest_of_message():
+    """Po błędzie reszta urwanej wiadomości nie jest wysyłana"""
+    sender = RecordingSender(fail_on='bbbbb')
+    dispatcher = OutboundDispatcher(sender, chunk_size=5, chunk_delay=0.01)
+
+    dispatcher.enqueue('user_1', 'aaaaabbbbbccccc')
+    dispatcher.enqueue('user_1', 'potem')
+    assert wait_until(lambda: dispatcher.get_stats()['delivered'] == 1)
+
+    assert [text for _, text, _ in sender.sent] == ['aaaaa', 'bbbbb', 'potem']
+    assert dispatcher.get_stats()['failed'] == 1
@@ -0,0 +1,73 @@
+"""Testy równoległego pobierania dni bez indeksu zajętości"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import threading
+import time
+from types import SimpleNamespace
+
+import calendar_service
+from calendar_service import CalendarService
+
+class FakeThreadService:
+    """Klient jednego wątku: wolne events.list, pilnuje że nie jest współdzielony"""
+
+    def __init__(self, log):
+        self.log = log
+        self.owner = threading.get_ident()
+
+    def events(self):
+        return SimpleNamespace(list=self.list)
+
+    def list(self, **params):
+        assert threading.get_ident() == self.owner, "klient Google użyty z innego wątku"
+        self.log.append(params['timeMin'])
+        return SimpleNamespace(execute=lambda: (time.sleep(0.1), {'items': []})[1])
+
+def make_service(monkeypatch):
+    built, requests = [], []
+
+    def fake_build(name, version, credentials=None, cache_discovery=True):
+        assert cache_discovery is False
+        client = FakeThreadService(requests)
+        built.append(client)
+        return client
+
+    monkeypatch.setattr(calendar_service, 'build', fake_build)
+    monkeypatch.setattr(calendar_service, 'CALENDAR_INDEX_ENABLED', False)
+    service = CalendarService(calendar_id='test')
+    service.service = SimpleNamespace()            # główny klient nie powinien być używany
+    service.credentials = object()
+    return service, built, requests
+
+def test_days_fetched_concurrently_with_thread_clients(monkeypatch):
+    """7 dni po 0.1s: równolegle (~0.2s), każdy wątek z własnym klientem"""
+    service, built, requests = make_service(monkeypatch)
+
+    start = time.perf_counter()
+    slots = service.get_available_slots(days_ahead=7)
+    elapsed = time.perf_counter() - start
+
+    assert len(requests) == 7
+    assert elapsed < 0.5
+    assert 1 < len(built) <= calendar_service.CALENDAR_FETCH_WORKERS
+    assert len({client.owner for client in built}) == len(built)
+
+    # Ten sam wynik co wcześniej: posortowane, max 4 na dzień, max 20
+    assert slots == sorted(slots, key=lambda slot: slot['datetime'])
+    assert len(slots) <= 20
+    per_day = {}
+    for slot in slots:
+        per_day[slot['day_name']] = per_day.get(slot['day_name'], 0) + 1
+    assert max(per_day.values()) <= 4
+
+def test_clients_reused_across_calls(monkeypatch):
+    """Klient wątku budowany raz - kolejne pytania go używają"""
+    service, built, _ = make_service(monkeypatch)
+
+    service.get_available_slots(days_ahead=7)
+    first = len(built)
+    service.get_available_slots(days_ahead=7)
+    assert len(built) == first
@@ -0,0 +1,37 @@
+"""Testy czyszczenia odpowiedzi DeepSeek-R1 (korpus referencyjny)"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+
+import pytest
+
+from response_cleaner import clean_response, DEFAULT_RESPONSE
+
+GOLDEN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'cleaner_golden.json')
+
+with open(GOLDEN_PATH, encoding='utf-8') as f:
+    GOLDEN = json.load(f)
+
+@pytest.mark.parametrize('case', GOLDEN, ids=[f"case{i}" for i in range(len(GOLDEN))])
+def test_matches_golden_corpus(case):
+    """Wynik identyczny z dawnym clean_thinking_response_enhanced"""
+    assert clean_response(case['raw']) == case['expected']
+
+def test_strips_think_blocks_and_reasoning_lines():
+    """Blok <think>, linie rozumowania i kategorie znikają, odpowiedź zostaje"""
+    raw = "<think>\nThe client wants Monday.\n</think>\nSo, here it is.\nWANT_APPOINTMENT\nŚwietnie! Na którą godzinę? 😊"
+    assert clean_response(raw) == "Świetnie! Na którą godzinę? 😊"
+
+def test_category_only_returns_default():
+    """Sama kategoria klasyfikatora = domyślna odpowiedź"""
+    assert clean_response("  BOOKING ") == DEFAULT_RESPONSE
+    assert clean_response("<think>hmm</think>") == DEFAULT_RESPONSE
+
+def test_delegation_from_bot_logic_ai():
+    """bot_logic_ai używa tego samego silnika"""
+    from bot_logic_ai import clean_thinking_response_enhanced
+    for case in GOLDEN:
+        assert clean_thinking_response_enhanced(case['raw']) == case['expected']
@@ -0,0 +1,93 @@
+"""Testy routera (szybka ścieżka regex przed LLM)"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import time
+
+import bot_logic_ai
+from bot_logic import extract_requested_day, get_quick_response
+from router import ROUTE_AVAILABILITY, ROUTE_FAQ, ROUTE_LLM, get_router_stats, route_message
+
+def test_extract_requested_day():
+    """Jednoznaczny dzień w formie dla format_available_slots"""
+    assert extract_requested_day("Jakie są wolne terminy jutro?") == 'jutro'
+    assert extract_requested_day("wolne na pojutrze") == 'pojutrze'
+    assert extract_requested_day("godziny na dziś") == 'dzisiaj'
+    assert extract_requested_day("terminy w środę") == 'środa'
+    assert extract_requested_day("wolne w sobotę") == 'sobota'
+    assert extract_requested_day("wolne terminy") is None
+    assert extract_requested_day("w poniedziałek albo wtorek") is None
+    assert extract_requested_day("dostępne w niedzielę") is None
+
+def test_routes():
+    """Terminy z dniem i FAQ lokalnie, reszta do LLM"""
+    assert route_message("Jakie są wolne terminy jutro?", []) == (ROUTE_AVAILABILITY, 'jutro')
+    assert route_message("Gdzie jesteście?", []) == (ROUTE_FAQ, get_quick_response("gdzie jesteście"))
+    assert route_message("wolne terminy", []) == (ROUTE_LLM, None)
+    assert route_message("Chcę się umówić", []) == (ROUTE_LLM, None)
+    assert route_message("Czy macie parking?", []) == (ROUTE_LLM, None)
+
+def test_quick_response_matches_whole_words():
+    """Aliasy FAQ tylko jako całe słowa - 'ceny' nie odpala się w 'wyceny', 'adres' w 'adresatem'"""
+    assert get_quick_response("Jakie są ceny?") == get_quick_response("jakie usługi oferujecie")
+    assert get_quick_response("podaj adres") == get_quick_response("gdzie jesteście")
+    assert get_quick_response("Ile trwa wyceny koloryzacji?") is None
+    assert get_quick_response("kto jest adresatem faktury") is None
+
+def test_booking_state_goes_to_llm():
+    """W trakcie rezerwacji wszystko idzie do LLM (kontekst rozmowy)"""
+    history = [{"role": "assistant", "content": "📋 PODSUMOWANIE REZERWACJI:\n..."}]
+    assert route_message("Jakie są wolne terminy jutro?", history) == (ROUTE_LLM, None)
+    assert route_message("Gdzie jesteście?", history) == (ROUTE_LLM, None)
+
+def test_process_message_routes_without_llm(monkeypatch):
+    """Pytanie o terminy na dzień trafia do kalendarza bez wywołania LLM"""
+    calls = []
+    monkeypatch.setattr(bot_logic_ai, 'call_llm', lambda *args, **kwargs: calls.append(args) or "")
+    monkeypatch.setattr(bot_logic_ai, 'format_available_slots',
+                        lambda day, service_type=None: f"Terminy na {day} (czwartek, 10.07.2025):\n- *Czwartek 10.07 09:00*")
+    before = get_router_stats()
+
+    response = bot_logic_ai.process_user_message_smart("Jakie są wolne terminy jutro?", "router_user_1")
+
+    assert response.startswith("Terminy na jutro")
+    assert calls == []
+    assert bot_logic_ai.get_user_history("router_user_1")[-1]['content'] == response
+    after = get_router_stats()
+    assert after['routes'][ROUTE_AVAILABILITY] == before['routes'][ROUTE_AVAILABILITY] + 1
+    assert 0 < after['local_fraction'] <= 1
+
+def test_activity_outside_window_is_pruned():
+    """Wpisy aktywności starsze niż okno znikają przy liczeniu aktywnych użytkowników"""
+    bot_logic_ai.user_activity['activity_old'] = time.time() - 2 * bot_logic_ai.USER_ACTIVITY_WINDOW
+    bot_logic_ai.record_activity('activity_new')
+
+    active = bot_logic_ai.count_active_users()
+    assert 'activity_old' not in bot_logic_ai.user_activity
+    assert 'activity_new' in bot_logic_ai.user_activity and active >= 1
+
+def test_availability_route_passes_service(monkeypatch):
+    """Usługa z wiadomości albo wcześniejszej historii trafia do listy terminów (limit klientów)"""
+    requested = []
+    monkeypatch.setattr(bot_logic_ai, 'format_available_slots',
+                        lambda day, service_type=None: requested.append(service_type) or f"Terminy na {day}")
+
+    bot_logic_ai.process_user_message_smart("Wolne terminy na strzyżenie jutro?", "router_user_2")
+    bot_logic_ai.add_to_history("router_user_3", "user", "Chciałabym farbowanie")
+    bot_logic_ai.process_user_message_smart("Jakie są wolne terminy jutro?", "router_user_3")
+
+    assert requested == ['Strzyżenie', 'Farbowanie']
+
+def test_legacy_ai_response_ignores_aliases(monkeypatch):
+    """Dawna ścieżka get_ai_response: tylko frazy QUICK_RESPONSES, aliasy idą do modelu jak wcześniej"""
+    import bot_logic
+
+    def no_client():
+        raise RuntimeError("brak klienta")
+
+    monkeypatch.setattr(bot_logic, 'get_ai_client', no_client)
+
+    assert bot_logic.get_ai_response("Jakie usługi oferujecie?") == get_quick_response("jakie usługi oferujecie")
+    assert bot_logic.get_ai_response("cennik") != get_quick_response("cennik")
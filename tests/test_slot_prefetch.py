@@ -0,0 +1,125 @@
+"""Testy wyprzedzającego pobierania terminów (równolegle z LLM)"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import threading
+import time
+
+import bot_logic_ai
+from slot_prefetch import SlotPrefetcher
+
+def make_prefetcher(delay=0.0):
+    fetched = []
+
+    def fetch(day, service_type=None):
+        fetched.append(day)
+        time.sleep(delay)
+        return f"Terminy na {day}"
+
+    return SlotPrefetcher(fetch, max_workers=2), fetched
+
+def test_no_prefetch_without_day():
+    """Bez jednoznacznego dnia nic nie jest pobierane"""
+    prefetcher, fetched = make_prefetcher()
+
+    assert prefetcher.start("Dzień dobry, jakie macie usługi?") is None
+    assert prefetcher.start("poniedziałek albo wtorek") is None
+    assert fetched == []
+
+def test_hit_reuses_prefetched_result():
+    """Model prosi o ten sam dzień - wynik z prefetchu, bez drugiego zapytania"""
+    prefetcher, fetched = make_prefetcher(delay=0.05)
+
+    prefetch = prefetcher.start("a w środę?")
+    time.sleep(0.1)                       # "wywołanie LLM"
+    assert prefetcher.resolve(prefetch, "środa") == "Terminy na środa"
+    prefetcher.discard(prefetch)
+
+    stats = prefetcher.get_stats()
+    assert fetched == ["środa"]
+    assert stats['hit'] == 1 and stats['unused'] == 0
+    assert stats['hit_rate'] == 1.0
+    assert stats['saved_seconds'] > 0.03
+
+def test_miss_and_unused():
+    """Model prosi o inny dzień - nowe zapytanie, prefetch liczony raz (miss); bez pytania o terminy - unused"""
+    prefetcher, fetched = make_prefetcher()
+
+    prefetch = prefetcher.start("jutro po 15")
+    assert prefetcher.resolve(prefetch, "piątek") == "Terminy na piątek"
+    prefetcher.discard(prefetch)
+
+    stats = prefetcher.get_stats()
+    assert sorted(fetched) == ["jutro", "piątek"]
+    assert stats['miss'] == 1 and stats['unused'] == 0 and stats['hit'] == 0
+
+    prefetcher.discard(prefetcher.start("a w środę?"))
+    assert prefetcher.get_stats()['unused'] == 1
+
+def test_failed_prefetch_counted_once():
+    """Nieudany prefetch - jedno miss i pobranie od nowa, bez dodatkowego unused"""
+    calls = []
+
+    def flaky(day, service_type=None):
+        calls.append(day)
+        if len(calls) == 1:
+            raise ConnectionError("kalendarz")
+        return f"Terminy na {day}"
+
+    prefetcher = SlotPrefetcher(flaky)
+    prefetch = prefetcher.start("jutro")
+    assert prefetcher.resolve(prefetch, "jutro") == "Terminy na jutro"
+    prefetcher.discard(prefetch)
+
+    stats = prefetcher.get_stats()
+    assert stats['miss'] == 1 and stats['unused'] == 0 and stats['hit'] == 0
+
+def test_fetch_overlaps_llm_call(monkeypatch):
+    """process_user_message_smart: kalendarz pobierany w trakcie wywołania LLM"""
+    llm_started = threading.Event()
+    fetch_during_llm = []
+
+    def fake_llm(messages, **kwargs):
+        llm_started.set()
+        time.sleep(0.1)
+        return "Sprawdzam dostępne terminy na środę... 😊\nCHECK_AVAILABILITY:środa"
+
+    def fake_slots(day, service_type=None):
+        fetch_during_llm.append(llm_started.is_set())
+        return f"Terminy na {day} (środa, 12.03.2025):\n- *Środa 12.03 10:00*"
+
+    monkeypatch.setattr(bot_logic_ai, 'call_llm', fake_llm)
+    monkeypatch.setattr(bot_logic_ai, 'format_available_slots', fake_slots)
+    before = bot_logic_ai.slot_prefetcher.get_stats()
+
+    response = bot_logic_ai.process_user_message_smart("Chcę się umówić na środę", "prefetch_user_1")
+
+    assert "Środa 12.03 10:00" in response
+    assert len(fetch_during_llm) == 1
+    assert bot_logic_ai.slot_prefetcher.get_stats()['hit'] == before['hit'] + 1
+
+def test_prefetch_keyed_by_service():
+    """Prefetch dla innej usługi nie jest używany - inny limit klientów"""
+    requested = []
+    prefetcher = SlotPrefetcher(lambda day, service_type: requested.append((day, service_type)) or service_type)
+
+    prefetch = prefetcher.start("a w środę?", 'Strzyżenie')
+    assert prefetcher.resolve(prefetch, "środa", 'Strzyżenie') == 'Strzyżenie'
+    prefetch = prefetcher.start("a w środę?", 'Strzyżenie')
+    assert prefetcher.resolve(prefetch, "środa", 'Farbowanie') == 'Farbowanie'
+    assert requested[-1] == ("środa", 'Farbowanie')
+
+def test_prefetch_discarded_when_llm_fails(monkeypatch):
+    """Błąd wywołania LLM - prefetch i tak rozliczony jako niewykorzystany"""
+    def broken_llm(messages, **kwargs):
+        raise RuntimeError("LLM")
+
+    monkeypatch.setattr(bot_logic_ai, 'call_llm', broken_llm)
+    monkeypatch.setattr(bot_logic_ai, 'format_available_slots', lambda day, service_type=None: f"Terminy na {day}")
+    before = bot_logic_ai.slot_prefetcher.get_stats()
+
+    bot_logic_ai.process_user_message_smart("Chcę się umówić na środę", "prefetch_user_2")
+
+    assert bot_logic_ai.slot_prefetcher.get_stats()['unused'] == before['unused'] + 1
@@ -0,0 +1,84 @@
+"""Testy wspólnego stanu bota (memory / sqlite)"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import threading
+import time
+
+import pytest
+
+from state_backend import MemoryStore, SQLiteStore
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def make_store(request, tmp_path):
+    def factory(name='user_conversations'):
+        if request.param == 'sqlite':
+            return SQLiteStore(name, path=str(tmp_path / 'state.db'))
+        return MemoryStore(name)
+    return factory
+
+def test_store_behaves_like_dict(make_store):
+    """Podstawowe operacje słownikowe"""
+    store = make_store()
+    store['user_1'] = [{'role': 'user', 'content': 'Cześć'}]
+
+    assert 'user_1' in store
+    assert store.get('user_1')[0]['content'] == 'Cześć'
+    assert store.get('user_2', []) == []
+    assert len(store) == 1
+
+    del store['user_1']
+    assert 'user_1' not in store
+
+def test_update_value_is_atomic(make_store):
+    """Równoległe dopisywanie do historii nie gubi wpisów"""
+    store = make_store()
+
+    def append_many():
+        for i in range(20):
+            store.update_value('user_1', lambda history: history + [i], default_factory=list)
+
+    threads = [threading.Thread(target=append_many) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(store['user_1']) == 80
+
+def test_sqlite_state_is_shared_between_instances(tmp_path):
+    """Dwa procesy (tu: dwie instancje) widzą tę samą historię, a namespace'y są rozdzielone"""
+    path = str(tmp_path / 'shared.db')
+    worker_a = SQLiteStore('user_conversations', path=path)
+    worker_b = SQLiteStore('user_conversations', path=path)
+    sessions = SQLiteStore('user_sessions', path=path)
+
+    worker_a.update_value('user_1', lambda h: h + ['a'], default_factory=list)
+    worker_b.update_value('user_1', lambda h: h + ['b'], default_factory=list)
+
+    assert worker_a['user_1'] == ['a', 'b']
+    assert 'user_1' not in sessions
+
+def test_sqlite_key_lock_serializes_sender(tmp_path):
+    """Blokada nadawcy - druga instancja czeka, aż pierwsza skończy"""
+    path = str(tmp_path / 'locks.db')
+    worker_a = SQLiteStore('sender_locks', path=path)
+    worker_b = SQLiteStore('sender_locks', path=path)
+    order = []
+
+    def hold_lock():
+        with worker_a.key_lock('user_1'):
+            order.append('a_start')
+            time.sleep(0.2)
+            order.append('a_end')
+
+    t = threading.Thread(target=hold_lock)
+    t.start()
+    time.sleep(0.05)
+    with worker_b.key_lock('user_1'):
+        order.append('b')
+    t.join()
+
+    assert order == ['a_start', 'a_end', 'b']
@@ -0,0 +1,60 @@
+"""Testy składania promptu systemowego (stały prefiks + blok daty na końcu)"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datetime import datetime
+
+import pytz
+
+import bot_logic_ai
+from bot_logic_ai import SYSTEM_PROMPT_STATIC, build_system_prompt, get_current_date_info, get_prompt_stats
+
+TZ = pytz.timezone('Europe/Warsaw')
+
+def at(year, month, day, hour, minute, second=0):
+    return TZ.localize(datetime(year, month, day, hour, minute, second))
+
+def test_static_prefix_shared_across_prompts():
+    """Każdy prompt zaczyna się od tego samego stałego prefiksu, data jest na końcu"""
+    first = build_system_prompt(at(2025, 3, 10, 9, 0))
+    second = build_system_prompt(at(2025, 3, 11, 17, 45))
+
+    assert first.startswith(SYSTEM_PROMPT_STATIC)
+    assert second.startswith(SYSTEM_PROMPT_STATIC)
+    assert first.endswith(get_current_date_info(at(2025, 3, 10, 9, 0)))
+    assert "2025-03-10" not in SYSTEM_PROMPT_STATIC
+    assert "{current_date_info}" not in SYSTEM_PROMPT_STATIC
+
+def test_date_block_memoised_within_minute():
+    """W tej samej minucie blok daty pochodzi z pamięci"""
+    build_system_prompt(at(2025, 3, 12, 10, 15, 1))
+    before = get_prompt_stats()
+    build_system_prompt(at(2025, 3, 12, 10, 15, 59))
+    after = get_prompt_stats()
+
+    assert after['date_block_hits'] == before['date_block_hits'] + 1
+    assert after['date_block_misses'] == before['date_block_misses']
+    assert after['builds'] == before['builds'] + 1
+
+def test_date_block_rolls_over_at_minute_and_midnight():
+    """Nowa minuta i nowa doba budują blok od nowa"""
+    evening = build_system_prompt(at(2025, 3, 12, 23, 59))
+    assert "23:59" in evening
+
+    misses = get_prompt_stats()['date_block_misses']
+    midnight = build_system_prompt(at(2025, 3, 13, 0, 0))
+    assert get_prompt_stats()['date_block_misses'] == misses + 1
+    assert "czwartek, 13" in midnight
+    assert "00:00" in midnight
+    assert midnight.startswith(SYSTEM_PROMPT_STATIC)
+
+def test_prompt_stats_report_prefix_ratio():
+    """Statystyki pokazują, jaka część promptu jest wspólna"""
+    build_system_prompt(at(2025, 3, 14, 8, 30))
+    stats = get_prompt_stats()
+
+    assert stats['static_prefix_chars'] == len(SYSTEM_PROMPT_STATIC)
+    assert 0.8 < stats['static_prefix_ratio'] < 1.0
+    assert bot_logic_ai.PROMPT_BUILD_TIME.count() >= 1
@@ -0,0 +1,52 @@
+"""Testy fazy startowej (warmup)"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import time
+
+from warmup import WarmupManager
+
+def test_tasks_run_concurrently_and_report_ready():
+    """Zadania startują równolegle - czas fazy to najdłuższe zadanie, nie suma"""
+    warmup = WarmupManager(timeout=5)
+    for name in ['graph', 'together', 'calendar']:
+        warmup.add_task(name, lambda: time.sleep(0.2))
+
+    start = time.monotonic()
+    warmup.start()
+    assert not warmup.is_ready()
+    assert warmup.wait(5)
+
+    assert time.monotonic() - start < 0.5
+    assert warmup.is_ready()
+    assert all(s['state'] == 'ok' for s in warmup.get_status().values())
+
+def test_optional_failure_does_not_block_readiness():
+    """Nieudane zadanie opcjonalne nie blokuje gotowości, wymagane - blokuje"""
+    def broken():
+        raise Exception("brak credentials")
+
+    optional = WarmupManager(timeout=5)
+    optional.add_task('calendar', broken, required=False)
+    optional.start()
+    optional.wait(5)
+    assert optional.is_ready()
+    assert optional.get_status()['calendar']['state'] == 'failed'
+
+    required = WarmupManager(timeout=5)
+    required.add_task('together', broken)
+    required.start()
+    required.wait(5)
+    assert not required.is_ready()
+
+def test_hanging_task_times_out():
+    """Zawieszone zadanie nie wstrzymuje fazy dłużej niż timeout"""
+    warmup = WarmupManager(timeout=0.1)
+    warmup.add_task('graph', lambda: time.sleep(2))
+    warmup.start()
+
+    assert warmup.wait(1)
+    assert warmup.get_status()['graph']['state'] == 'timeout'
+    assert not warmup.is_ready()
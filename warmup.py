@@ -0,0 +1,95 @@
+"""
+Warmup - Faza startowa backendu
+Inicjalizacje wymagające sieci lub ciężkich bibliotek (Graph API, Together,
+Google Calendar) uruchamiane równolegle w tle z limitem czasu, zamiast
+przy imporcie modułów albo na pierwszej wiadomości klienta.
+"""
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+logger = logging.getLogger(__name__)
+
+WARMUP_TIMEOUT = float(os.getenv('WARMUP_TIMEOUT', '15'))
+
+class WarmupManager:
+    """Rejestr zadań startowych i stan gotowości (dla /api/ready)"""
+
+    def __init__(self, timeout=WARMUP_TIMEOUT):
+        self.timeout = timeout
+        self._tasks = []
+        self._status = {}
+        self._lock = threading.Lock()
+        self._started = False
+        self._finished = threading.Event()
+
+    def add_task(self, name, func, required=True):
+        """
+        Zarejestruj zadanie startowe
+
+        Args:
+            name (str): Nazwa widoczna w /api/ready
+            func: Funkcja bez argumentów; wyjątek = zadanie nieudane
+            required (bool): Czy bez tego zadania backend nie jest gotowy
+        """
+        self._tasks.append((name, func, required))
+        self._status[name] = {'state': 'pending', 'required': required}
+
+    def start(self):
+        """Uruchom wszystkie zadania równolegle w tle (idempotentne)"""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        threading.Thread(target=self._run, name='warmup', daemon=True).start()
+
+    def wait(self, timeout=None):
+        """Poczekaj na zakończenie fazy startowej"""
+        return self._finished.wait(timeout)
+
+    def is_ready(self):
+        """Gotowy = faza zakończona i wszystkie wymagane zadania udane"""
+        if not self._finished.is_set():
+            return False
+        with self._lock:
+            return all(s['state'] == 'ok' for s in self._status.values() if s['required'])
+
+    def get_status(self):
+        """Stan każdego zadania"""
+        with self._lock:
+            return {name: dict(status) for name, status in self._status.items()}
+
+    def _run(self):
+        """Wykonaj zadania równolegle, każde z tym samym limitem czasu całej fazy"""
+        start = time.monotonic()
+        pool = ThreadPoolExecutor(max_workers=max(1, len(self._tasks)), thread_name_prefix='warmup')
+        futures = {name: pool.submit(self._timed, name, func) for name, func, _ in self._tasks}
+
+        for name, future in futures.items():
+            remaining = max(0.0, self.timeout - (time.monotonic() - start))
+            try:
+                future.result(timeout=remaining)
+            except FutureTimeoutError:
+                self._set(name, state='timeout')
+                logger.error(f"⏰ Warmup '{name}' przekroczył {self.timeout:.0f}s")
+            except Exception as e:
+                self._set(name, state='failed', error=str(e))
+                logger.error(f"❌ Warmup '{name}' nieudany: {e}")
+
+        # Zawieszone zadania dokończą się w tle - nie czekamy na nie
+        pool.shutdown(wait=False)
+        self._finished.set()
+        logger.info(f"🔥 Warmup zakończony w {time.monotonic() - start:.2f}s - gotowy: {self.is_ready()}")
+
+    def _timed(self, name, func):
+        """Wykonaj zadanie i zapisz czas trwania"""
+        start = time.monotonic()
+        func()
+        self._set(name, state='ok', duration_ms=round((time.monotonic() - start) * 1000, 1))
+
+    def _set(self, name, **fields):
+        with self._lock:
+            self._status[name].update(fields)
@@ -0,0 +1,9 @@
+"""
+WSGI - Punkt wejścia dla serwera produkcyjnego (gunicorn)
+Uruchomienie: gunicorn -c gunicorn.conf.py wsgi:app
+"""
+
+from backend import app
+
+if __name__ == '__main__':
+    app.run(host='0.0.0.0', port=5000)